@@ -0,0 +1,90 @@
+"""
+SQLite checkpointer that stores each checkpoint as a delta.
+
+langgraph's SqliteSaver writes every channel value into every checkpoint, so a
+step that only flips a grader's boolean re-serializes the whole research
+result. DeltaSqliteSaver keeps channel values in a checkpoint_blobs table keyed
+by (channel, version), the way the Postgres saver does: a checkpoint row holds
+only the channel versions, and a step writes blobs only for the channels whose
+version changed. Checkpoints written by the plain SqliteSaver are still read.
+"""
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+
+class DeltaSqliteSaver(SqliteSaver):
+    """SqliteSaver writing only the channels that changed since the previous checkpoint."""
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        super().setup()
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoint_blobs (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                channel TEXT NOT NULL,
+                version TEXT NOT NULL,
+                type TEXT NOT NULL,
+                blob BLOB,
+                PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+            )""")
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        values = checkpoint["channel_values"]
+        blobs = []
+        for channel, version in new_versions.items():
+            # A channel without a value, e.g. cleared, is recorded as empty
+            type_, blob = self.serde.dumps_typed(values[channel]) if channel in values else ("empty", None)
+            blobs.append((thread_id, checkpoint_ns, channel, str(version), type_, blob))
+        if blobs:
+            with self.cursor() as cur:
+                cur.executemany(
+                    "INSERT OR REPLACE INTO checkpoint_blobs (thread_id, checkpoint_ns, channel, version, type, blob) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", blobs)
+        return super().put(config, {**checkpoint, "channel_values": {}}, metadata, new_versions)
+
+    def _load_values(self, checkpoint_tuples: List[CheckpointTuple]) -> List[CheckpointTuple]:
+        """Fill in channel values from the blobs of each checkpoint's channel versions."""
+        with self.cursor(transaction=False) as cur:
+            for checkpoint_tuple in checkpoint_tuples:
+                configurable = checkpoint_tuple.config["configurable"]
+                checkpoint = checkpoint_tuple.checkpoint
+                values: Dict[str, Any] = checkpoint["channel_values"]
+                missing = {channel: str(version) for channel, version in checkpoint["channel_versions"].items()
+                           if channel not in values}
+                if not missing:
+                    continue  # written by the plain SqliteSaver, values inline
+                clauses = " OR ".join(["(channel = ? AND version = ?)"] * len(missing))
+                params = [str(configurable["thread_id"]), configurable.get("checkpoint_ns", "")]
+                for channel, version in missing.items():
+                    params += [channel, version]
+                cur.execute(f"SELECT channel, type, blob FROM checkpoint_blobs "
+                            f"WHERE thread_id = ? AND checkpoint_ns = ? AND ({clauses})", params)
+                for channel, type_, blob in cur.fetchall():
+                    if type_ != "empty":
+                        values[channel] = self.serde.loads_typed((type_, blob))
+        return checkpoint_tuples
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        checkpoint_tuple = super().get_tuple(config)
+        if checkpoint_tuple is None:
+            return None
+        return self._load_values([checkpoint_tuple])[0]
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        # The parent holds the connection lock while it yields, so read everything first
+        checkpoint_tuples = list(super().list(config, filter=filter, before=before, limit=limit))
+        yield from self._load_values(checkpoint_tuples)
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM checkpoint_blobs WHERE thread_id = ?", (str(thread_id),))
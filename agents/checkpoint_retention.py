@@ -0,0 +1,392 @@
+"""
+Retention policy and background compaction for the checkpointer.
+
+Every research task leaves several threads behind: the orchestrator's own
+thread (the task id), "<task id>-initial" for the initial research and
+"<task id>-topic-<i>" for each deep-researched topic. Nothing reads them once
+the task is done, yet they keep growing the checkpoint tables. The compactor
+applies a RetentionPolicy in batches:
+
+    max age          every thread of a task whose last checkpoint is older is deleted
+    keep last N      older checkpoints of each thread are deleted
+    finished tasks   sub-threads are deleted once both they and their task have finished
+
+Sub-threads of tasks that are still running or parked are kept, so a task that
+resumes after a restart still finds the work it already paid for.
+"""
+import asyncio
+import os
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+
+from agents.checkpointer import ThreadedCheckpointSaver, has_pending_tasks
+
+# Offset between the UUID epoch (1582-10-15) and the Unix epoch, in 100 ns intervals
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+_SUBTHREAD_PATTERN = re.compile(r"^(?P<task_id>.+)-(initial|topic-\d+)$")
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class RetentionPolicy:
+    """What the compactor deletes; None disables a rule."""
+    max_age_seconds: Optional[float] = 7 * 24 * 3600
+    max_checkpoints_per_thread: Optional[int] = 20
+    delete_finished_subthreads: bool = True
+    batch_size: int = 200
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        max_age_hours = float(os.getenv("CHECKPOINT_RETENTION_MAX_AGE_HOURS", "168"))
+        keep_last = int(os.getenv("CHECKPOINT_RETENTION_KEEP_LAST", "20"))
+        return cls(
+            max_age_seconds=max_age_hours * 3600 if max_age_hours > 0 else None,
+            max_checkpoints_per_thread=keep_last if keep_last > 0 else None,
+            delete_finished_subthreads=_env_flag("CHECKPOINT_RETENTION_DELETE_FINISHED_SUBTHREADS", "true"),
+            batch_size=max(1, int(os.getenv("CHECKPOINT_COMPACTION_BATCH_SIZE", "200"))),
+        )
+
+
+@dataclass
+class CompactionReport:
+    """What one compaction run deleted."""
+    expired_threads: int = 0
+    finished_subthreads: int = 0
+    trimmed_threads: int = 0
+    checkpoints: int = 0
+    writes: int = 0
+    blobs: int = 0
+    bytes_reclaimed: int = 0
+    duration_seconds: float = 0.0
+
+    def add(self, other: "CompactionReport"):
+        for field in fields(self):
+            setattr(self, field.name, getattr(self, field.name) + getattr(other, field.name))
+
+    def __str__(self) -> str:
+        return (f"Checkpoint compaction: {self.expired_threads} expired threads, "
+                f"{self.finished_subthreads} finished sub-threads and {self.trimmed_threads} trimmed threads; "
+                f"deleted {self.checkpoints} checkpoints, {self.writes} writes, {self.blobs} blobs "
+                f"({self.bytes_reclaimed / 1024:.1f} KiB) in {self.duration_seconds:.2f}s")
+
+
+@dataclass
+class ThreadInfo:
+    thread_id: str
+    latest_checkpoint_id: str
+    # research_task_id of the newest root checkpoint, set on every thread a task runs
+    task_id: Optional[str] = None
+
+    @property
+    def owner(self) -> str:
+        """Task the thread belongs to."""
+        if self.task_id:
+            return self.task_id
+        match = _SUBTHREAD_PATTERN.match(self.thread_id)
+        return match.group("task_id") if match else self.thread_id
+
+    @property
+    def is_subthread(self) -> bool:
+        return self.owner != self.thread_id
+
+
+def checkpoint_timestamp(checkpoint_id: str) -> float:
+    """Unix time a checkpoint was written, read from its time-ordered UUIDv6 id."""
+    hex_id = checkpoint_id.replace("-", "")
+    uuid_time = (int(hex_id[:12], 16) << 12) | int(hex_id[13:16], 16)
+    return (uuid_time - _UUID_EPOCH_OFFSET) / 10_000_000
+
+
+def _batches(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _rows(cursor) -> List[Tuple]:
+    # SQLite returns tuples, the Postgres pool is configured with dict rows
+    return [tuple(row.values()) if isinstance(row, dict) else tuple(row) for row in cursor.fetchall()]
+
+
+class _SaverStore:
+    """Works with any checkpointer through its public API; cannot trim threads."""
+
+    def __init__(self, saver: BaseCheckpointSaver):
+        self.saver = saver
+
+    def threads(self) -> List[ThreadInfo]:
+        threads: Dict[str, ThreadInfo] = {}
+        for checkpoint in self.saver.list(None):
+            configurable = checkpoint.config["configurable"]
+            thread_id = str(configurable["thread_id"])
+            checkpoint_id = configurable["checkpoint_id"]
+            info = threads.setdefault(thread_id, ThreadInfo(thread_id, checkpoint_id))
+            info.latest_checkpoint_id = max(info.latest_checkpoint_id, checkpoint_id)
+            if configurable.get("checkpoint_ns", "") == "" and info.task_id is None:
+                info.task_id = (checkpoint.metadata or {}).get("research_task_id")
+        return list(threads.values())
+
+    def resolve_thread_id(self, thread_id: str):
+        # The in-memory saver keeps thread ids as given, e.g. ints
+        storage = getattr(self.saver, "storage", None)
+        if storage is not None and thread_id not in storage:
+            return next((key for key in storage if str(key) == thread_id), thread_id)
+        return thread_id
+
+    def delete_threads(self, thread_ids: List[str]) -> CompactionReport:
+        report = CompactionReport()
+        footprint = getattr(self.saver, "memory_footprint", None)
+        before = footprint() if footprint else None
+        for thread_id in thread_ids:
+            thread_id = self.resolve_thread_id(thread_id)
+            report.checkpoints += sum(1 for _ in self.saver.list({"configurable": {"thread_id": thread_id}}))
+            self.saver.delete_thread(thread_id)
+        if before is not None:
+            report.bytes_reclaimed = before["bytes"] - footprint()["bytes"]
+        return report
+
+    def threads_to_trim(self, keep_last: int) -> List[Tuple[str, str]]:
+        # The bounded in-memory saver trims on every write already
+        return []
+
+    def trim(self, thread_namespaces: List[Tuple[str, str]], keep_last: int) -> CompactionReport:
+        return CompactionReport()
+
+
+class _SqliteStore(_SaverStore):
+    """Batched SQL against the tables of langgraph's SqliteSaver and DeltaSqliteSaver."""
+    placeholder = "?"
+    task_id_sql = "json_extract(CAST(latest.metadata AS TEXT), '$.research_task_id')"
+    checkpoint_bytes_sql = "COALESCE(length(checkpoint), 0) + COALESCE(length(metadata), 0)"
+    writes_table = "writes"
+    writes_bytes_sql = "COALESCE(length(value), 0)"
+
+    @contextmanager
+    def cursor(self):
+        with self.saver.cursor() as cur:
+            yield cur
+
+    def _in(self, values: List[Any]) -> str:
+        return "(" + ", ".join([self.placeholder] * len(values)) + ")"
+
+    def threads(self) -> List[ThreadInfo]:
+        with self.cursor() as cur:
+            cur.execute(f"""
+                SELECT c.thread_id, MAX(c.checkpoint_id),
+                       (SELECT {self.task_id_sql} FROM checkpoints latest
+                        WHERE latest.thread_id = c.thread_id AND latest.checkpoint_ns = ''
+                        ORDER BY latest.checkpoint_id DESC LIMIT 1)
+                FROM checkpoints c GROUP BY c.thread_id""")
+            return [ThreadInfo(str(thread_id), checkpoint_id, task_id)
+                    for thread_id, checkpoint_id, task_id in _rows(cur)]
+
+    def _delete(self, cur, table: str, bytes_sql: str, where: str, params: List[Any]) -> Tuple[int, int]:
+        """Delete matching rows; returns (rows, bytes)."""
+        cur.execute(f"SELECT COUNT(*), COALESCE(SUM({bytes_sql}), 0) FROM {table} WHERE {where}", params)
+        count, size = _rows(cur)[0]
+        if count:
+            cur.execute(f"DELETE FROM {table} WHERE {where}", params)
+        return int(count), int(size)
+
+    def _has_blobs(self, cur) -> bool:
+        # Only DeltaSqliteSaver keeps channel values apart from the checkpoints
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'checkpoint_blobs'")
+        return bool(cur.fetchall())
+
+    def _delete_blobs(self, cur, where: str, params: List[Any]) -> Tuple[int, int]:
+        if not self._has_blobs(cur):
+            return 0, 0
+        return self._delete(cur, "checkpoint_blobs", "COALESCE(length(blob), 0)", where, params)
+
+    def delete_threads(self, thread_ids: List[str]) -> CompactionReport:
+        report = CompactionReport()
+        where = f"thread_id IN {self._in(thread_ids)}"
+        with self.cursor() as cur:
+            report.checkpoints, checkpoint_bytes = self._delete(
+                cur, "checkpoints", self.checkpoint_bytes_sql, where, thread_ids)
+            report.writes, writes_bytes = self._delete(cur, self.writes_table, self.writes_bytes_sql, where, thread_ids)
+            report.blobs, blob_bytes = self._delete_blobs(cur, where, thread_ids)
+        report.bytes_reclaimed = checkpoint_bytes + writes_bytes + blob_bytes
+        return report
+
+    def threads_to_trim(self, keep_last: int) -> List[Tuple[str, str]]:
+        with self.cursor() as cur:
+            cur.execute(f"""
+                SELECT thread_id, checkpoint_ns FROM checkpoints
+                GROUP BY thread_id, checkpoint_ns HAVING COUNT(*) > {self.placeholder}""", [keep_last])
+            return [(str(thread_id), checkpoint_ns) for thread_id, checkpoint_ns in _rows(cur)]
+
+    def trim(self, thread_namespaces: List[Tuple[str, str]], keep_last: int) -> CompactionReport:
+        report = CompactionReport()
+        p = self.placeholder
+        with self.cursor() as cur:
+            for thread_id, checkpoint_ns in thread_namespaces:
+                cur.execute(f"""
+                    SELECT checkpoint_id FROM checkpoints WHERE thread_id = {p} AND checkpoint_ns = {p}
+                    ORDER BY checkpoint_id DESC LIMIT 1 OFFSET {p}""", [thread_id, checkpoint_ns, keep_last - 1])
+                rows = _rows(cur)
+                if not rows:
+                    continue
+                params = [thread_id, checkpoint_ns, rows[0][0]]
+                where = f"thread_id = {p} AND checkpoint_ns = {p} AND checkpoint_id < {p}"
+                checkpoints, checkpoint_bytes = self._delete(cur, "checkpoints", self.checkpoint_bytes_sql,
+                                                             where, params)
+                writes, writes_bytes = self._delete(cur, self.writes_table, self.writes_bytes_sql, where, params)
+                blobs, blob_bytes = self._delete_unreferenced_blobs(cur, thread_id, checkpoint_ns)
+                report.checkpoints += checkpoints
+                report.writes += writes
+                report.blobs += blobs
+                report.bytes_reclaimed += checkpoint_bytes + writes_bytes + blob_bytes
+        return report
+
+    def _delete_unreferenced_blobs(self, cur, thread_id: str, checkpoint_ns: str) -> Tuple[int, int]:
+        if not self._has_blobs(cur):
+            return 0, 0
+        # Channel versions live inside the serialized checkpoints; only the kept few are read
+        cur.execute("SELECT type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?",
+                    [thread_id, checkpoint_ns])
+        referenced = {(channel, str(version)) for type_, checkpoint in _rows(cur)
+                      for channel, version in self.saver.serde.loads_typed((type_, checkpoint))["channel_versions"].items()}
+        cur.execute("SELECT channel, version, COALESCE(length(blob), 0) FROM checkpoint_blobs "
+                    "WHERE thread_id = ? AND checkpoint_ns = ?", [thread_id, checkpoint_ns])
+        stale = [(channel, version, size) for channel, version, size in _rows(cur)
+                 if (channel, version) not in referenced]
+        cur.executemany("DELETE FROM checkpoint_blobs WHERE thread_id = ? AND checkpoint_ns = ? "
+                        "AND channel = ? AND version = ?",
+                        [(thread_id, checkpoint_ns, channel, version) for channel, version, _ in stale])
+        return len(stale), sum(size for _, _, size in stale)
+
+
+class _PostgresStore(_SqliteStore):
+    """Batched SQL against the tables of langgraph's PostgresSaver."""
+    placeholder = "%s"
+    task_id_sql = "latest.metadata ->> 'research_task_id'"
+    checkpoint_bytes_sql = "pg_column_size(checkpoint) + pg_column_size(metadata)"
+    writes_table = "checkpoint_writes"
+    writes_bytes_sql = "COALESCE(octet_length(blob), 0)"
+
+    @contextmanager
+    def cursor(self):
+        with self.saver._cursor() as cur:
+            yield cur
+
+    def _delete_blobs(self, cur, where: str, params: List[Any]) -> Tuple[int, int]:
+        return self._delete(cur, "checkpoint_blobs", "COALESCE(octet_length(blob), 0)", where, params)
+
+    def _delete_unreferenced_blobs(self, cur, thread_id: str, checkpoint_ns: str) -> Tuple[int, int]:
+        # Channel values are shared between checkpoints; keep those any remaining checkpoint points at
+        where = """thread_id = %s AND checkpoint_ns = %s AND NOT EXISTS (
+            SELECT 1 FROM checkpoints c
+            WHERE c.thread_id = checkpoint_blobs.thread_id AND c.checkpoint_ns = checkpoint_blobs.checkpoint_ns
+              AND c.checkpoint -> 'channel_versions' ->> checkpoint_blobs.channel = checkpoint_blobs.version)"""
+        return self._delete(cur, "checkpoint_blobs", "COALESCE(octet_length(blob), 0)", where,
+                            [thread_id, checkpoint_ns])
+
+
+def _store_for(checkpointer: BaseCheckpointSaver) -> _SaverStore:
+    saver = checkpointer.saver if isinstance(checkpointer, ThreadedCheckpointSaver) else checkpointer
+    # Matched by module so neither optional backend has to be installed; subclasses count too
+    modules = [cls.__module__ for cls in type(saver).__mro__]
+    if any(module.startswith("langgraph.checkpoint.sqlite") for module in modules):
+        return _SqliteStore(saver)
+    if any(module.startswith("langgraph.checkpoint.postgres") for module in modules):
+        return _PostgresStore(saver)
+    return _SaverStore(saver)
+
+
+class CheckpointCompactor:
+    """Applies a RetentionPolicy to a checkpointer, in batches."""
+
+    def __init__(self, checkpointer: BaseCheckpointSaver, policy: Optional[RetentionPolicy] = None):
+        self.checkpointer = checkpointer
+        self.policy = policy or RetentionPolicy.from_env()
+        self.store = _store_for(checkpointer)
+
+    def _finished(self, thread_id: str) -> bool:
+        saver = self.store.saver
+        latest = next(iter(saver.list({"configurable": {"thread_id": self.store.resolve_thread_id(thread_id),
+                                                         "checkpoint_ns": ""}}, limit=1)), None)
+        return latest is not None and not has_pending_tasks(latest.checkpoint)
+
+    def _select(self, threads: Iterable[ThreadInfo], now: float) -> Tuple[List[str], List[str]]:
+        """Split threads into (expired, finished sub-threads) to delete."""
+        by_task: Dict[str, List[ThreadInfo]] = defaultdict(list)
+        for info in threads:
+            by_task[info.owner].append(info)
+
+        expired, finished = [], []
+        for task_id, task_threads in by_task.items():
+            last_activity = max(checkpoint_timestamp(info.latest_checkpoint_id) for info in task_threads)
+            if self.policy.max_age_seconds is not None and now - last_activity > self.policy.max_age_seconds:
+                expired.extend(info.thread_id for info in task_threads)
+                continue
+            subthreads = [info for info in task_threads if info.is_subthread]
+            if not (self.policy.delete_finished_subthreads and subthreads):
+                continue
+            # Only once the task itself has finished: a resumed task reuses its finished sub-threads
+            if not any(info.thread_id == task_id for info in task_threads) or not self._finished(task_id):
+                continue
+            finished.extend(info.thread_id for info in subthreads if self._finished(info.thread_id))
+        return expired, finished
+
+    def compact(self, now: Optional[float] = None) -> CompactionReport:
+        """Run the policy once and report what was reclaimed."""
+        started = time.monotonic()
+        report = CompactionReport()
+        batch_size = self.policy.batch_size
+
+        expired, finished = self._select(self.store.threads(), time.time() if now is None else now)
+        for batch in _batches(expired, batch_size):
+            report.add(self.store.delete_threads(batch))
+        report.expired_threads = len(expired)
+        for batch in _batches(finished, batch_size):
+            report.add(self.store.delete_threads(batch))
+        report.finished_subthreads = len(finished)
+
+        keep_last = self.policy.max_checkpoints_per_thread
+        if keep_last:
+            to_trim = self.store.threads_to_trim(keep_last)
+            for batch in _batches(to_trim, batch_size):
+                report.add(self.store.trim(batch, keep_last))
+            report.trimmed_threads = len(to_trim)
+
+        report.duration_seconds = time.monotonic() - started
+        return report
+
+    async def acompact(self, now: Optional[float] = None) -> CompactionReport:
+        # The checkpointers block on their database; keep the event loop free meanwhile
+        return await asyncio.to_thread(self.compact, now)
+
+    async def run_forever(self, interval_seconds: float):
+        """Compact every interval_seconds until cancelled."""
+        while True:
+            try:
+                report = await self.acompact()
+                print(report)
+            except Exception as e:
+                print(f"Checkpoint compaction failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+
+def start_compaction(checkpointer: BaseCheckpointSaver, policy: Optional[RetentionPolicy] = None,
+                     interval_seconds: Optional[float] = None) -> Optional["asyncio.Task"]:
+    """
+    Start the background compaction job on the running event loop.
+
+    The interval defaults to CHECKPOINT_COMPACTION_INTERVAL seconds (one hour);
+    0 disables compaction and returns None.
+    """
+    if interval_seconds is None:
+        interval_seconds = float(os.getenv("CHECKPOINT_COMPACTION_INTERVAL", "3600"))
+    if interval_seconds <= 0:
+        return None
+    compactor = CheckpointCompactor(checkpointer, policy)
+    return asyncio.create_task(compactor.run_forever(interval_seconds))
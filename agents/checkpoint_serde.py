@@ -0,0 +1,100 @@
+"""
+Compact serializer for checkpoints.
+
+langgraph's default serializer stores every pydantic model as its module path,
+class name and a field-name -> value map, so each Topic in a RelatedTopics
+repeats "topic", "description" and "source" next to its text. This serializer
+packs Topic and RelatedTopics as positional msgpack arrays instead and
+compresses values above a size threshold with zlib, where the long topic
+descriptions shrink the most.
+
+Everything else is handed to langgraph's own dumps_typed/loads_typed and
+embedded as an ext value, and values written by the default serializer are
+still read, so existing checkpoints stay usable.
+"""
+import os
+import zlib
+from typing import Any, Tuple
+
+import ormsgpack
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from agents.researcher.memory.research_topics import RelatedTopics, Topic
+
+# Compress values of at least this many bytes; 0 disables compression
+CHECKPOINT_COMPRESS_THRESHOLD = int(os.getenv("CHECKPOINT_COMPRESS_THRESHOLD", "512"))
+CHECKPOINT_COMPRESS_LEVEL = int(os.getenv("CHECKPOINT_COMPRESS_LEVEL", "6"))
+
+COMPACT_MSGPACK = "msgpack-compact"
+COMPACT_MSGPACK_ZLIB = "msgpack-compact+zlib"
+
+# Application ext codes, clear of the ones langgraph uses (0-6)
+EXT_TOPIC = 64
+EXT_RELATED_TOPICS = 65
+# Any other value ormsgpack can't pack itself, as langgraph's (type, bytes) pair
+EXT_JSONPLUS = 66
+_TOPIC_FIELDS = ("topic", "description", "source")
+
+# Types ormsgpack would pack on its own without round-tripping them go through the default hook
+_PACK_OPTION = (ormsgpack.OPT_NON_STR_KEYS | ormsgpack.OPT_PASSTHROUGH_DATACLASS | ormsgpack.OPT_PASSTHROUGH_DATETIME
+                | ormsgpack.OPT_PASSTHROUGH_ENUM | ormsgpack.OPT_PASSTHROUGH_UUID)
+
+
+def _pack_topic(topic: Topic) -> list:
+    return [getattr(topic, field) for field in _TOPIC_FIELDS]
+
+
+def _unpack_topic(values: list) -> Topic:
+    return Topic(**dict(zip(_TOPIC_FIELDS, values)))
+
+
+class CompactSerializer(JsonPlusSerializer):
+    """JsonPlusSerializer with compact research models and zlib compression."""
+
+    def __init__(self, compress_threshold: int = CHECKPOINT_COMPRESS_THRESHOLD,
+                 compress_level: int = CHECKPOINT_COMPRESS_LEVEL, **kwargs):
+        super().__init__(**kwargs)
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        if obj is None or isinstance(obj, (bytes, bytearray)):
+            return super().dumps_typed(obj)
+        try:
+            data = ormsgpack.packb(obj, default=self._compact_default, option=_PACK_OPTION)
+        except ormsgpack.MsgpackEncodeError:
+            # Invalid UTF-8 and other oddities take langgraph's fallbacks
+            return super().dumps_typed(obj)
+        if self.compress_threshold and len(data) >= self.compress_threshold:
+            compressed = zlib.compress(data, self.compress_level)
+            if len(compressed) < len(data):
+                return COMPACT_MSGPACK_ZLIB, compressed
+        return COMPACT_MSGPACK, data
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, data_ = data
+        if type_ == COMPACT_MSGPACK_ZLIB:
+            type_, data_ = COMPACT_MSGPACK, zlib.decompress(data_)
+        if type_ == COMPACT_MSGPACK:
+            return ormsgpack.unpackb(data_, ext_hook=self._compact_ext_hook, option=ormsgpack.OPT_NON_STR_KEYS)
+        return super().loads_typed((type_, data_))
+
+    def _compact_default(self, obj: Any):
+        # Exact types only: subclasses may carry more fields than the positional layout
+        if type(obj) is Topic:
+            return ormsgpack.Ext(EXT_TOPIC, ormsgpack.packb(_pack_topic(obj)))
+        if type(obj) is RelatedTopics:
+            return ormsgpack.Ext(EXT_RELATED_TOPICS, ormsgpack.packb([_pack_topic(topic) for topic in obj.topics]))
+        type_, data = super().dumps_typed(obj)
+        return ormsgpack.Ext(EXT_JSONPLUS, ormsgpack.packb([type_, data]))
+
+    def _compact_ext_hook(self, code: int, data: bytes) -> Any:
+        if code == EXT_TOPIC:
+            return _unpack_topic(ormsgpack.unpackb(data))
+        if code == EXT_RELATED_TOPICS:
+            return RelatedTopics(topics=[_unpack_topic(values) for values in ormsgpack.unpackb(data)])
+        if code == EXT_JSONPLUS:
+            type_, data_ = ormsgpack.unpackb(data)
+            return super().loads_typed((type_, data_))
+        # langgraph's own ext codes, as compact checkpoints written before EXT_JSONPLUS still hold them
+        return super().loads_typed(("msgpack", ormsgpack.packb(ormsgpack.Ext(code, data))))
@@ -0,0 +1,405 @@
+"""
+Checkpointer shared by the research graphs and the orchestrator.
+
+The backend is chosen with CHECKPOINTER_BACKEND:
+
+    memory    in-process only, lost on restart (default); bounded in size, see BoundedMemorySaver
+    sqlite    durable file at CHECKPOINTER_SQLITE_PATH, for single-node deployments
+    postgres  durable database at CHECKPOINTER_POSTGRES_URI, shared by several workers
+
+With a durable backend every completed node survives a crash or restart, so
+unfinished tasks resume from their last completed node instead of paying for
+their LLM and search steps again.
+
+Every backend serializes with CompactSerializer and stores only the channels a
+step changed: the memory and Postgres savers do so natively, SQLite through
+DeltaSqliteSaver.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (BaseCheckpointSaver, ChannelVersions, Checkpoint, CheckpointMetadata,
+                                       CheckpointTuple)
+from langgraph.checkpoint.memory import MemorySaver
+
+from agents.checkpoint_serde import CompactSerializer
+
+CHECKPOINTER_BACKEND = os.getenv("CHECKPOINTER_BACKEND", "memory")  # memory | sqlite | postgres
+CHECKPOINTER_SQLITE_PATH = os.getenv("CHECKPOINTER_SQLITE_PATH", os.path.join(".cache", "checkpoints.sqlite"))
+CHECKPOINTER_POSTGRES_URI = os.getenv("CHECKPOINTER_POSTGRES_URI", os.getenv("DATABASE_URL", ""))
+CHECKPOINTER_POSTGRES_POOL_SIZE = int(os.getenv("CHECKPOINTER_POSTGRES_POOL_SIZE", "10"))
+# Bounds of the in-memory backend; 0 disables a bound
+CHECKPOINTER_MAX_BYTES = int(os.getenv("CHECKPOINTER_MAX_BYTES", str(256 * 1024 * 1024)))
+CHECKPOINTER_MAX_THREADS = int(os.getenv("CHECKPOINTER_MAX_THREADS", "10000"))
+CHECKPOINTER_KEEP_LAST = int(os.getenv("CHECKPOINTER_KEEP_LAST", "10"))
+
+# Channels whose update means the graph still has a node to run
+_TRIGGER_CHANNEL_PREFIX = "branch:to:"
+_TRIGGER_CHANNELS = ("__start__", "__pregel_tasks")
+
+
+def has_pending_tasks(checkpoint: Checkpoint) -> bool:
+    """Whether the graph stopped before END: mid-run, interrupted or waiting for input."""
+    updated = checkpoint.get("updated_channels")
+    if updated is None:
+        return True
+    return any(channel.startswith(_TRIGGER_CHANNEL_PREFIX) or channel in _TRIGGER_CHANNELS
+               for channel in updated)
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    In-memory checkpointer with a size budget for long-lived processes.
+
+    Only the latest keep_last checkpoints of each thread (and namespace) are
+    kept, together with the channel values they reference. When the process
+    holds more than max_bytes of serialized state or more than max_threads
+    threads, the least recently used threads whose graph has finished are
+    evicted. Threads that are mid-run, interrupted or pinned are never evicted.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = CHECKPOINTER_MAX_BYTES,
+                 max_threads: Optional[int] = CHECKPOINTER_MAX_THREADS,
+                 keep_last: Optional[int] = CHECKPOINTER_KEEP_LAST, **kwargs):
+        """
+        Args:
+            max_bytes: Budget of serialized checkpoints, writes and channel values
+            max_threads: Maximum number of threads kept
+            keep_last: Checkpoints kept per thread and namespace
+        """
+        super().__init__(**kwargs)
+        self.max_bytes = max_bytes or None
+        self.max_threads = max_threads or None
+        self.keep_last = max(1, keep_last) if keep_last else None
+        self._lock = threading.RLock()
+        # thread id -> None, least recently used first
+        self._lru: "OrderedDict[str, None]" = OrderedDict()
+        self._completed: Dict[str, bool] = {}
+        self._pinned: Set[str] = set()
+        self._thread_bytes: Dict[str, int] = defaultdict(int)
+        self._thread_blobs: Dict[str, Set[Tuple]] = defaultdict(set)
+        self._thread_writes: Dict[str, Set[Tuple]] = defaultdict(set)
+        self._sizes: Dict[Tuple, int] = {}
+        self._versions: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._total_bytes = 0
+        self._evictions = 0
+
+    def _account(self, thread_id: str, key: Tuple, size: int):
+        delta = size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+        self._thread_bytes[thread_id] += delta
+        self._total_bytes += delta
+
+    def _forget(self, thread_id: str, key: Tuple):
+        size = self._sizes.pop(key, 0)
+        self._thread_bytes[thread_id] -= size
+        self._total_bytes -= size
+
+    def _touch(self, thread_id: str):
+        self._lru[thread_id] = None
+        self._lru.move_to_end(thread_id)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            result = super().get_tuple(config)
+            if result is not None:
+                self._drop_empty_writes([result])
+            if thread_id in self._lru:
+                self._touch(thread_id)
+            elif not any(self.storage.get(thread_id, {}).values()):
+                # Looking up an unknown thread must not leave an empty entry behind
+                self.storage.pop(thread_id, None)
+            return result
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        with self._lock:
+            checkpoints = list(super().list(config, filter=filter, before=before, limit=limit))
+            self._drop_empty_writes(checkpoints)
+        yield from checkpoints
+
+    def _drop_empty_writes(self, checkpoints: List[CheckpointTuple]):
+        # Reading pending writes leaves empty entries behind in the parent's defaultdict
+        for checkpoint in checkpoints:
+            configurable = checkpoint.config["configurable"]
+            key = (configurable["thread_id"], configurable["checkpoint_ns"], configurable["checkpoint_id"])
+            if not self.writes.get(key, True):
+                del self.writes[key]
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            result = super().put(config, checkpoint, metadata, new_versions)
+            for channel, version in new_versions.items():
+                key = (thread_id, checkpoint_ns, channel, version)
+                self._thread_blobs[thread_id].add(key)
+                self._account(thread_id, ("blob",) + key, len(self.blobs[key][1]))
+            saved, saved_metadata, _ = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+            checkpoint_key = (thread_id, checkpoint_ns, checkpoint["id"])
+            self._account(thread_id, ("checkpoint",) + checkpoint_key, len(saved[1]) + len(saved_metadata[1]))
+            self._versions[checkpoint_key] = dict(checkpoint["channel_versions"])
+            if checkpoint_ns == "":
+                self._completed[thread_id] = not has_pending_tasks(checkpoint)
+            self._touch(thread_id)
+            self._prune(thread_id, checkpoint_ns)
+            self._evict(keep=thread_id)
+            return result
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        outer_key = (thread_id, config["configurable"].get("checkpoint_ns", ""),
+                     config["configurable"]["checkpoint_id"])
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+            self._thread_writes[thread_id].add(outer_key)
+            self._account(thread_id, ("writes",) + outer_key,
+                          sum(len(value[2][1]) for value in self.writes[outer_key].values()))
+            self._touch(thread_id)
+            self._evict(keep=thread_id)
+
+    def _prune(self, thread_id: str, checkpoint_ns: str):
+        """Drop all but the latest keep_last checkpoints and the channel values only they used."""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if not self.keep_last or len(checkpoints) <= self.keep_last:
+            return
+        for checkpoint_id in sorted(checkpoints)[:-self.keep_last]:
+            del checkpoints[checkpoint_id]
+            checkpoint_key = (thread_id, checkpoint_ns, checkpoint_id)
+            self._versions.pop(checkpoint_key, None)
+            self._forget(thread_id, ("checkpoint",) + checkpoint_key)
+            if self.writes.pop(checkpoint_key, None) is not None:
+                self._thread_writes[thread_id].discard(checkpoint_key)
+                self._forget(thread_id, ("writes",) + checkpoint_key)
+
+        referenced = {(channel, version) for checkpoint_id in checkpoints
+                      for channel, version in self._versions.get((thread_id, checkpoint_ns, checkpoint_id), {}).items()}
+        for key in [key for key in self._thread_blobs[thread_id]
+                    if key[1] == checkpoint_ns and (key[2], key[3]) not in referenced]:
+            self.blobs.pop(key, None)
+            self._thread_blobs[thread_id].discard(key)
+            self._forget(thread_id, ("blob",) + key)
+
+    def _over_budget(self) -> bool:
+        return bool((self.max_bytes and self._total_bytes > self.max_bytes) or
+                    (self.max_threads and len(self._lru) > self.max_threads))
+
+    def _evict(self, keep: Optional[str] = None):
+        """Evict least recently used, finished, unpinned threads until within budget."""
+        if not self._over_budget():
+            return
+        for thread_id in list(self._lru):
+            if not self._over_budget():
+                break
+            if thread_id == keep or thread_id in self._pinned or not self._completed.get(thread_id):
+                continue
+            self._delete(thread_id)
+            self._evictions += 1
+
+    def _delete(self, thread_id: str):
+        self.storage.pop(thread_id, None)
+        for key in self._thread_writes.pop(thread_id, set()):
+            self.writes.pop(key, None)
+        for key in self._thread_blobs.pop(thread_id, set()):
+            self.blobs.pop(key, None)
+        for key in [key for key in self._versions if key[0] == thread_id]:
+            del self._versions[key]
+        for key in [key for key in self._sizes if key[1] == thread_id]:
+            del self._sizes[key]
+        self._total_bytes -= self._thread_bytes.pop(thread_id, 0)
+        self._lru.pop(thread_id, None)
+        self._completed.pop(thread_id, None)
+
+    def delete_thread(self, thread_id: str) -> None:
+        # LangGraph stores thread ids as strings, whatever type the config carried
+        thread_id = str(thread_id)
+        with self._lock:
+            self._delete(thread_id)
+            self._pinned.discard(thread_id)
+
+    def pin_thread(self, thread_id: str, pinned: bool = True):
+        """Protect a finished thread from eviction, e.g. a task parked for human feedback."""
+        thread_id = str(thread_id)
+        with self._lock:
+            if pinned:
+                self._pinned.add(thread_id)
+            else:
+                self._pinned.discard(thread_id)
+
+    def memory_footprint(self) -> Dict[str, int]:
+        """Serialized bytes held, with thread, checkpoint and eviction counts."""
+        with self._lock:
+            return {
+                "bytes": self._total_bytes,
+                "threads": len(self._lru),
+                "completed_threads": sum(1 for done in self._completed.values() if done),
+                "pinned_threads": len(self._pinned),
+                "checkpoints": len(self._versions),
+                "evictions": self._evictions,
+            }
+
+
+class ThreadedCheckpointSaver(BaseCheckpointSaver):
+    """
+    Async front for a synchronous saver (SQLite, Postgres).
+
+    The async methods run the blocking calls in worker threads, so the event
+    loop is never blocked and the same saver can be used from any event loop,
+    unlike the aiosqlite / async psycopg savers whose connections belong to
+    the loop that opened them.
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+
+    @property
+    def config_specs(self) -> list:
+        return self.saver.config_specs
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.saver.get_tuple(config)
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        return self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        return self.saver.put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        self.saver.put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.saver.delete_thread(thread_id)
+
+    def get_next_version(self, current, channel):
+        return self.saver.get_next_version(current, channel)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.saver.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        checkpoints = await asyncio.to_thread(
+            lambda: list(self.saver.list(config, filter=filter, before=before, limit=limit)))
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.saver.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        await asyncio.to_thread(self.saver.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.saver.delete_thread, thread_id)
+
+
+def _sqlite_checkpointer(path: str) -> BaseCheckpointSaver:
+    from agents.checkpoint_delta import DeltaSqliteSaver
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # The saver serializes access with its own lock, so the connection may be shared across threads
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    saver = DeltaSqliteSaver(conn, serde=CompactSerializer())
+    saver.setup()
+    return ThreadedCheckpointSaver(saver)
+
+
+def _postgres_checkpointer(uri: str) -> BaseCheckpointSaver:
+    from langgraph.checkpoint.postgres import PostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import ConnectionPool
+
+    if not uri:
+        raise ValueError("CHECKPOINTER_POSTGRES_URI is not set")
+    pool = ConnectionPool(conninfo=uri, max_size=CHECKPOINTER_POSTGRES_POOL_SIZE, open=True,
+                          kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row})
+    saver = PostgresSaver(pool, serde=CompactSerializer())
+    saver.setup()
+    return ThreadedCheckpointSaver(saver)
+
+
+def create_checkpointer(backend: Optional[str] = None, sqlite_path: Optional[str] = None,
+                        postgres_uri: Optional[str] = None) -> BaseCheckpointSaver:
+    """
+    Build a checkpointer for the given backend.
+
+    Args:
+        backend: "memory", "sqlite" or "postgres"; defaults to CHECKPOINTER_BACKEND
+        sqlite_path: SQLite file, defaults to CHECKPOINTER_SQLITE_PATH
+        postgres_uri: Postgres connection string, defaults to CHECKPOINTER_POSTGRES_URI
+    """
+    backend = (backend or CHECKPOINTER_BACKEND).lower()
+    if backend == "memory":
+        return BoundedMemorySaver(serde=CompactSerializer())
+    if backend == "sqlite":
+        return _sqlite_checkpointer(sqlite_path or CHECKPOINTER_SQLITE_PATH)
+    if backend == "postgres":
+        return _postgres_checkpointer(postgres_uri or CHECKPOINTER_POSTGRES_URI)
+    raise ValueError(f"Unknown checkpointer backend '{backend}', expected memory, sqlite or postgres")
+
+
+def list_thread_ids(checkpointer: BaseCheckpointSaver, filter: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Thread ids with checkpoints in the root namespace, most recently written first."""
+    thread_ids: List[str] = []
+    seen = set()
+    for checkpoint in checkpointer.list(None, filter=filter):
+        configurable = checkpoint.config["configurable"]
+        thread_id = configurable["thread_id"]
+        if configurable.get("checkpoint_ns", "") == "" and thread_id not in seen:
+            seen.add(thread_id)
+            thread_ids.append(thread_id)
+    return thread_ids
+
+
+async def alist_thread_ids(checkpointer: BaseCheckpointSaver,
+                           filter: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Async variant of list_thread_ids; durable savers read their checkpoints in a worker thread."""
+    thread_ids: List[str] = []
+    seen = set()
+    async for checkpoint in checkpointer.alist(None, filter=filter):
+        configurable = checkpoint.config["configurable"]
+        thread_id = configurable["thread_id"]
+        if configurable.get("checkpoint_ns", "") == "" and thread_id not in seen:
+            seen.add(thread_id)
+            thread_ids.append(thread_id)
+    return thread_ids
+
+
+def pin_thread(checkpointer: BaseCheckpointSaver, thread_id, pinned: bool = True):
+    """Keep a thread from being evicted; a no-op for checkpointers that never evict."""
+    pin = getattr(checkpointer, "pin_thread", None)
+    if pin is not None:
+        pin(str(thread_id), pinned)
+
+
+_default_checkpointer: Optional[BaseCheckpointSaver] = None
+_default_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer() -> BaseCheckpointSaver:
+    """Return the process-wide checkpointer, creating it on first use."""
+    global _default_checkpointer
+    if _default_checkpointer is None:
+        with _default_checkpointer_lock:
+            if _default_checkpointer is None:
+                _default_checkpointer = create_checkpointer()
+    return _default_checkpointer
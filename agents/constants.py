@@ -2,5 +2,8 @@ INITIAL_RESEARCH = "initial-research"
 HALLUCINATION_GRADER ="hallucination_grader"
 RESEARCH_REVIEWER="research-reviewer"
 RESPONSE_GRADER="response_grader"
+GRADING_DECISION="grading_decision"
 HUMAN_FEEDBACK = "human_feedback"
-INITIAL_PLAN="initial-plan"
\ No newline at end of file
+INITIAL_PLAN="initial-plan"
+DEEP_RESEARCH_CONCURRENCY = 4  # max topics researched at the same time
+AWAITING_HUMAN_FEEDBACK = "AwaitingHumanFeedback"  # execution status of a task parked for review
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langgraph.graph import StateGraph
+
+# Process-wide cache of compiled graphs, keyed by graph definition, checkpointer and interrupts
+_compiled_graphs: Dict[Tuple[Any, ...], Tuple[Any, Any]] = {}
+# Structure hash of the last PNG rendered for each output path
+_rendered_hashes: Dict[str, str] = {}
+_lock = threading.Lock()
+
+
+def _export_enabled() -> bool:
+    """Graph visualization is opt-in via the EXPORT_GRAPH_PNG environment variable."""
+    return os.getenv("EXPORT_GRAPH_PNG", "").lower() in ("1", "true", "yes")
+
+
+def get_compiled_graph(name: str, build_workflow: Callable[[], StateGraph], checkpointer=None,
+                       interrupt_before: Optional[List[str]] = None, png_path: Optional[str] = None):
+    """
+    Return the compiled graph for the given definition, compiling it only on first use.
+
+    Args:
+        name: Name of the graph definition (e.g. "initial_researcher")
+        build_workflow: Callable returning the uncompiled StateGraph
+        checkpointer: Checkpointer to compile with; each checkpointer gets its own compiled graph
+        interrupt_before: Nodes to interrupt before
+        png_path: Where to export the Mermaid PNG when EXPORT_GRAPH_PNG is enabled
+
+    Returns:
+        The compiled graph, shared by every caller in the process
+    """
+    # Bound methods are keyed by their function so every agent instance shares one graph
+    definition = getattr(build_workflow, "__func__", build_workflow)
+    definition = f"{getattr(definition, '__module__', '')}.{getattr(definition, '__qualname__', name)}"
+    key = (name, definition, id(checkpointer) if checkpointer is not None else None,
+           tuple(interrupt_before or ()))
+
+    with _lock:
+        cached = _compiled_graphs.get(key)
+        if cached is None:
+            print(f"Compiling graph '{name}'...")
+            workflow = build_workflow()
+            graph = workflow.compile(checkpointer=checkpointer, interrupt_before=interrupt_before)
+            # Keep a reference to the checkpointer so its id cannot be reused by another object
+            cached = (graph, checkpointer)
+            _compiled_graphs[key] = cached
+
+    graph = cached[0]
+    if png_path and _export_enabled():
+        export_graph_png(graph, png_path)
+    return graph
+
+
+def graph_structure_hash(graph) -> str:
+    """Hash of the graph's nodes and edges, rendered locally as Mermaid text."""
+    mermaid = graph.get_graph().draw_mermaid()
+    return hashlib.sha256(mermaid.encode("utf-8")).hexdigest()
+
+
+def export_graph_png(graph, output_file_path: str) -> bool:
+    """
+    Render the graph to a PNG, skipping the remote render when the structure is unchanged.
+
+    The structure hash is kept next to the PNG (``<png>.sha256``) so the check also
+    holds across process restarts.
+
+    Returns:
+        True if the PNG was (re-)rendered, False if the existing file is up to date
+    """
+    digest = graph_structure_hash(graph)
+    hash_path = f"{output_file_path}.sha256"
+
+    if _rendered_hashes.get(output_file_path) == digest:
+        return False
+    if os.path.exists(output_file_path) and os.path.exists(hash_path):
+        with open(hash_path, "r", encoding="utf-8") as hash_file:
+            if hash_file.read().strip() == digest:
+                _rendered_hashes[output_file_path] = digest
+                return False
+
+    try:
+        graph.get_graph().draw_mermaid_png(output_file_path=output_file_path)
+    except Exception as e:
+        print(f"Could not render graph to {output_file_path}: {e}")
+        return False
+
+    with open(hash_path, "w", encoding="utf-8") as hash_file:
+        hash_file.write(digest)
+    _rendered_hashes[output_file_path] = digest
+    print(f"Rendered graph to {output_file_path}")
+    return True
+
+
+def clear_graph_registry():
+    """Drop every compiled graph, e.g. after changing a graph definition in tests."""
+    with _lock:
+        _compiled_graphs.clear()
+        _rendered_hashes.clear()
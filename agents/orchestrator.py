@@ -5,10 +5,16 @@ import time
 import datetime
 
 
+from .checkpoint_retention import start_compaction
+from .checkpointer import alist_thread_ids, pin_thread
+from .constants import AWAITING_HUMAN_FEEDBACK
+from .graph_registry import get_compiled_graph
 from .human import HumanAgent
 from .planner import PlannerAgent
 from .publisher import PublisherAgent
-from .researcher.research import ResearchAgent
+from .researcher.research import ResearchAgent, get_default_checkpointer
+from .researcher.runtime.task_context import get_throttle_seconds, reset_task_stats, task_scope
+from .researcher.runtime.usage_ledger import get_usage_ledger
 from .writer import WriterAgent
 from memory.agent_state import AgentState
 from request import RequestedTask
@@ -19,6 +25,7 @@ class OrchestratorAgent:
         """Agent responsible for managing and coordinating other agents."""
         request["task_id"] = self._generate_task_id()
         self.request = request
+        self.usage_summary = None
 
     def _generate_task_id(self):
         # Currently time based, but can be any unique identifier
@@ -61,7 +68,15 @@ class OrchestratorAgent:
         return workflow
     
     def _add_workflow_edges(self, workflow):
-        workflow.add_edge('researcher', 'deep_researcher')
+        # A task waiting for human feedback ends here; resume_research_task picks it up again
+        workflow.add_conditional_edges(
+            'researcher',
+            lambda state: "parked" if state.get("execution_status") == AWAITING_HUMAN_FEEDBACK else "continue",
+            {
+                "continue": 'deep_researcher',
+                "parked": END
+            }
+        )
         
         ## This will be used for human feedback
         # workflow.add_edge('deep_researcher', 'human')
@@ -87,31 +102,147 @@ class OrchestratorAgent:
         message = f"Starting the research process for query '{self.task.get('query')}'..."
         print(message)
 
+    def _compiled_app(self):
+        # Checkpointed, so a task parked for human feedback can be resumed from any instance
+        return get_compiled_graph("orchestrator", self.init_research_team,
+                                  checkpointer=get_default_checkpointer(), png_path="orchestrator.png")
+
+    @staticmethod
+    def _task_config(task_id):
+        return {
+            "configurable": {
+                "thread_id": task_id
+            },
+            # Marks the task's own thread, so it can be found again after a restart
+            "metadata": {"research_task_id": str(task_id)}
+        }
+
+    @staticmethod
+    def _restore_budget(task_id, values):
+        # The ledger lives in memory; after a restart the budget comes back from the checkpoint
+        task = values.get("task") or {}
+        task = task.get("task", task) if isinstance(task, dict) else {}
+        get_usage_ledger().set_budget(task_id, task.get("budget"))
+
+    def _report_usage(self, task_id):
+        ledger = get_usage_ledger()
+        print(f"Task {task_id} was throttled by the rate limiter for {get_throttle_seconds(task_id):.1f}s")
+        # Usage of the task, broken down by node and model
+        self.usage_summary = ledger.summary(task_id)
+        print(ledger.format_summary(task_id))
+        # Reported: release the task's entries, so a long-lived process does not keep every task it ran.
+        # A parked task starts counting again when it resumes, with its budget restored from the checkpoint
+        ledger.reset(task_id)
+        reset_task_stats(task_id)
+
     async def run_research_task(self,state: AgentState):
-        """Run a research task by coordinating with other agents."""
-        research_team = self.init_research_team()
-        app = research_team.compile()
-        app.get_graph().draw_mermaid_png(output_file_path="orchestrator.png")
+        """
+        Run a research task by coordinating with other agents.
+
+        Returns the final state. When the research needs human feedback the task
+        is parked instead: the returned state has execution_status
+        AWAITING_HUMAN_FEEDBACK and resume_research_task continues it later.
+        """
+        app = self._compiled_app()
         # await self._log_research_start()
 
         task = state.get("task", {})
         task_id = task.get("task_id", "default-task-id")
 
-        config = {
-            "configurable": {
-                "thread_id": task_id
-            }
-        }
+        config = self._task_config(task_id)
         print(f"Running research task with request: {state}")
 
-        result = await app.ainvoke({"task": state}, config=config)
+        get_usage_ledger().set_budget(task_id, task.get("budget"))
+
+        # Every call made for this task is attributed to it: token usage, searches, rate limiting
+        with task_scope(task_id):
+            result = await app.ainvoke({"task": state}, config=config)
+        if result.get("execution_status") == AWAITING_HUMAN_FEEDBACK:
+            # The task's own graph has ended; keep a bounded checkpointer from evicting it while it waits
+            pin_thread(get_default_checkpointer(), task_id)
+            print(f"Research task {task_id} is parked until human feedback arrives.")
+        else:
+            print(f"Research task completed with result: {result}")
+        self._report_usage(task_id)
+        return result
+
+    async def resume_unfinished_tasks(self):
+        """
+        Resume every task that stopped mid-run, e.g. because the process crashed
+        or restarted, from its last completed node. Tasks parked for human
+        feedback are left waiting.
+
+        Returns the final state of each resumed task, keyed by task id.
+        """
+        app = self._compiled_app()
+        checkpointer = get_default_checkpointer()
+        results = {}
+        # Scanning the checkpoints of a durable backend must not hold up the event loop
+        for thread_id in await alist_thread_ids(checkpointer):
+            config = self._task_config(thread_id)
+            latest = await checkpointer.aget_tuple(config)
+            # Nested research threads share the checkpointer; only the tasks' own threads are resumed
+            if latest is None or latest.metadata.get("research_task_id") != str(thread_id):
+                continue
+            snapshot = await app.aget_state(config)
+            if not snapshot.next:
+                continue
+            print(f"Resuming research task {thread_id} at {snapshot.next}")
+            self._restore_budget(thread_id, snapshot.values)
+            with task_scope(thread_id):
+                results[thread_id] = await app.ainvoke(None, config=config)
+            self._report_usage(thread_id)
+        return results
+
+    async def resume_research_task(self, task_id, feedback: str):
+        """
+        Resume a task parked for human feedback.
+
+        "accept" lets the task continue with deep research, writing and
+        publishing; other feedback revises the initial research, after which
+        the task parks again for another review.
+
+        Returns the task's state, as run_research_task does.
+        """
+        app = self._compiled_app()
+        config = self._task_config(task_id)
+        snapshot = await app.aget_state(config)
+        if snapshot.values.get("execution_status") != AWAITING_HUMAN_FEEDBACK:
+            raise ValueError(f"Task {task_id} is not waiting for human feedback")
+        self._restore_budget(task_id, snapshot.values)
+
+        with task_scope(task_id):
+            research_report = await ResearchAgent().resume_with_feedback(task_id, feedback)
+            if research_report is None:
+                print(f"Research task {task_id} is parked until the revised research is reviewed.")
+                self._report_usage(task_id)
+                return snapshot.values
+
+            # Continue the orchestrator as if the researcher node had just finished
+            await app.aupdate_state(config, {"initial_research": research_report,
+                                             "execution_status": "InitialResearch"}, as_node="researcher")
+            result = await app.ainvoke(None, config=config)
+        pin_thread(get_default_checkpointer(), task_id, pinned=False)
         print(f"Research task completed with result: {result}")
-        # return result
+        self._report_usage(task_id)
+        return result
 
 
 if __name__ == "__main__":
     request = RequestedTask(task_id=1, query="What is LangGraph?", source="web", verbose=True)
     orchestrator = OrchestratorAgent(request)
-    asyncio.run(orchestrator.run_research_task({"task": {"query": "What is the advantage of AI and LLM in medical science ?", "source": "web", "verbose": True, "task_id": "task-123"}}))
+
+    async def run_from_terminal():
+        # Pick up whatever a previous run left unfinished before starting new work
+        await orchestrator.resume_unfinished_tasks()
+        # Old and finished threads are deleted in the background while tasks run
+        start_compaction(get_default_checkpointer())
+        result = await orchestrator.run_research_task({"task": {"query": "What is the advantage of AI and LLM in medical science ?", "source": "web", "verbose": True, "task_id": "task-123"}})
+        # Reading the terminal happens off the event loop, so other tasks keep running meanwhile
+        while result.get("execution_status") == AWAITING_HUMAN_FEEDBACK:
+            feedback = await asyncio.to_thread(input, "Enter your feedback: ")
+            result = await orchestrator.resume_research_task("task-123", feedback)
+
+    asyncio.run(run_from_terminal())
     print("Workflow created successfully.")
     # You can now run the workflow or further process it as needed.
\ No newline at end of file
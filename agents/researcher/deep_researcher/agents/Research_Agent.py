@@ -1,7 +1,8 @@
 from typing import Any, Dict
 from agents.researcher.deep_researcher.memory.deep_researcher_state import ResearchState
 from agents.researcher.memory.research_topics import Topic
-from agents.researcher.deep_researcher.chains.deep_research_chain import research_chain
+from agents.researcher.deep_researcher.chains.deep_research_chain import get_research_chain
+from agents.researcher.runtime.revision_loop import start_attempt
 
 class ResearchAgent:
     
@@ -31,14 +32,14 @@ class ResearchAgent:
         try:
             if existing_topic_details is not None:
                 print("Previous research found, including history in prompt")
-                response = research_chain.invoke({
+                response = await get_research_chain().ainvoke({
                     "query": query,
                     "topic": topic_obj,
                     "history": existing_topic_details
                 })
             else:
                 print("No previous research found, proceeding without history")
-                response = research_chain.invoke({
+                response = await get_research_chain().ainvoke({
                     "query": query,
                     "topic": topic_obj,
                 })
@@ -47,6 +48,7 @@ class ResearchAgent:
             merged_research_result = self._merge_research_results(research_result, response)
             
             return {
+                **start_attempt(state),
                 "query": query,
                 "research_result": merged_research_result,
                 "research_state": "DeepResearch",
@@ -57,6 +59,7 @@ class ResearchAgent:
             from agents.researcher.memory.research_topics import RelatedTopics
             fallback_response = RelatedTopics(topics=[])
             return {
+                **start_attempt(state),
                 "query": query,
                 "research_result": fallback_response,
                 "research_state": "DeepResearch",
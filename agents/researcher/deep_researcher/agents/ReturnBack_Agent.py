@@ -1,5 +1,6 @@
 from typing import Any, Dict
 from agents.researcher.deep_researcher.memory.deep_researcher_state import ResearchState
+from agents.researcher.runtime.revision_loop import MAX_DEEP_RESEARCH_REVISIONS, loop_exit_reason
 
 
 class ReturnBack_Agent:
@@ -18,6 +19,12 @@ class ReturnBack_Agent:
         print("Returning back research...")  
         research_result = state.get("research_result")
         print(f"Returning back with research result: {research_result}")
+        # The graders' routers ended the loop for this reason; it is kept in the final state
+        revise = bool(state.get("is_hallucinationed") or state.get("revise_research"))
+        reason = loop_exit_reason(state, revise, MAX_DEEP_RESEARCH_REVISIONS)
+        print(f"Research loop ended after {state.get('research_attempts') or 0} attempts: {reason}")
+        # The research result is already in the state; writing it again would only checkpoint it again
         return {
-            "research_result": research_result,
+            "research_state": "ReturnBack",
+            "loop_exit_reason": reason,
         }
\ No newline at end of file
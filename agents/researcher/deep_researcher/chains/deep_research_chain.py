@@ -1,15 +1,24 @@
 from dotenv import load_dotenv
+from functools import lru_cache
+import contextlib
+import contextvars
 import os
-from langchain_openai import ChatOpenAI
+import re
+from agents.researcher.llm.llm_provider import get_chat_model
 from langchain.prompts import PromptTemplate
-from agents.researcher.initial_researcher.tools.tavily_search import SearchUsingTavily
-from agents.researcher.deep_researcher.tools.enhanced_tavily_search import SearchUsingTavilyEnhanced
-from langchain.agents import (create_react_agent, Tool, AgentExecutor)
+from agents.researcher.initial_researcher.tools.tavily_search import (
+    SearchUsingTavily, SearchUsingTavilyAsync, asearch_results, search_results)
+from agents.researcher.deep_researcher.tools.enhanced_tavily_search import SearchUsingTavilyEnhanced, SearchUsingTavilyEnhancedAsync
+from langchain.agents import (Tool, AgentExecutor)
 from langchain_core.runnables import RunnableLambda
 from agents.researcher.memory.research_topics import RelatedTopics, Topic
-from langchain import hub
+from agents.researcher.llm.react_prompt import get_react_prompt
+from agents.researcher.llm.context_packer import ContextPacker, PromptPart
+from agents.researcher.llm.react_scratchpad import create_bounded_react_agent
+from agents.researcher.llm.tokenizer import get_token_counter, get_tokenizer
+from agents.researcher.tools.observation_compressor import compress_search_results
+from agents.researcher.tools.observation_format import format_search_observation, resolve_sources, source_table
 from agents.researcher.deep_researcher.chains.flexible_output_parser import FlexibleReActOutputParser
-import tiktoken
 import logging
 
 # Configure logging for token monitoring
@@ -17,8 +26,6 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 load_dotenv()
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY');
-OPENAI_API_BASEURL = os.getenv('OPENAI_API_BASE');
 OPENAI_MODEL = os.getenv('LLM_MODEL');
 
 # Token management configuration
@@ -26,43 +33,36 @@ MAX_TOKENS_PER_REQUEST = 4000  # Conservative limit for response generation
 MAX_CONTEXT_TOKENS = 12000     # Leave room for response in 16k context window
 MAX_SEARCH_RESULTS = 3         # Reduced from 7 to control payload size
 MAX_HISTORY_LENGTH = 2000      # Limit history context
+MAX_AGENT_ITERATIONS = 4       # The scratchpad is capped, so extra steps no longer grow every prompt
 
-# Initialize tokenizer for the model
-try:
-    tokenizer = tiktoken.encoding_for_model(OPENAI_MODEL if OPENAI_MODEL else "gpt-3.5-turbo")
-except KeyError:
-    # Fallback for unknown models
-    tokenizer = tiktoken.get_encoding("cl100k_base")
+@lru_cache(maxsize=None)
+def get_context_packer() -> ContextPacker:
+    """Packer over the shared, memoized token counter; the tokenizer is loaded on first use"""
+    return ContextPacker(get_token_counter())
 
 def count_tokens(text: str) -> int:
     """Count tokens in a text string"""
     if not text:
         return 0
-    return len(tokenizer.encode(str(text)))
+    return get_context_packer().counter.count(str(text))
 
 def truncate_text_by_tokens(text: str, max_tokens: int) -> str:
     """Truncate text to fit within token limit"""
     if not text:
         return text
     
-    tokens = tokenizer.encode(text)
+    # The encoding is memoized: counting the text first does not encode it again here
+    text = str(text)
+    counter = get_context_packer().counter
+    tokens = counter.encode(text)
     if len(tokens) <= max_tokens:
         return text
     
     # Truncate tokens and decode back to text
-    truncated_tokens = tokens[:max_tokens]
-    truncated_text = tokenizer.decode(truncated_tokens)
-    logger.info(f"Truncated text from {len(tokens)} to {len(truncated_tokens)} tokens")
+    truncated_text = counter.decode(tokens[:max_tokens])
+    logger.info(f"Truncated text from {len(tokens)} to {max_tokens} tokens")
     return truncated_text
 
-llm = ChatOpenAI(
-    model_name=OPENAI_MODEL,
-    openai_api_key= OPENAI_API_KEY,
-    openai_api_base= OPENAI_API_BASEURL,
-    temperature=0.0,  # Set temperature to 0 for deterministic output
-    max_tokens=MAX_TOKENS_PER_REQUEST,  # Limit response tokens
-)
-
 template = """Given the query {query} and related topic {topic}, generate a list of related topics with a detail description of around 150 words and source from where the detail is taken.
 
 Previous research context (if available):
@@ -78,7 +78,7 @@ CRITICAL: You must return ONLY a valid JSON object using EXACTLY three backticks
         {{
             "topic": "<related topic>",
             "description": "<brief description of the related topic (max 150 words)>",
-            "source": "<source of the information>"
+            "source": "<source of the information: the id of the search result, e.g. S1>"
         }}
     ]
 }}
@@ -102,70 +102,126 @@ def search_historical_data(query: str) -> str:
     # For now, return a placeholder response
     return f"Historical search for '{query}': No previous research found on this topic."
 
-# Global variables to store context (this is a workaround for agent limitations)
-_current_query = ""
-_current_topic_context = {}
+# The query and topic the running research is for, read by the context-aware search tool.
+# A context variable rather than module globals: each chain invocation sets its own, and the
+# tools it calls (asyncio tasks or executor threads) see that one, however many run at once
+_search_context = contextvars.ContextVar("deep_research_search_context", default=("", {}))
 
 def set_search_context(query: str, topic_context: dict):
-    """Set global context for searches"""
-    global _current_query, _current_topic_context
-    _current_query = query
-    _current_topic_context = topic_context
+    """Set the search context for the current invocation and the tools it calls"""
+    _search_context.set((query, topic_context))
 
-def context_aware_search(topic_input: str) -> str:
-    """
-    Context-aware search that uses globally available context information
-    Optimized for reduced payload size and token efficiency
-    """
-    global _current_query, _current_topic_context
-    
-    # Create enhanced search input with reduced scope
+@contextlib.contextmanager
+def search_context(query: str, topic_context: dict):
+    """Set the search context for the duration of the block"""
+    token = _search_context.set((query, topic_context))
+    try:
+        yield
+    finally:
+        _search_context.reset(token)
+
+def get_search_context():
+    """The (query, topic context) of the current invocation"""
+    return _search_context.get()
+
+def _topic_context(topic_input):
+    """Topic name, description and source of a Topic object or topic string"""
+    if hasattr(topic_input, 'topic'):
+        return {
+            'description': getattr(topic_input, 'description', ''),
+            'source': getattr(topic_input, 'source', ''),
+            'name': topic_input.topic
+        }
+    return {'name': str(topic_input)}
+
+def _build_context_search_input(topic_input: str) -> dict:
+    """Create enhanced search input with reduced scope from the current search context"""
+    query, topic_context = get_search_context()
     search_context = {
         'topic': topic_input,
-        'query': _current_query,
-        'description': _current_topic_context.get('description', ''),
+        'query': query,
+        'description': topic_context.get('description', ''),
         'max_results': MAX_SEARCH_RESULTS,  # Reduced from default
         'include_raw_content': False,       # Reduce payload size
     }
     
     # Remove empty values
-    search_context = {k: v for k, v in search_context.items() if v}
-    
+    return {k: v for k, v in search_context.items() if v}
+
+def _limit_search_result(result, topic_input: str, max_tokens: int, label: str):
+    """
+    The observation the agent receives for a search result, within max_tokens.
+    Tokens are counted on the formatted observation, not the raw results.
+    """
+    observation = format_search_observation(result)
+    token_count = count_tokens(observation)
+    logger.info(f"{label} result: {token_count} tokens for topic '{topic_input}'")
+    if token_count <= max_tokens:
+        return observation
+
+    # Keep the sentences most relevant to the query and topic, each under its source
+    if isinstance(result, list) and result and all(isinstance(item, dict) for item in result):
+        query, topic_context = get_search_context()
+        relevance_query = " ".join([topic_input, query, topic_context.get('description', '')])
+        # The results share the observation with its header line
+        budget = max(0, max_tokens - count_tokens(observation.splitlines()[0]))
+        observation = format_search_observation(compress_search_results(
+            result, relevance_query, budget, get_context_packer().counter.count_many))
+        token_count = count_tokens(observation)
+        logger.info(f"Compressed {label.lower()} result to {token_count} tokens")
+
+    # Truncate whatever is still too large, e.g. an error message
+    if token_count > max_tokens:
+        observation = truncate_text_by_tokens(observation, max_tokens)
+        logger.info(f"Truncated {label.lower()} result to {max_tokens} tokens")
+
+    return observation
+
+def context_aware_search(topic_input: str) -> str:
+    """
+    Context-aware search that uses globally available context information
+    Optimized for reduced payload size and token efficiency
+    """
     try:
-        result = SearchUsingTavilyEnhanced(search_context)
-        
-        # Count and log tokens for monitoring
-        token_count = count_tokens(result)
-        logger.info(f"Enhanced search result: {token_count} tokens for topic '{topic_input}'")
-        
-        # Truncate if result is too large
-        if token_count > 2000:  # Reasonable limit per search result
-            result = truncate_text_by_tokens(result, 2000)
-            logger.info(f"Truncated search result to 2000 tokens")
-        
-        return result
+        result = SearchUsingTavilyEnhanced(_build_context_search_input(topic_input))
+        # Rendered as numbered snippets with source ids, within a reasonable limit per search
+        return _limit_search_result(result, topic_input, 2000, "Enhanced search")
     except Exception as e:
         logger.error(f"Enhanced search failed: {e}")
         # Fallback to basic search
         return SearchUsingTavily(topic_input)
 
+async def acontext_aware_search(topic_input: str) -> str:
+    """
+    Async variant of context_aware_search
+    """
+    try:
+        result = await SearchUsingTavilyEnhancedAsync(_build_context_search_input(topic_input))
+        return _limit_search_result(result, topic_input, 2000, "Enhanced search")
+    except Exception as e:
+        logger.error(f"Enhanced search failed: {e}")
+        # Fallback to basic search
+        return await SearchUsingTavilyAsync(topic_input)
+
 def optimized_basic_search(topic_input: str) -> str:
     """
     Optimized basic search with token management
     """
     try:
-        result = SearchUsingTavily(topic_input)
-        
-        # Count and log tokens
-        token_count = count_tokens(result)
-        logger.info(f"Basic search result: {token_count} tokens for topic '{topic_input}'")
-        
-        # Truncate if result is too large
-        if token_count > 1500:  # Conservative limit for basic search
-            result = truncate_text_by_tokens(result, 1500)
-            logger.info(f"Truncated basic search result to 1500 tokens")
-        
-        return result
+        result = search_results(topic_input)
+        # Conservative limit for basic search
+        return _limit_search_result(result, topic_input, 1500, "Basic search")
+    except Exception as e:
+        logger.error(f"Basic search failed: {e}")
+        return f"Search failed for '{topic_input}': {str(e)}"
+
+async def aoptimized_basic_search(topic_input: str) -> str:
+    """
+    Async variant of optimized_basic_search
+    """
+    try:
+        result = await asearch_results(topic_input)
+        return _limit_search_result(result, topic_input, 1500, "Basic search")
     except Exception as e:
         logger.error(f"Basic search failed: {e}")
         return f"Search failed for '{topic_input}': {str(e)}"
@@ -174,11 +230,13 @@ tools_for_agent = [
     Tool(
         name="Enhanced Web Search for Topics",
         func=context_aware_search,
+        coroutine=acontext_aware_search,
         description="Comprehensive web search optimized for token efficiency. Considers research query, topic name, and description. Input should be the topic name. Returns focused, relevant results with controlled size.",
     ),
     Tool(
         name="Basic Web Search",
         func=optimized_basic_search,
+        coroutine=aoptimized_basic_search,
         description="Basic web search optimized for token management. Input should be a topic string. Use for simple searches when context is not needed. Results are automatically truncated for efficiency.",
     ),
     Tool(
@@ -188,25 +246,42 @@ tools_for_agent = [
     )
 ]
 
-# Use the original react prompt - it works reliably
-react_prompt = hub.pull("hwchase17/react")
+@lru_cache(maxsize=None)
+def get_agent_executor() -> AgentExecutor:
+    """Build the ReAct agent executor on first use instead of at import time"""
+    llm = get_chat_model(max_tokens=MAX_TOKENS_PER_REQUEST)  # Limit response tokens
+
+    # Create custom output parser that can handle JSON responses
+    custom_output_parser = FlexibleReActOutputParser()
+
+    # The original hwchase17/react prompt, shipped locally - it works reliably
+    # Older observations are summarized or dropped to keep the scratchpad within its cap
+    agent = create_bounded_react_agent(
+        llm=llm,
+        tools=tools_for_agent,
+        prompt=get_react_prompt(),
+        counter=get_token_counter(),
+        output_parser=custom_output_parser)
+
+    return AgentExecutor(
+        agent=agent,
+        tools=tools_for_agent, 
+        verbose=True,
+        handle_parsing_errors=True,
+        max_iterations=MAX_AGENT_ITERATIONS
+    )
+
+# Wraps the task prompt for the ReAct agent; the history appears once, inside the task prompt
+AGENT_INPUT_TEMPLATE = """Task: {task}
 
-# Create custom output parser that can handle JSON responses
-custom_output_parser = FlexibleReActOutputParser()
+IMPORTANT: Please use the available tools efficiently to gather information, then provide your Final Answer in the exact JSON format specified above.
 
-agent = create_react_agent(
-    llm=llm,
-    tools=tools_for_agent,
-    prompt=react_prompt,
-    output_parser=custom_output_parser)
+Follow this pattern:
+1. Use tools to search for information
+2. When you have sufficient information, provide your Final Answer with the JSON response"""
 
-agent_executor = AgentExecutor(
-    agent=agent,
-    tools=tools_for_agent, 
-    verbose=True,
-    handle_parsing_errors=True,
-    max_iterations=2  # Reduced from 3 to control token usage
-)
+# The fixed text of every agent input, counted once as a required part of the budget
+_AGENT_INSTRUCTIONS = template + AGENT_INPUT_TEMPLATE
 
 def format_prompt_for_agent(inputs):
     """Format the topic into the prompt template and prepare for agent executor with token management"""
@@ -214,85 +289,35 @@ def format_prompt_for_agent(inputs):
     query = inputs.get("query", "")
     history = inputs.get("history", None)
     
-    # Handle Topic object or string
+    # Handle Topic object or string; the search context itself is set by run_research_chain
     if hasattr(topic_input, 'topic'):
         # It's a Topic object
         topic_name = topic_input.topic
         topic_description = getattr(topic_input, 'description', '')
-        topic_source = getattr(topic_input, 'source', '')
         topic_str = f"{topic_name} - {topic_description}" if topic_description else topic_name
-        
-        # Set context for enhanced search
-        topic_context = {
-            'description': topic_description,
-            'source': topic_source,
-            'name': topic_name
-        }
     else:
         # It's a string
         topic_str = str(topic_input)
-        topic_context = {'name': topic_str}
-    
-    # Set the global search context for context-aware searches
-    set_search_context(query, topic_context)
-    
-    # Process and truncate history if provided
-    history_context = ""
-    if history is not None:
-        history_str = str(history)
-        history_tokens = count_tokens(history_str)
-        
-        if history_tokens > MAX_HISTORY_LENGTH:
-            history_context = truncate_text_by_tokens(history_str, MAX_HISTORY_LENGTH)
-            logger.info(f"Truncated history from {history_tokens} to {MAX_HISTORY_LENGTH} tokens")
-        else:
-            history_context = history_str
-    else:
-        history_context = "No previous research history available."
-    
-    # Create the formatted prompt
+    history_str = str(history) if history is not None else "No previous research history available."
+
+    # One budget for the whole input: each part is encoded once and cut to its share
+    packed = get_context_packer().pack([
+        PromptPart("instructions", _AGENT_INSTRUCTIONS, required=True),
+        PromptPart("query", str(query), required=True),
+        PromptPart("topic", topic_str),
+        PromptPart("history", history_str, weight=2, max_tokens=MAX_HISTORY_LENGTH),
+    ], MAX_CONTEXT_TOKENS)
+    if packed.truncated:
+        logger.info(f"Truncated {', '.join(packed.truncated)} to fit {MAX_CONTEXT_TOKENS} tokens")
+
     formatted_prompt = prompt_template.format_prompt(
         query=query, 
-        topic=topic_str, 
-        history=history_context
+        topic=packed["topic"], 
+        history=packed["history"]
     ).to_string()
+    agent_input = AGENT_INPUT_TEMPLATE.format(task=formatted_prompt)
     
-    # Count tokens in the complete prompt
-    prompt_tokens = count_tokens(formatted_prompt)
-    logger.info(f"Total prompt tokens: {prompt_tokens}")
-    
-    # Create optimized agent input with React format guidance
-    if history is not None:
-        agent_input = f"""Research Topic: {topic_str}
-
-Previous Research Context:
-{history_context}
-
-Task: {formatted_prompt}
-
-IMPORTANT: Please use the available tools efficiently to gather information, then provide your Final Answer in the exact JSON format specified above. 
-
-Follow this pattern:
-1. Use tools to search for information
-2. When you have sufficient information, provide your Final Answer with the JSON response"""
-    else:
-        agent_input = f"""Research Topic: {topic_str}
-
-Task: {formatted_prompt}
-
-IMPORTANT: Please use the available tools efficiently to gather information, then provide your Final Answer in the exact JSON format specified above.
-
-Follow this pattern:
-1. Use tools to search for information  
-2. When you have sufficient information, provide your Final Answer with the JSON response"""
-    
-    # Final token count check
-    total_tokens = count_tokens(agent_input)
-    if total_tokens > MAX_CONTEXT_TOKENS:
-        logger.warning(f"Input tokens ({total_tokens}) exceed limit ({MAX_CONTEXT_TOKENS}). Truncating...")
-        agent_input = truncate_text_by_tokens(agent_input, MAX_CONTEXT_TOKENS)
-    
-    logger.info(f"Final agent input tokens: {count_tokens(agent_input)}")
+    logger.info(f"Agent input tokens: {packed.total_tokens}")
     return {"input": agent_input}
 
 def parse_agent_response(response):
@@ -412,10 +437,39 @@ def parse_agent_response(response):
         return RelatedTopics(topics=[])
 
 
-# Create the research chain
-research_chain = (
-    RunnableLambda(format_prompt_for_agent) 
-    | agent_executor
-    | RunnableLambda(parse_agent_response)
-)
+@lru_cache(maxsize=None)
+def get_agent_chain():
+    """Prompt formatting, the agent executor and response parsing, built on first use"""
+    return (
+        RunnableLambda(format_prompt_for_agent) 
+        | get_agent_executor()
+        | RunnableLambda(parse_agent_response)
+    )
+
+def run_research_chain(inputs, config):
+    """Run the agent chain with the search context of these inputs"""
+    # The agent cites sources by the short ids of its observations; they are mapped back to urls
+    with search_context(inputs.get("query", ""), _topic_context(inputs["topic"])), source_table() as sources:
+        return resolve_sources(get_agent_chain().invoke(inputs, config), sources)
+
+async def arun_research_chain(inputs, config):
+    """Async variant of run_research_chain"""
+    # Runs in its own copy of the context, which the tool calls inherit
+    with search_context(inputs.get("query", ""), _topic_context(inputs["topic"])), source_table() as sources:
+        return resolve_sources(await get_agent_chain().ainvoke(inputs, config), sources)
+
+@lru_cache(maxsize=None)
+def get_research_chain():
+    """Create the research chain on first use; it is shared, the search context is per invocation"""
+    return RunnableLambda(run_research_chain, afunc=arun_research_chain, name="deep_research_chain")
+
+def __getattr__(name):
+    # Keep the old module-level names importable while building them lazily
+    if name == "research_chain":
+        return get_research_chain()
+    if name == "agent_executor":
+        return get_agent_executor()
+    if name == "tokenizer":
+        return get_tokenizer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
@@ -8,6 +8,8 @@ from agents.researcher.deep_researcher.agents.Response_Grader_Agent import Respo
 from agents.researcher.deep_researcher.constants import PLAN, RESEARCH, HALLUCINATION_GRADER, HUMAN_FEEDBACK, RESEARCH_REVIEWER, RESPONSE_GRADER, RETURN_BACK
 from agents.researcher.deep_researcher.memory.deep_researcher_state import ResearchState
 from agents.researcher.deep_researcher.agents.Research_Agent import ResearchAgent
+from agents.researcher.runtime.revision_loop import BUDGET, MAX_DEEP_RESEARCH_REVISIONS, PASSED, loop_exit_reason
+from agents.researcher.runtime.usage_ledger import budget_exceeded
 from langgraph.graph import StateGraph,END
 
 
@@ -40,6 +42,22 @@ def _create_workflow(agents):
     return workflow
 
 
+def _route_on_revise(revise_key: str):
+    """
+    Revise when the grader asks for it, unless the task's budget is spent, the
+    revisions are used up or the last revision did not change the topics.
+    """
+    def route(state: ResearchState) -> str:
+        reason = loop_exit_reason(state, bool(state.get(revise_key)), MAX_DEEP_RESEARCH_REVISIONS)
+        if reason is None:
+            return "revise"
+        if reason == PASSED:
+            return "continue"
+        print(f"Returning the current research: {budget_exceeded() or reason}.")
+        return "budget" if reason == BUDGET else "stop"
+    return route
+
+
 def _add_workflow_edges(workflow):
 
     workflow.set_entry_point(PLAN)
@@ -49,20 +67,24 @@ def _add_workflow_edges(workflow):
 
     workflow.add_conditional_edges(
         HALLUCINATION_GRADER,
-        lambda state: "revise" if state.get("is_hallucinationed") else "continue",
+        _route_on_revise("is_hallucinationed"),
         {
             "continue": RESEARCH_REVIEWER,
-            "revise": RESEARCH
+            "revise": RESEARCH,
+            "budget": RETURN_BACK,
+            "stop": RETURN_BACK
         }
     )
 
     ## todo
     workflow.add_conditional_edges(
         RESEARCH_REVIEWER,
-        lambda state: "revise" if state.get("revise_research") else "continue",
+        _route_on_revise("revise_research"),
         {
             "continue": RETURN_BACK,
-            "revise": RESEARCH
+            "revise": RESEARCH,
+            "budget": RETURN_BACK,
+            "stop": RETURN_BACK
         }
     )
 
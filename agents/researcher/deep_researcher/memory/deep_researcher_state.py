@@ -1,4 +1,4 @@
-from typing import Any, List, Literal, TypedDict
+from typing import Any, List, Literal, Optional, TypedDict
 
 from agents.researcher.memory.research_topics import RelatedTopics
 
@@ -15,3 +15,6 @@ class ResearchState(TypedDict):
     is_hallucinationed: bool
     revise_research: bool
     response_grader_score: bool
+    research_attempts: int  # research runs on this topic
+    previous_topic_names: List[str]  # topics of the result the latest attempt revised
+    loop_exit_reason: Optional[str]  # why the revise loop ended: passed, budget, max_revisions, converged
@@ -1,22 +1,20 @@
-from langchain_community.tools.tavily_search import TavilySearchResults
-from dotenv import load_dotenv
-from typing import Dict, Any, Union
-import json
+import logging
+from typing import Dict, Any, List, Tuple, Union
+from agents.researcher.tools.tavily_client import get_search_client
 
-def SearchUsingTavilyEnhanced(search_input: Union[str, Dict[str, Any]]) -> str:
+# Search diagnostics go to this logger; the results themselves end up in the prompt
+logger = logging.getLogger(__name__)
+
+# Parameters of the basic search used when the enhanced search fails
+FALLBACK_SEARCH_PARAMS = {"max_results": 5}
+
+# The cleaned Tavily results, or the repr of the error when both searches failed
+SearchResults = Union[List[Dict[str, Any]], str]
+
+def _build_search_request(search_input: Union[str, Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
     """
-    Enhanced search for topics using Tavily Search API with context and token management.
-    
-    Args:
-        search_input: Can be either:
-            - str: Simple topic string (backward compatibility)
-            - dict: Enhanced input with query, topic, description, max_results, include_raw_content, etc.
-    
-    Returns:
-        str: Search results from Tavily
+    Turn the tool input into a Tavily query string and search parameters.
     """
-    load_dotenv()
-
     # Default parameters
     max_results = 3  # Reduced default for token efficiency
     include_raw_content = False  # Disabled by default for smaller payloads
@@ -52,52 +50,75 @@ def SearchUsingTavilyEnhanced(search_input: Union[str, Dict[str, Any]]) -> str:
         # Fallback for unexpected input types
         search_query = str(search_input)
 
-    # Perform a search using Tavily with optimized parameters
-    search = TavilySearchResults(
-        max_results=max_results,  # Configurable based on input
-        include_answer=True,
-        include_raw_content=include_raw_content,  # Configurable to control payload size
-        include_images=False,
-        search_depth="advanced",
-        # include_domains = []
-        # exclude_domains = []
-    )
+    search_params = {
+        "max_results": max_results,  # Configurable based on input
+        "include_answer": True,
+        "include_raw_content": include_raw_content,  # Configurable to control payload size
+        "include_images": False,
+        "search_depth": "advanced",
+    }
+    return search_query, search_params
+
+
+def _log_search_metadata(result, search_query: str, search_input) -> None:
+    # Metadata about the search for debugging, logged rather than added to the results
+    logger.debug("Tavily search %r: input type %s, enhanced %s, %s results", search_query,
+                 type(search_input).__name__, isinstance(search_input, dict),
+                 len(result) if isinstance(result, list) else "no")
+
+
+def SearchUsingTavilyEnhanced(search_input: Union[str, Dict[str, Any]]) -> SearchResults:
+    """
+    Enhanced search for topics using Tavily Search API with context and token management.
+    
+    Args:
+        search_input: Can be either:
+            - str: Simple topic string (backward compatibility)
+            - dict: Enhanced input with query, topic, description, max_results, include_raw_content, etc.
+    
+    Returns:
+        list: Result dicts from Tavily (title, url, content, score), for the caller
+              to format; the repr of the error when the fallback search failed too
+    """
+    search_query, search_params = _build_search_request(search_input)
+    client = get_search_client()
 
     try:
-        result = search.invoke({
-            "args": {"query": search_query},
-            "type": "tool_call", 
-            "id": "enhanced_search", 
-            "name": "tavily"
-        })
-        
-        # Add metadata about the search for debugging
-        search_metadata = {
-            "search_query_used": search_query,
-            "original_input_type": type(search_input).__name__,
-            "enhanced_search": isinstance(search_input, dict)
-        }
-        
-        # If the result is a list, add metadata to the first result
-        if isinstance(result, list) and len(result) > 0:
-            if isinstance(result[0], dict):
-                result[0]["_search_metadata"] = search_metadata
-        
+        result = client.search(search_query, **search_params)
+        _log_search_metadata(result, search_query, search_input)
         return result
         
     except Exception as e:
         print(f"Error in enhanced Tavily search: {e}")
         # Fallback to basic search
-        basic_search = TavilySearchResults(max_results=5)
-        return basic_search.invoke({
-            "args": {"query": search_query},
-            "type": "tool_call", 
-            "id": "fallback_search", 
-            "name": "tavily"
-        })
+        try:
+            return client.search(search_query, **FALLBACK_SEARCH_PARAMS)
+        except Exception as fallback_error:
+            return repr(fallback_error)
+
+
+async def SearchUsingTavilyEnhancedAsync(search_input: Union[str, Dict[str, Any]]) -> SearchResults:
+    """
+    Async variant of SearchUsingTavilyEnhanced for tools invoked through ainvoke.
+    """
+    search_query, search_params = _build_search_request(search_input)
+    client = get_search_client()
+
+    try:
+        result = await client.asearch(search_query, **search_params)
+        _log_search_metadata(result, search_query, search_input)
+        return result
+
+    except Exception as e:
+        print(f"Error in enhanced Tavily search: {e}")
+        # Fallback to basic search
+        try:
+            return await client.asearch(search_query, **FALLBACK_SEARCH_PARAMS)
+        except Exception as fallback_error:
+            return repr(fallback_error)
 
 
-def SearchUsingTavily(topic: str) -> str:
+def SearchUsingTavily(topic: str) -> SearchResults:
     """
     Original search function for backward compatibility.
     """
@@ -0,0 +1,157 @@
+"""
+Local pre-grading of research topics, in front of the LLM graders.
+
+Each topic's description is compared with the search snippets the research was
+written from: how many of its content words the evidence covers, and how well
+the single best snippet matches. Its source is checked against allow and deny
+domain lists. Clear cases are decided here; only the uncertain middle goes on
+to the hallucination grader and research reviewer chains.
+"""
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+from urllib.parse import urlparse
+
+ACCEPT = "accept"
+REJECT = "reject"
+UNCERTAIN = "uncertain"
+
+
+def _domains(name: str, default: str) -> List[str]:
+    value = os.getenv(name, default)
+    return [domain.strip().lower().lstrip(".") for domain in value.split(",") if domain.strip()]
+
+
+# Suffix matches: "edu" covers every .edu host, "wikipedia.org" its subdomains
+GRADER_ALLOWED_DOMAINS = _domains("GRADER_ALLOWED_DOMAINS",
+                                  "wikipedia.org,arxiv.org,acm.org,ieee.org,nature.com,nih.gov,gov,edu")
+GRADER_DENIED_DOMAINS = _domains("GRADER_DENIED_DOMAINS", "example.com,localhost")
+# Share of a description's content words the evidence must cover to accept it without an LLM
+GRADER_ACCEPT_GROUNDING = float(os.getenv("GRADER_ACCEPT_GROUNDING", "0.7"))
+# Allowed domains are accepted with less coverage
+GRADER_ACCEPT_GROUNDING_ALLOWED = float(os.getenv("GRADER_ACCEPT_GROUNDING_ALLOWED", "0.5"))
+# At or below this coverage a description is taken as not grounded in the evidence
+GRADER_REJECT_GROUNDING = float(os.getenv("GRADER_REJECT_GROUNDING", "0.15"))
+
+# Sources that name no source at all
+EMPTY_SOURCES = {"", "n/a", "na", "none", "null", "unknown", "not available", "no source", "-", "tbd"}
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9\-]+")
+# Words that carry no topic, left out of overlap and ranking scores
+STOPWORDS = frozenset("""
+a about above after again against all also an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her here
+hers him his how i if in into is it its itself just like many may me might more most much must my no nor not
+now of off on once one only or other our ours out over own same she should so some such than that the their
+theirs them then there these they this those through to too under until up very was we were what when where
+which while who whom why will with would you your yours used use using well new based within without across
+""".split())
+
+
+@dataclass
+class HeuristicVerdict:
+    """Local decision on one topic; uncertain topics go to the LLM."""
+    decision: str
+    grounding: float
+    best_snippet: float
+    domain: Optional[str]
+    reason: str
+    # Rejected for its source rather than its content, which says nothing about hallucination
+    source_problem: bool = False
+
+    @property
+    def binary_score(self) -> bool:
+        # Same shape as the LLM graders' structured output, for accepted and rejected topics
+        return self.decision == ACCEPT
+
+
+def content_words(text: Any) -> Set[str]:
+    """Lower-cased content words of a text, without stopwords and one-letter tokens."""
+    return {word for word in _WORD.findall(str(text or "").lower()) if word not in STOPWORDS}
+
+
+def source_domain(source: Any) -> Optional[str]:
+    """Host name of a source given as a URL or bare domain, None for sources like "web"."""
+    source = str(source or "").strip().lower()
+    if not source:
+        return None
+    host = urlparse(source if "://" in source else f"//{source}").hostname or ""
+    if "." not in host or " " in source.split("/")[0]:
+        return None
+    return host[4:] if host.startswith("www.") else host
+
+
+def _matches(domain: str, domains: Iterable[str]) -> bool:
+    return any(domain == listed or domain.endswith("." + listed) for listed in domains)
+
+
+class HeuristicGrader:
+    """Scores topics against their search evidence and decides the confident cases."""
+
+    def __init__(self, allowed_domains: Sequence[str] = GRADER_ALLOWED_DOMAINS,
+                 denied_domains: Sequence[str] = GRADER_DENIED_DOMAINS,
+                 accept_grounding: float = GRADER_ACCEPT_GROUNDING,
+                 accept_grounding_allowed: float = GRADER_ACCEPT_GROUNDING_ALLOWED,
+                 reject_grounding: float = GRADER_REJECT_GROUNDING):
+        self.allowed_domains = list(allowed_domains)
+        self.denied_domains = list(denied_domains)
+        self.accept_grounding = accept_grounding
+        self.accept_grounding_allowed = accept_grounding_allowed
+        self.reject_grounding = reject_grounding
+
+    def grade_topic(self, topic, evidence: Sequence[Dict[str, Any]]) -> HeuristicVerdict:
+        source = str(topic.source or "").strip()
+        domain = source_domain(source)
+        if source.lower() in EMPTY_SOURCES:
+            return HeuristicVerdict(REJECT, 0.0, 0.0, None, "no source given", source_problem=True)
+        if domain and _matches(domain, self.denied_domains):
+            return HeuristicVerdict(REJECT, 0.0, 0.0, domain, f"source domain {domain} is denied",
+                                    source_problem=True)
+
+        words = content_words(f"{topic.topic} {topic.description}")
+        snippets = [content_words(f"{item.get('title', '')} {item.get('content', '')}") for item in evidence]
+        if not words or not snippets:
+            return HeuristicVerdict(UNCERTAIN, 0.0, 0.0, domain, "no evidence to compare with")
+
+        covered = set().union(*snippets) & words
+        grounding = len(covered) / len(words)
+        best_snippet = max(len(words & snippet) / len(words) for snippet in snippets)
+        # A source the search actually returned is itself evidence
+        cited = bool(domain) and any(source_domain(item.get("url")) == domain for item in evidence)
+        allowed = bool(domain) and (_matches(domain, self.allowed_domains) or cited)
+
+        threshold = self.accept_grounding_allowed if allowed else self.accept_grounding
+        if grounding >= threshold:
+            return HeuristicVerdict(ACCEPT, grounding, best_snippet, domain,
+                                    f"{grounding:.0%} of the description is in the evidence")
+        if grounding <= self.reject_grounding and not allowed:
+            return HeuristicVerdict(REJECT, grounding, best_snippet, domain,
+                                    f"only {grounding:.0%} of the description is in the evidence")
+        return HeuristicVerdict(UNCERTAIN, grounding, best_snippet, domain, "grounding is inconclusive")
+
+    def grade_topics(self, topics: Sequence[Any], evidence: Sequence[Dict[str, Any]]) -> List[HeuristicVerdict]:
+        return [self.grade_topic(topic, evidence) for topic in topics]
+
+
+def grade_result(verdicts: Sequence[HeuristicVerdict]) -> Optional[bool]:
+    """
+    Whether a whole research result is grounded: True when every topic was
+    accepted, False when most are not in the evidence, None to ask the LLM.
+    """
+    if not verdicts:
+        return None
+    if all(verdict.decision == ACCEPT for verdict in verdicts):
+        return True
+    ungrounded = sum(verdict.decision == REJECT and not verdict.source_problem for verdict in verdicts)
+    if ungrounded * 2 > len(verdicts):
+        return False
+    return None
+
+
+_default_grader = HeuristicGrader()
+
+
+def get_heuristic_grader() -> HeuristicGrader:
+    """Return the process-wide grader configured from the environment."""
+    return _default_grader
@@ -1,6 +1,9 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from agents.researcher.initial_researcher.memory.initial_research_state import InitialResearchState
-from agents.researcher.initial_researcher.chains.hallucination_grader_chain import hallucination_grader_chain
+from agents.researcher.initial_researcher.chains.hallucination_grader_chain import (
+    GradeHallucinations, get_hallucination_grader_chain)
+from agents.researcher.grading.heuristic_grader import UNCERTAIN, get_heuristic_grader, grade_result
+from agents.researcher.runtime.usage_ledger import get_usage_ledger
 
 class HallucinationGraderAgent:
     """Agent responsible for grading hallucinations in research."""
@@ -15,18 +18,51 @@ class HallucinationGraderAgent:
         query = state.get("query")
         research_result= state.get("research_result")
 
-        score= hallucination_grader_chain.invoke({
+        pregraded = self._pregrade(state)
+        if pregraded is not None:
+            return self._build_state_update(pregraded)
+
+        score= get_hallucination_grader_chain().invoke({
             "query": query,
             "topics": research_result
         })
         print(f"verify_hallucinations Score: {score}")
 
-        return {
+        return self._build_state_update(score)
+
+    async def averify_hallucinations(self, state: InitialResearchState) -> Dict[str, Any]:
+        """Async variant of verify_hallucinations that does not block the event loop."""
+        print("Grading hallucinations (async)...")
+        query = state.get("query")
+        research_result = state.get("research_result")
+
+        pregraded = self._pregrade(state)
+        if pregraded is not None:
+            return self._build_state_update(pregraded)
+
+        score = await get_hallucination_grader_chain().ainvoke({
             "query": query,
-            "research_result": research_result,
+            "topics": research_result
+        })
+        print(f"verify_hallucinations Score: {score}")
+
+        return self._build_state_update(score)
+
+    def _pregrade(self, state: InitialResearchState) -> Optional[Any]:
+        """A local verdict when the search evidence settles the result, else None for the LLM."""
+        research_result = state.get("research_result")
+        verdicts = get_heuristic_grader().grade_topics(research_result.topics, state.get("search_evidence") or [])
+        grounded = grade_result(verdicts)
+        if grounded is None:
+            return None
+        print(f"verify_hallucinations pre-graded: {grounded}")
+        get_usage_ledger().record_pregrade(sum(verdict.decision != UNCERTAIN for verdict in verdicts), 1)
+        return GradeHallucinations(binary_score=grounded)
+
+    def _build_state_update(self, score) -> Dict[str, Any]:
+        # Only the channels that changed: an unchanged research_result would be checkpointed again
+        return {
             "research_state": "HallucinationGraded",
             "human_feedback": None,
-            "hallucination_score": score
+            "hallucination_score": score.binary_score
         }
-
-        print(f"verify_hallucinations Query: {query}")
\ No newline at end of file
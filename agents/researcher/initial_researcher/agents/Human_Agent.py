@@ -2,13 +2,10 @@ from typing import Any, Dict
 from agents.constants import HUMAN_FEEDBACK
 from agents.researcher.initial_researcher.memory.initial_research_state import InitialResearchState
 
-### Will comeback to veify the use of this agent
 ### The HumanAgent is responsible for providing human feedback in the research process.
-### What I expect is the While loop in resercher.py to be here 
-### Todo Will came back later to verify the use of this agent
-### The problem with current approach is that since it has while loop in researcher.py,'
-### it will require be to in single executiom i.e the user cannot comeback later to provide feedback which may be required
-### This agent may help to solve that problem
+### The initial research graph interrupts before this node, so a task waiting for a reviewer is
+### parked in the checkpointer instead of blocking a worker on input(). When the reviewer answers,
+### ResearchAgent.resume_with_feedback applies the feedback as this node and resumes the graph.
 ### Do not delete this agent
 class HumanAgent:
     """Agent responsible for human feedback in the research process."""
@@ -18,9 +15,9 @@ class HumanAgent:
         print("Human Agent initialized.")
     
     def get_human_feedback(self,state: InitialResearchState) -> Dict[str, Any]:
-        # Implementation of human feedback logic
+        """Record the reviewer's feedback; _decide_next_step then accepts or revises the research."""
         print("Running human feedback...")
-        # feedback = state.get(HUMAN_FEEDBACK)
-        # print(f"{HUMAN_FEEDBACK} Query: {feedback}")
-        # # Simulate human feedback process
-        # return {"human_feedback": feedback}  # Example feedback
\ No newline at end of file
+        feedback = (state.get(HUMAN_FEEDBACK) or "").strip()
+        print(f"{HUMAN_FEEDBACK} Query: {feedback}")
+        # A revision the reviewer asks for starts a fresh count of grader revisions
+        return {HUMAN_FEEDBACK: feedback, "research_state": "HumanFeedback", "research_attempts": 0}
@@ -21,8 +21,7 @@ class InitialPlannerAgent:
 
 
 
-        # Return as dict for LangGraph compatibility
+        # Return as dict for LangGraph compatibility; research_result is unchanged and not written again
         return {
-            "research_result": research_result,
             "research_state": "InitialPlanner",
         }
\ No newline at end of file
@@ -1,6 +1,11 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+from agents.researcher.grading.heuristic_grader import ACCEPT, REJECT, get_heuristic_grader
 from agents.researcher.initial_researcher.memory.initial_research_state import InitialResearchState
-from agents.researcher.initial_researcher.chains.initial_research_chain import research_chain
+from agents.researcher.initial_researcher.chains.initial_research_chain import get_research_chain
+from agents.researcher.memory.research_topics import RelatedTopics, Topic
+from agents.researcher.runtime.revision_loop import normalize_topic_name, start_attempt
+from agents.researcher.runtime.search_evidence import collect_search_evidence, merge_search_evidence
+from agents.researcher.tools.observation_format import resolve_sources, source_table
 
 class InitialResearchAgent:
     """Agent responsible for conducting initial research."""
@@ -11,36 +16,128 @@ class InitialResearchAgent:
         # Implementation of initial research logic
         print("Running initial research...")
         query = state.get("query")
-        research_result = state.get("research_result")
+        revision = self._plan_revision(state)
         
-        try:
-            # Check if research_result exists and prepare the request accordingly
-            if research_result is not None:
-                print("Previous research found, including history in prompt")
-                response = research_chain.invoke({
-                    "topic": query,
-                    "history": research_result
-                })
-            else:
-                print("No previous research found, proceeding without history")
-                response = research_chain.invoke({
-                    "topic": query
-                })
-        except Exception as e:
-            print(f"Error in research chain: {e}")
-            # Create a fallback response
-            from agents.researcher.memory.research_topics import RelatedTopics, Topic
-            response = RelatedTopics(topics=[
-                Topic(
-                    topic=f"Research on {query}",
-                    description=f"Initial research topic: {query}. Error occurred during research process.",
-                    source="System fallback"
-                )
-            ])
+        # The search results the topics are written from, for the graders to check them against;
+        # the topics cite them by source id, mapped back to urls here
+        with collect_search_evidence() as evidence, source_table() as sources:
+            try:
+                response = get_research_chain().invoke(self._build_chain_input(query, state, revision))
+            except Exception as e:
+                print(f"Error in research chain: {e}")
+                response = self._fallback_response(query, revision)
+        response = resolve_sources(response, sources)
         
+        return {**start_attempt(state), **self._build_state_update(query, response, evidence, revision, state)}
+
+    async def arun_initial_research(self, state: InitialResearchState) -> Dict[str, Any]:
+        """Async variant of run_initial_research that does not block the event loop."""
+        print("Running initial research (async)...")
+        query = state.get("query")
+        revision = self._plan_revision(state)
+
+        with collect_search_evidence() as evidence, source_table() as sources:
+            try:
+                response = await get_research_chain().ainvoke(self._build_chain_input(query, state, revision))
+            except Exception as e:
+                print(f"Error in research chain: {e}")
+                response = self._fallback_response(query, revision)
+        response = resolve_sources(response, sources)
+
+        return {**start_attempt(state), **self._build_state_update(query, response, evidence, revision, state)}
+
+    def _plan_revision(self, state: InitialResearchState) -> Optional[Dict[str, Any]]:
+        """
+        What a grader-requested revise pass has to redo: the topics that passed review
+        are kept and only the rejected or missing ones are researched again. None for a
+        full pass: the first one, one the reviewer asked for, or when every topic passed
+        review and a whole-result grader failed, so there is no topic to single out.
+        After a failed hallucination grade, a reviewed topic is only kept when the
+        search evidence grounds it.
+        """
+        research_result = state.get("research_result")
+        if not state.get("research_attempts") or research_result is None:
+            return None
+        kept = list(research_result.topics)
+        rejected = list(state.get("rejected_topic_names") or [])
+        if state.get("hallucination_score") is False:
+            # The hallucination grader judged the result as a whole, so the reviewed topics may be
+            # among the ungrounded ones: only those the search evidence clearly grounds are kept
+            verdicts = get_heuristic_grader().grade_topics(kept, state.get("search_evidence") or [])
+            rejected += [topic.topic for topic, verdict in zip(kept, verdicts)
+                         if verdict.decision == REJECT and not verdict.source_problem]
+            kept = [topic for topic, verdict in zip(kept, verdicts) if verdict.decision == ACCEPT]
+            if not kept:
+                return None
+        needed = (state.get("target_topic_count") or 0) - len(kept)
+        if needed <= 0:
+            return None
+        print(f"Keeping {len(kept)} reviewed topics, researching {needed} replacements")
+        return {"kept": kept, "rejected": rejected, "needed": needed}
+
+    def _build_chain_input(self, query, state, revision) -> Dict[str, Any]:
+        if revision is not None:
+            return {
+                "topic": query,
+                "covered": [topic.topic for topic in revision["kept"]],
+                "rejected": revision["rejected"],
+                "needed": revision["needed"]
+            }
+        # Check if research_result exists and prepare the request accordingly
+        research_result = state.get("research_result")
+        if research_result is not None:
+            print("Previous research found, including history in prompt")
+            return {
+                "topic": query,
+                "history": research_result
+            }
+        print("No previous research found, proceeding without history")
+        return {
+            "topic": query
+        }
+
+    def _fallback_response(self, query, revision=None) -> RelatedTopics:
+        if revision is not None:
+            # The kept topics stand on their own
+            return RelatedTopics(topics=[])
+        # Create a fallback response
+        return RelatedTopics(topics=[
+            Topic(
+                topic=f"Research on {query}",
+                description=f"Initial research topic: {query}. Error occurred during research process.",
+                source="System fallback"
+            )
+        ])
+
+    def _merge_revision(self, revision, response) -> RelatedTopics:
+        """The kept topics followed by up to `needed` new ones, none kept or rejected before."""
+        seen = {normalize_topic_name(name) for name in revision["rejected"]}
+        seen.update(normalize_topic_name(topic.topic) for topic in revision["kept"])
+        replacements = []
+        for topic in response.topics:
+            name = normalize_topic_name(topic.topic)
+            if name not in seen and len(replacements) < revision["needed"]:
+                seen.add(name)
+                replacements.append(topic)
+        print(f"Revise pass found {len(replacements)} of {revision['needed']} replacement topics")
+        return RelatedTopics(topics=revision["kept"] + replacements)
+
+    def _build_state_update(self, query, response, evidence, revision=None, state=None) -> Dict[str, Any]:
+        if revision is not None:
+            research_result = self._merge_revision(revision, response)
+            accepted = [normalize_topic_name(topic.topic) for topic in revision["kept"]]
+            target = state.get("target_topic_count")
+            # The kept topics were written from earlier searches; the graders still check them against those
+            evidence = merge_search_evidence(state.get("search_evidence"), evidence)
+        else:
+            research_result, accepted, target = response, [], len(response.topics)
         return {
             "query": query,
-            "research_result": response,
+            "research_result": research_result,
+            "search_evidence": evidence,
+            # Topics the reviewer already passed are not reviewed again
+            "accepted_topic_names": accepted,
+            "target_topic_count": target,
             "research_state": "InitialResearch",
             "human_feedback": None
         }
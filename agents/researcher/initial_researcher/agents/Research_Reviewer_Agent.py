@@ -1,6 +1,17 @@
-from typing import Any, Dict
+import asyncio
+import os
+from typing import Any, Dict, List
 from agents.researcher.initial_researcher.memory.initial_research_state import InitialResearchState
-from agents.researcher.initial_researcher.chains.research_reviewer_chain import research_reviewer_chain
+from agents.researcher.initial_researcher.chains.research_reviewer_chain import (
+    GradeResearchTopics, format_topics_for_review, get_research_reviewer_batch_chain, get_research_reviewer_chain)
+from agents.researcher.grading.heuristic_grader import UNCERTAIN, get_heuristic_grader
+from agents.researcher.runtime.revision_loop import normalize_topic_name
+from agents.researcher.runtime.usage_ledger import get_usage_ledger
+
+# Up to this many topics are graded together in one call; 0 grades every topic on its own
+REVIEW_BATCH_SIZE = int(os.getenv("RESEARCH_REVIEW_BATCH_SIZE", "12"))
+# Concurrent per-topic calls when a result is too large for one batch
+REVIEW_CONCURRENCY = int(os.getenv("RESEARCH_REVIEW_CONCURRENCY", "4"))
 
 class ResearchReviewerAgent:
     """Agent responsible for reviewing research findings."""
@@ -14,38 +25,151 @@ class ResearchReviewerAgent:
         print("Running research review...")
         query = state.get("query")
         research_result= state.get("research_result")
+        topics = research_result.topics
+        for topic in topics:
+            self._print_topic(topic)
 
-        # Create a list to store topics that pass the review
-        reviewed_topics = []
+        # Clear cases are decided locally; the uncertain ones go to the LLM, in one call when few enough
+        scores, uncertain = self._pregrade(topics, state)
+        if self._use_batch(uncertain):
+            try:
+                scores.update(self._scores_from_batch(uncertain, get_research_reviewer_batch_chain().invoke(
+                    self._build_batch_input(query, [topics[index] for index in uncertain]))))
+            except Exception as e:
+                print(f"Batch review failed, grading topics one by one: {e}")
+        for index, topic in enumerate(topics):
+            if index not in scores:
+                scores[index] = get_research_reviewer_chain().invoke(self._build_chain_input(query, topic))
+
+        return self._build_state_update(research_result, self._filter_topics(topics, scores))
+
+    async def areview_research(self, state: InitialResearchState) -> Dict[str, Any]:
+        """Async variant of review_research that does not block the event loop."""
+        print("Running research review (async)...")
+        query = state.get("query")
+        research_result = state.get("research_result")
+        topics = research_result.topics
+        for topic in topics:
+            self._print_topic(topic)
+
+        scores, uncertain = self._pregrade(topics, state)
+        if self._use_batch(uncertain):
+            try:
+                scores.update(self._scores_from_batch(uncertain, await get_research_reviewer_batch_chain().ainvoke(
+                    self._build_batch_input(query, [topics[index] for index in uncertain]))))
+            except Exception as e:
+                print(f"Batch review failed, grading topics one by one: {e}")
+
+        # Topics the batch did not grade are graded concurrently, a few at a time
+        semaphore = asyncio.Semaphore(max(1, REVIEW_CONCURRENCY))
+
+        async def grade(index):
+            async with semaphore:
+                return index, await get_research_reviewer_chain().ainvoke(
+                    self._build_chain_input(query, topics[index]))
+
+        missing = [index for index in range(len(topics)) if index not in scores]
+        scores.update(await asyncio.gather(*(grade(index) for index in missing)))
+
+        return self._build_state_update(research_result, self._filter_topics(topics, scores))
+
+    @staticmethod
+    def _use_batch(topics) -> bool:
+        return 1 < len(topics) <= REVIEW_BATCH_SIZE
+
+    @classmethod
+    def _planned_calls(cls, topics) -> int:
+        if not topics:
+            return 0
+        return 1 if cls._use_batch(topics) else len(topics)
+
+    def _pregrade(self, topics, state: InitialResearchState):
+        """Verdicts reached without the LLM by topic position, and the positions left for it."""
+        # Topics a revise pass kept were accepted in the previous round
+        accepted = set(state.get("accepted_topic_names") or [])
+        scores = {index: GradeResearchTopics(binary_score=True) for index, topic in enumerate(topics)
+                  if normalize_topic_name(topic.topic) in accepted}
+        if scores:
+            print(f"{len(scores)} topics passed review in the previous round and are kept")
 
-        for topic in research_result.topics:
-            print(f"Topic: {topic.topic}")
-            print(f"Description: {topic.description}")
-            print(f"Source: {topic.source}")
-            score = research_reviewer_chain.invoke({
-                "query": query,
-                "topic": topic.topic,
-                "description": topic.description,
-                "source": topic.source
-            })
-            print(f"Review Score: {score.binary_score}")
-              # Only keep complete topic objects that scored True
-            if score.binary_score is True:
-                reviewed_topics.append(topic)  # Keep the entire topic object
-                print(f"✓ Topic object '{topic.topic}' passed review and retained")
+        pending = [index for index in range(len(topics)) if index not in scores]
+        verdicts = get_heuristic_grader().grade_topics([topics[index] for index in pending],
+                                                       state.get("search_evidence") or [])
+        uncertain = []
+        for index, verdict in zip(pending, verdicts):
+            if verdict.decision == UNCERTAIN:
+                uncertain.append(index)
             else:
-                print(f"✗ Topic '{topic.topic}' failed review and will be removed")
-        
+                print(f"Pre-graded '{topics[index].topic}': {verdict.decision} ({verdict.reason})")
+                scores[index] = verdict
+        decided = len(pending) - len(uncertain)
+        if decided:
+            saved = self._planned_calls(pending) - self._planned_calls(uncertain)
+            get_usage_ledger().record_pregrade(decided, max(0, saved))
+        return scores, uncertain
 
-        
+    def _build_batch_input(self, query, topics) -> Dict[str, Any]:
+        return {
+            "query": query,
+            "topics": format_topics_for_review(topics)
+        }
+
+    @staticmethod
+    def _scores_from_batch(positions, batch) -> Dict[int, Any]:
+        """
+        Verdicts by topic position; the batch numbers the reviewed topics from 1,
+        in the order of positions. Unnumbered or repeated verdicts are ignored.
+        """
+        scores = {}
+        for verdict in batch.verdicts:
+            index = verdict.index - 1
+            if 0 <= index < len(positions) and positions[index] not in scores:
+                scores[positions[index]] = verdict
+        if len(scores) < len(positions):
+            print(f"Batch review graded {len(scores)} of {len(positions)} topics, grading the rest one by one")
+        return scores
+
+    def _filter_topics(self, topics, scores) -> List[Any]:
+        # Create a list to store topics that pass the review, in their original order
+        reviewed_topics = []
+        for index, topic in enumerate(topics):
+            self._keep_if_passed(topic, scores[index], reviewed_topics)
+        return reviewed_topics
+
+    def _print_topic(self, topic):
+        print(f"Topic: {topic.topic}")
+        print(f"Description: {topic.description}")
+        print(f"Source: {topic.source}")
+
+    def _build_chain_input(self, query, topic) -> Dict[str, Any]:
+        return {
+            "query": query,
+            "topic": topic.topic,
+            "description": topic.description,
+            "source": topic.source
+        }
+
+    def _keep_if_passed(self, topic, score, reviewed_topics):
+        print(f"Review Score: {score.binary_score}")
+        # Only keep complete topic objects that scored True
+        if score.binary_score is True:
+            reviewed_topics.append(topic)  # Keep the entire topic object
+            print(f"✓ Topic object '{topic.topic}' passed review and retained")
+        else:
+            print(f"✗ Topic '{topic.topic}' failed review and will be removed")
+
+    def _build_state_update(self, research_result, reviewed_topics) -> Dict[str, Any]:
         print(f"Review completed. {len(reviewed_topics)} topics passed out of {len(research_result.topics)} original topics")
         
-        # Update the research_result with filtered topics
-        research_result.topics = reviewed_topics
+        # Update the research_result with filtered topics; a copy, since the other graders read it concurrently
+        original_topics = research_result.topics
+        research_result = research_result.model_copy(update={"topics": reviewed_topics})
 
         # Return updated state
+        kept = {id(topic) for topic in reviewed_topics}
         return {
             "research_result": research_result,
+            # The next revise pass asks for replacements of these
+            "rejected_topic_names": [topic.topic for topic in original_topics if id(topic) not in kept],
             "research_reviewer_score": len(reviewed_topics) > 0  # True if at least one topic passed
         }
-            
\ No newline at end of file
@@ -1,22 +1,9 @@
-from dotenv import load_dotenv
-import os
+from functools import lru_cache
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
+from agents.researcher.llm.llm_provider import get_chat_model
 
 
-load_dotenv()
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY');
-OPENAI_API_BASEURL = os.getenv('OPENAI_API_BASE');
-OPENAI_MODEL = os.getenv('LLM_MODEL');
-
-llm = ChatOpenAI(
-    model_name=OPENAI_MODEL,
-    openai_api_key= OPENAI_API_KEY,
-    openai_api_base= OPENAI_API_BASEURL,
-    temperature=0.0,  # Set temperature to 0 for deterministic output
-)
-
 class GradeHallucinations(BaseModel):
     """
     Binary score for hallucination present in generated answer.
@@ -25,8 +12,6 @@ class GradeHallucinations(BaseModel):
         description="Answer is grounded in the facts, 'True' for grounded, 'False' for not grounded."
     )
 
-structured_llm_grader = llm.with_structured_output(GradeHallucinations)
-
 system = """You are a grader assessing whether an LLM generated topics related to query is grounded in / supported by a set of retrieved topics. \n 
      Give a binary score 'True' or 'False'. 'True' means that the answer is grounded in / supported by the set of topics."""
 
@@ -38,4 +23,15 @@ hallucination_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-hallucination_grader_chain = hallucination_prompt | structured_llm_grader
\ No newline at end of file
+@lru_cache(maxsize=None)
+def get_hallucination_grader_chain():
+    """Build the grading chain on first use instead of at import time"""
+    # Shared, connection-pooled model (temperature 0)
+    structured_llm_grader = get_chat_model().with_structured_output(GradeHallucinations)
+    return hallucination_prompt | structured_llm_grader
+
+def __getattr__(name):
+    # Keep `hallucination_grader_chain` importable while building it lazily
+    if name == "hallucination_grader_chain":
+        return get_hallucination_grader_chain()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
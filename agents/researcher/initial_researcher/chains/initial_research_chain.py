@@ -1,12 +1,11 @@
-from dotenv import load_dotenv
-import os
-from langchain_tavily import TavilySearch
-from langchain_openai import ChatOpenAI
+from functools import lru_cache
+from agents.researcher.llm.llm_provider import get_chat_model
+from agents.researcher.llm.react_prompt import get_react_prompt
+from agents.researcher.llm.react_scratchpad import create_bounded_react_agent
+from agents.researcher.llm.tokenizer import get_token_counter
 from langchain.prompts import PromptTemplate
-from langchain_core.tools import Tool
-from agents.researcher.initial_researcher.tools.tavily_search import SearchUsingTavily
-from langchain import hub
-from langchain.agents import (create_react_agent, Tool, AgentExecutor)
+from agents.researcher.initial_researcher.tools.tavily_search import SearchUsingTavily, SearchUsingTavilyAsync
+from langchain.agents import (Tool, AgentExecutor)
 from langchain_core.runnables import RunnableLambda
 from agents.researcher.memory.research_topics import RelatedTopics, Topic
 
@@ -15,9 +14,20 @@ def format_prompt_for_agent(inputs):
     """Format the topic into the prompt template and prepare for agent executor"""
     topic = inputs["topic"]
     history = inputs.get("history", None)
+    needed = inputs.get("needed", None)
     
     # Create the basic task prompt
-    if history is not None:
+    if needed is not None:
+        # A revise pass: only replacements for the topics that did not pass review, so the
+        # accepted topics are listed by name instead of being researched and described again
+        formatted_prompt = prompt_template.format_prompt(topic=topic, history=format_revision_context(
+            inputs.get("covered") or [], inputs.get("rejected") or [])).to_string()
+        agent_input = f"""Research Topic: {topic}
+
+        Task: {formatted_prompt}
+
+        Return only {needed} new related topics, to replace the rejected ones. Please use the available tools to find comprehensive information."""
+    elif history is not None:
         formatted_prompt = prompt_template.format_prompt(topic=topic, history=str(history)).to_string()
         # Include history context directly in the agent input
         agent_input = f"""Research Topic: {topic}
@@ -39,6 +49,14 @@ def format_prompt_for_agent(inputs):
             
     return {"input": agent_input}
 
+def format_revision_context(covered, rejected) -> str:
+    """The reviewer's verdicts on the previous pass, as research context for a revise pass"""
+    lines = ["Already covered, do not repeat:"]
+    lines += [f"- {name}" for name in covered] or ["- (none)"]
+    lines.append("Rejected by review, do not return again:")
+    lines += [f"- {name}" for name in rejected] or ["- (none)"]
+    return "\n".join(lines)
+
 def parse_agent_response(response):
     """Parse the agent response and convert to RelatedTopics object"""
     import json
@@ -98,21 +116,6 @@ def parse_agent_response(response):
         # Return empty RelatedTopics on error
         return RelatedTopics(topics=[])
 
-
-load_dotenv()
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY');
-OPENAI_API_BASEURL = os.getenv('OPENAI_API_BASE');
-OPENAI_MODEL = os.getenv('LLM_MODEL');
-
-llm = ChatOpenAI(
-    model_name=OPENAI_MODEL,
-    openai_api_key= OPENAI_API_KEY,
-    openai_api_base= OPENAI_API_BASEURL,
-    temperature=0.0,  # Set temperature to 0 for deterministic output
-)
-
-
-
 template = """Given the topic {topic}, generate a list of related topics with a brief description and source for each topic.
 
 Previous research context (if available):
@@ -127,7 +130,7 @@ Return the result in the following format:
             {{
                 "topic": "<related topic>",
                 "description": "<brief description of the related topic>",
-                "source": "<source of the information>"
+                "source": "<source of the information: the id of the search result, e.g. S1>"
             }},
             ...
         ]
@@ -154,6 +157,7 @@ tools_for_agent = [
     Tool(
         name="Crawl Google for Related Topics",
         func=SearchUsingTavily,
+        coroutine=SearchUsingTavilyAsync,
         description="useful for when you need to find related topics on the web. Input should be a topic string.",
     ),
     Tool(
@@ -163,29 +167,44 @@ tools_for_agent = [
     )
 ]
 
-# Use the original react prompt - it works reliably
-react_prompt = hub.pull("hwchase17/react")
-
-agent = create_react_agent(
-    llm=llm,
-    tools=tools_for_agent,
-    prompt=react_prompt)
-
-agent_executor = AgentExecutor(
-    agent=agent,
-    tools=tools_for_agent, 
-    verbose=True,
-    handle_parsing_errors=True,
-    max_iterations=3,
-    early_stopping_method="generate"
-)
-
-# Create the research chain
-research_chain = (
-    RunnableLambda(format_prompt_for_agent) 
-    | agent_executor
-    | RunnableLambda(parse_agent_response)
-)
+@lru_cache(maxsize=None)
+def get_agent_executor() -> AgentExecutor:
+    """Build the ReAct agent executor on first use instead of at import time"""
+    llm = get_chat_model()  # Shared, connection-pooled model (temperature 0)
+
+    # The original hwchase17/react prompt, shipped locally - it works reliably
+    # Older observations are summarized or dropped to keep the scratchpad within its cap
+    agent = create_bounded_react_agent(
+        llm=llm,
+        tools=tools_for_agent,
+        prompt=get_react_prompt(),
+        counter=get_token_counter())
+
+    return AgentExecutor(
+        agent=agent,
+        tools=tools_for_agent, 
+        verbose=True,
+        handle_parsing_errors=True,
+        max_iterations=3,
+        early_stopping_method="generate"
+    )
+
+@lru_cache(maxsize=None)
+def get_research_chain():
+    """Create the research chain on first use"""
+    return (
+        RunnableLambda(format_prompt_for_agent) 
+        | get_agent_executor()
+        | RunnableLambda(parse_agent_response)
+    )
+
+def __getattr__(name):
+    # Keep `research_chain` / `agent_executor` importable while building them lazily
+    if name == "research_chain":
+        return get_research_chain()
+    if name == "agent_executor":
+        return get_agent_executor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # result = agent_executor.invoke(
 #         input = {"input": prompt_template.format_prompt(topic="Artificial Intelligence").to_string() }
@@ -1,22 +1,9 @@
-from dotenv import load_dotenv
-import os
+from functools import lru_cache
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
+from agents.researcher.llm.llm_provider import get_chat_model
 
 
-load_dotenv()
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY');
-OPENAI_API_BASEURL = os.getenv('OPENAI_API_BASE');
-OPENAI_MODEL = os.getenv('LLM_MODEL');
-
-llm = ChatOpenAI(
-    model_name=OPENAI_MODEL,
-    openai_api_key= OPENAI_API_KEY,
-    openai_api_base= OPENAI_API_BASEURL,
-    temperature=0.0,  # Set temperature to 0 for deterministic output
-)
-
 class GradeResearchTopics(BaseModel):
     """
     Binary score for hallucination present in generated answer.
@@ -25,8 +12,6 @@ class GradeResearchTopics(BaseModel):
         description="Answer is grounded in the facts, 'True' for grounded, 'False' for not grounded."
     )
 
-structured_llm_grader = llm.with_structured_output(GradeResearchTopics)
-
 system = """
 You are and expert reviewer of the given research topic.
 You will review topic, description and source. Based on the parameters  give a binary score 'True' or 'False'.
@@ -43,4 +28,64 @@ research_reviewer_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-research_reviewer_chain = research_reviewer_prompt | structured_llm_grader
\ No newline at end of file
+class TopicVerdict(BaseModel):
+    """
+    Binary score of one topic in a batch review.
+    """
+    index: int = Field(description="Number of the topic as listed, starting at 1.")
+    binary_score: bool = Field(
+        description="'True' if the topic is relevant and well-grounded, 'False' otherwise."
+    )
+
+
+class GradeResearchTopicsBatch(BaseModel):
+    """
+    Binary scores for every topic of a research result, graded together.
+    """
+    verdicts: list[TopicVerdict] = Field(description="One verdict per listed topic.")
+
+
+batch_system = """
+You are and expert reviewer of the given research topics.
+For every numbered topic review the topic, description and source, and give a binary score 'True' or 'False'.
+'True' means that the research topic is relevant and well-grounded, 'False' means it is not.
+Grade each topic on its own and return exactly one verdict per topic, with the topic's number.
+"""
+
+
+research_reviewer_batch_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", batch_system),
+        ("human", "User query: {query}\n Topics to review:\n{topics}"),
+        ("assistant", "Grade every topic with a binary score 'True' or 'False'.")
+    ]
+)
+
+
+def format_topics_for_review(topics) -> str:
+    """Numbered topic, description and source of each topic, as the batch prompt lists them"""
+    return "\n".join(
+        f"{number}. Related topic: {topic.topic}, Description of topic: {topic.description}, "
+        f"Source of the topic: {topic.source}"
+        for number, topic in enumerate(topics, start=1)
+    )
+
+
+@lru_cache(maxsize=None)
+def get_research_reviewer_chain():
+    """Build the grading chain on first use instead of at import time"""
+    # Shared, connection-pooled model (temperature 0)
+    structured_llm_grader = get_chat_model().with_structured_output(GradeResearchTopics)
+    return research_reviewer_prompt | structured_llm_grader
+
+@lru_cache(maxsize=None)
+def get_research_reviewer_batch_chain():
+    """Chain grading all topics of a research result in one structured-output call"""
+    structured_llm_grader = get_chat_model().with_structured_output(GradeResearchTopicsBatch)
+    return research_reviewer_batch_prompt | structured_llm_grader
+
+def __getattr__(name):
+    # Keep `research_reviewer_chain` importable while building it lazily
+    if name == "research_reviewer_chain":
+        return get_research_reviewer_chain()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,7 +2,10 @@ from dotenv import load_dotenv
 import os
 from langgraph.graph import END, StateGraph
 
-from agents.constants import HALLUCINATION_GRADER, HUMAN_FEEDBACK, INITIAL_PLAN, INITIAL_RESEARCH, RESEARCH_REVIEWER, RESPONSE_GRADER
+from agents.constants import GRADING_DECISION, HALLUCINATION_GRADER, HUMAN_FEEDBACK, INITIAL_PLAN, INITIAL_RESEARCH, RESEARCH_REVIEWER, RESPONSE_GRADER
+
+from agents.researcher.runtime.revision_loop import BUDGET, MAX_RESEARCH_REVISIONS, PASSED, loop_exit_reason
+from agents.researcher.runtime.usage_ledger import budget_exceeded
 
 from .memory.initial_research_state import InitialResearchState
 from .agents.Initial_Research_Agent import InitialResearchAgent
@@ -26,10 +29,12 @@ def _create_workflow(agents):
     workflow = StateGraph(InitialResearchState)
 
     # Add nodes for each agent
-    workflow.add_node(INITIAL_RESEARCH, agents[INITIAL_RESEARCH].run_initial_research)
-    workflow.add_node(HALLUCINATION_GRADER, agents[HALLUCINATION_GRADER].verify_hallucinations)
-    workflow.add_node(RESEARCH_REVIEWER, agents[RESEARCH_REVIEWER].review_research)
+    # LLM-backed nodes use their async variants so they do not block the event loop
+    workflow.add_node(INITIAL_RESEARCH, agents[INITIAL_RESEARCH].arun_initial_research)
+    workflow.add_node(HALLUCINATION_GRADER, agents[HALLUCINATION_GRADER].averify_hallucinations)
+    workflow.add_node(RESEARCH_REVIEWER, agents[RESEARCH_REVIEWER].areview_research)
     workflow.add_node(RESPONSE_GRADER, agents[RESPONSE_GRADER].grade_response)
+    workflow.add_node(GRADING_DECISION, _grading_decision)
     workflow.add_node(HUMAN_FEEDBACK, agents[HUMAN_FEEDBACK].get_human_feedback)
     workflow.add_node(INITIAL_PLAN, agents[INITIAL_PLAN].plan_initial_research)
 
@@ -54,39 +59,67 @@ def _decide_next_step(state: InitialResearchState) -> str:
     # Check if feedback indicates acceptance
     if feedback and feedback.lower() in ['accept', 'approved', 'good', 'ok', 'yes']:
         return "accept"
+    reason = budget_exceeded()
+    if reason:
+        print(f"Not revising, {reason}. Keeping the current research.")
+        return "accept"
+    return "revise"
+
+# Graders that run in parallel on every research result, with the score each one writes
+GRADERS = {
+    HALLUCINATION_GRADER: "hallucination_score",
+    RESEARCH_REVIEWER: "research_reviewer_score",
+    RESPONSE_GRADER: "response_grader_score",
+}
+
+def _failed_graders(state: InitialResearchState) -> list:
+    return [grader for grader, score_key in GRADERS.items() if not state.get(score_key)]
+
+def _grading_decision(state: InitialResearchState) -> dict:
+    """
+    Join point of the parallel graders. Records why the research loop ends, or
+    None to revise; the route is taken from it by _route_on_grades.
+    """
+    failed = _failed_graders(state)
+    if failed:
+        print(f"Research needs revising, failed graders: {', '.join(failed)}")
     else:
+        print("Research passed every grader.")
+    reason = loop_exit_reason(state, bool(failed), MAX_RESEARCH_REVISIONS)
+    if reason not in (None, PASSED):
+        print(f"Stopping the research loop after {state.get('research_attempts') or 0} attempts: {reason}.")
+    return {"research_state": "Graded", "loop_exit_reason": reason}
+
+def _route_on_grades(state: InitialResearchState) -> str:
+    """
+    Continue when every grader passed, revise otherwise. Once the task's budget
+    is spent, the revisions are used up or a revision stops changing the topics,
+    the current research goes straight to human feedback.
+    """
+    reason = state.get("loop_exit_reason")
+    if reason is None:
         return "revise"
+    if reason == PASSED:
+        return "continue"
+    return "budget" if reason == BUDGET else "stop"
 
 def _add_workflow_edges(workflow):
 
     
-    workflow.add_edge(INITIAL_RESEARCH, HALLUCINATION_GRADER)
-    
-    # workflow.add_edge(HALLUCINATION_GRADER, RESEARCH_REVIEWER)
-    workflow.add_conditional_edges(
-        HALLUCINATION_GRADER,
-        lambda state: "continue" if state.get("hallucination_score") else "revise",
-        {
-            "continue": RESEARCH_REVIEWER,
-            "revise": INITIAL_RESEARCH
-        }
-    )
-
-    workflow.add_conditional_edges(
-        RESEARCH_REVIEWER,
-        lambda state: "continue" if state.get("research_reviewer_score") else "revise",
-        {
-            "continue": RESPONSE_GRADER,
-            "revise": INITIAL_RESEARCH
-        }
-    )
+    # The graders only read query and research_result, so they fan out in parallel
+    # and join at the decision node: a round takes as long as the slowest grader
+    for grader in GRADERS:
+        workflow.add_edge(INITIAL_RESEARCH, grader)
+    workflow.add_edge(list(GRADERS), GRADING_DECISION)
 
     workflow.add_conditional_edges(
-        RESPONSE_GRADER,
-        lambda state: "continue" if state.get("response_grader_score") else "revise",
+        GRADING_DECISION,
+        _route_on_grades,
         {
             "continue": HUMAN_FEEDBACK,
-            "revise": INITIAL_RESEARCH
+            "revise": INITIAL_RESEARCH,
+            "budget": HUMAN_FEEDBACK,
+            "stop": HUMAN_FEEDBACK
         }
     )
 
@@ -2,7 +2,7 @@
     # research-state could be Literals as number of state can be fixed eg Started->Running{Name}->...->Stopped
     # For now string is fine
 
-from typing import List, Literal, TypedDict
+from typing import Any, Dict, List, Literal, Optional, TypedDict
 
 from agents.researcher.memory.research_topics import RelatedTopics
 
@@ -15,7 +15,14 @@ class InitialResearchState(TypedDict):
     research_state: str
     human_feedback: str
     research_result: RelatedTopics  # Changed from dict[str, Any] to RelatedTopics
+    search_evidence: List[Dict[str, Any]]  # search results the research was based on: title, url, content
     hallucination_score: bool
     research_reviewer_score: bool
     response_grader_score: bool
+    target_topic_count: int  # topics the last full research pass returned; revise passes refill up to it
+    accepted_topic_names: List[str]  # topics kept from the previous pass, already passed review
+    rejected_topic_names: List[str]  # topics the reviewer rejected in the latest pass
+    research_attempts: int  # research runs since the query or the last human feedback
+    previous_topic_names: List[str]  # topics of the result the latest attempt revised
+    loop_exit_reason: Optional[str]  # why the grader loop ended: passed, budget, max_revisions, converged
 
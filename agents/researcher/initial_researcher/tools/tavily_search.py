@@ -1,24 +1,55 @@
-from langchain_community.tools.tavily_search import TavilySearchResults
-from dotenv import load_dotenv
+from agents.researcher.runtime.search_evidence import record_search_results
+from agents.researcher.tools.observation_format import format_search_observation
+from agents.researcher.tools.tavily_client import get_search_client
 
-def SearchUsingTavily(topic:str) -> str:
+# Search parameters used by the initial researcher
+SEARCH_PARAMS = {
+    "max_results": 5,
+    "include_answer": True,
+    "include_raw_content": False,
+    "include_images": False,
+    "search_depth": "advanced",
+    # "include_domains": [],
+    # "exclude_domains": [],
+}
+
+def search_results(topic: str):
     """
-    Search for any topic using Tavily Search API.
+    Raw Tavily results for a topic, recorded as evidence for the graders.
     """
-    load_dotenv()
+    # Perform a search using the shared, connection-pooled Tavily client
+    try:
+        results = get_search_client().search(topic, **SEARCH_PARAMS)
+        # Kept as evidence for the graders, which check the topics against these snippets
+        record_search_results(results)
+        return results
+    except Exception as e:
+        # Like TavilySearchResults, report the error to the agent instead of raising
+        return repr(e)
 
-    # Perform a search using Tavily
 
-    search = TavilySearchResults(
-        max_results=5,
-        include_answer=True,
-        include_raw_content=False,
-        include_images=False,
-        search_depth="advanced",
-        # include_domains = []
-        # exclude_domains = []
-    )
+async def asearch_results(topic: str):
+    """
+    Async variant of search_results.
+    """
+    try:
+        results = await get_search_client().asearch(topic, **SEARCH_PARAMS)
+        record_search_results(results)
+        return results
+    except Exception as e:
+        return repr(e)
 
-    result= search.invoke({"args":{"query":topic},"type": "tool_call", "id": "foo", "name": "tavily"})
 
-    return result
\ No newline at end of file
+def SearchUsingTavily(topic:str) -> str:
+    """
+    Search for any topic using Tavily Search API.
+    """
+    # Numbered snippets with source ids, not the repr of the result dicts
+    return format_search_observation(search_results(topic))
+
+
+async def SearchUsingTavilyAsync(topic: str) -> str:
+    """
+    Async variant of SearchUsingTavily for tools invoked through ainvoke.
+    """
+    return format_search_observation(await asearch_results(topic))
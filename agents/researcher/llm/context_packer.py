@@ -0,0 +1,183 @@
+"""
+Token-budgeted prompt assembly.
+
+A prompt is built from parts (instructions, query, topic, history, tool
+observations) that share one token budget. ContextPacker encodes every part
+once, gives the required parts their full size and splits what is left
+between the others by weight: a part smaller than its share keeps all of it
+and the rest goes to the larger parts. Parts over their share are cut from
+the tokens already encoded, so nothing is encoded twice.
+
+TokenCounter memoizes encodings by content hash in a bounded LRU, so the
+fixed instructions, and a history that is packed again on every revise pass,
+are only ever encoded once. Misses in one call are encoded together with the
+tokenizer's encode_batch when it has one.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Encodings kept in the LRU, by count and by their total tokens
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "2048"))
+TOKEN_CACHE_MAX_TOKENS = int(os.getenv("TOKEN_CACHE_MAX_TOKENS", "1000000"))
+
+
+def _content_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+class TokenCounter:
+    """Encodes texts with a tokenizer, memoizing the tokens by content hash."""
+
+    def __init__(self, tokenizer_factory: Callable[[], Any], maxsize: int = TOKEN_CACHE_SIZE,
+                 max_tokens: int = TOKEN_CACHE_MAX_TOKENS):
+        # The tokenizer is loaded on first use; tiktoken may have to download its BPE files
+        self._tokenizer_factory = tokenizer_factory
+        self._tokenizer = None
+        self.maxsize = maxsize
+        self.max_tokens = max_tokens
+        self._cache: "OrderedDict[bytes, Tuple]" = OrderedDict()
+        self._cached_tokens = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            self._tokenizer = self._tokenizer_factory()
+        return self._tokenizer
+
+    def encode_many(self, texts: Sequence[str]) -> List[Tuple]:
+        """Tokens of each text; texts not in the cache are encoded in one batch."""
+        keys = [_content_key(text) for text in texts]
+        found: Dict[bytes, Tuple] = {}
+        with self._lock:
+            for key in keys:
+                tokens = self._cache.get(key)
+                if tokens is not None:
+                    self._cache.move_to_end(key)
+                    found[key] = tokens
+            missing = {key: text for key, text in zip(keys, texts) if key not in found}
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        if missing:
+            encoded = self._encode(list(missing.values()))
+            with self._lock:
+                for key, tokens in zip(missing, encoded):
+                    found[key] = tokens
+                    self._store(key, tokens)
+        return [found[key] for key in keys]
+
+    def _encode(self, texts: List[str]) -> List[Tuple]:
+        tokenizer = self.tokenizer
+        if len(texts) > 1 and hasattr(tokenizer, "encode_batch"):
+            return [tuple(tokens) for tokens in tokenizer.encode_batch(texts)]
+        return [tuple(tokenizer.encode(text)) for text in texts]
+
+    def _store(self, key: bytes, tokens: Tuple):
+        if key in self._cache or len(tokens) > self.max_tokens:
+            return
+        self._cache[key] = tokens
+        self._cached_tokens += len(tokens)
+        while len(self._cache) > self.maxsize or self._cached_tokens > self.max_tokens:
+            _, evicted = self._cache.popitem(last=False)
+            self._cached_tokens -= len(evicted)
+
+    def count_many(self, texts: Sequence[str]) -> List[int]:
+        """Token counts of many short-lived texts, in one batch and without filling the cache."""
+        return [len(tokens) for tokens in self._encode(list(texts))] if texts else []
+
+    def encode(self, text: str) -> Tuple:
+        return self.encode_many([text])[0]
+
+    def count(self, text: str) -> int:
+        return len(self.encode(text)) if text else 0
+
+    def decode(self, tokens: Sequence) -> str:
+        return self.tokenizer.decode(list(tokens))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        tokens = self.encode(text)
+        return text if len(tokens) <= max_tokens else self.decode(tokens[:max_tokens])
+
+    def cache_info(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._cache),
+                "tokens": self._cached_tokens}
+
+
+@dataclass
+class PromptPart:
+    """One piece of a prompt competing for the token budget."""
+    name: str
+    text: str
+    # Relative share of the budget left after the required parts; must be positive
+    weight: float = 1.0
+    # Required parts are never cut; their tokens come off the budget first
+    required: bool = False
+    # Upper bound for this part regardless of its share
+    max_tokens: Optional[int] = None
+
+
+@dataclass
+class PackedContext:
+    texts: Dict[str, str]
+    tokens: Dict[str, int]
+    total_tokens: int
+    truncated: List[str] = field(default_factory=list)
+
+    def __getitem__(self, name: str) -> str:
+        return self.texts[name]
+
+
+class ContextPacker:
+    """Fits prompt parts into a single token budget, encoding each part once."""
+
+    def __init__(self, counter: TokenCounter):
+        self.counter = counter
+
+    def pack(self, parts: Sequence[PromptPart], budget: int) -> PackedContext:
+        encoded = dict(zip((part.name for part in parts), self.counter.encode_many([part.text for part in parts])))
+        allotted = self._allot(parts, {name: len(tokens) for name, tokens in encoded.items()}, budget)
+
+        texts, tokens, truncated = {}, {}, []
+        for part in parts:
+            part_tokens = encoded[part.name]
+            limit = allotted[part.name]
+            if len(part_tokens) > limit:
+                texts[part.name] = self.counter.decode(part_tokens[:limit])
+                truncated.append(part.name)
+            else:
+                texts[part.name] = part.text
+            tokens[part.name] = min(len(part_tokens), limit)
+        return PackedContext(texts, tokens, sum(tokens.values()), truncated)
+
+    @staticmethod
+    def _allot(parts: Sequence[PromptPart], sizes: Dict[str, int], budget: int) -> Dict[str, int]:
+        """Token allowance per part: required parts in full, the rest shared by weight."""
+        allotted = {part.name: sizes[part.name] for part in parts if part.required}
+        remaining = max(0, budget - sum(allotted.values()))
+        open_parts = []
+        for part in parts:
+            if part.required:
+                continue
+            wanted = sizes[part.name] if part.max_tokens is None else min(sizes[part.name], part.max_tokens)
+            open_parts.append((part, wanted))
+
+        # Parts that fit in their share keep their size; what they leave over is shared again
+        while open_parts:
+            total_weight = sum(part.weight for part, _ in open_parts)
+            share = {part.name: remaining * part.weight / total_weight for part, _ in open_parts}
+            fitting = [(part, wanted) for part, wanted in open_parts if wanted <= share[part.name]]
+            if not fitting:
+                for part, _ in open_parts:
+                    allotted[part.name] = int(share[part.name])
+                break
+            for part, wanted in fitting:
+                allotted[part.name] = wanted
+                remaining -= wanted
+            open_parts = [(part, wanted) for part, wanted in open_parts if part.name not in allotted]
+        return allotted
@@ -0,0 +1,222 @@
+"""
+Exact-match cache for LLM calls shared by every research chain.
+
+Entries are content addressed: the key hashes the model configuration
+(model name, parameters, bound tools / structured-output schema) together
+with the rendered messages, so a deterministic call is only paid for once.
+"""
+import asyncio
+import contextlib
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")  # memory | sqlite | none
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_cache.sqlite"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+
+# Set while a caller asked to skip the cache for the calls it makes
+_bypass_cache = contextvars.ContextVar("bypass_llm_cache", default=False)
+
+
+@contextlib.contextmanager
+def bypass_llm_cache():
+    """
+    Skip the LLM cache for every call made inside the block, e.g.
+
+        with bypass_llm_cache():
+            research_chain.invoke(...)
+
+    Fresh responses are still written back to the cache.
+    """
+    token = _bypass_cache.set(True)
+    try:
+        yield
+    finally:
+        _bypass_cache.reset(token)
+
+
+class MemoryCacheBackend:
+    """LRU dictionary with per-entry expiry."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: str, expires_at: float) -> int:
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """SQLite table with per-entry expiry and least-recently-used eviction."""
+
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key: str, value: str, expires_at: float) -> int:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now))
+            self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+            evicted = max(0, count - self.max_entries)
+            if evicted:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)", (evicted,))
+            self._conn.commit()
+        return evicted
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+class ResearchLLMCache(BaseCache):
+    """LangChain cache keyed by model configuration and rendered messages."""
+
+    def __init__(self, backend: str = LLM_CACHE_BACKEND, path: str = LLM_CACHE_PATH,
+                 ttl_seconds: float = LLM_CACHE_TTL_SECONDS, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        if backend == "sqlite":
+            self._backend = SQLiteCacheBackend(path, max_entries)
+        elif backend == "memory":
+            self._backend = MemoryCacheBackend(max_entries)
+        else:
+            raise ValueError(f"Unknown LLM cache backend: {backend}")
+        self.ttl_seconds = ttl_seconds
+        self._stats = {"hits": 0, "misses": 0, "bypassed": 0, "evictions": 0}
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str) -> str:
+        """llm_string carries the model, its parameters and any structured-output schema."""
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def _count(self, stat: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[stat] += amount
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        if _bypass_cache.get():
+            self._count("bypassed")
+            return None
+        value = self._backend.get(self.make_key(prompt, llm_string))
+        if value is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return [loads(generation) for generation in json.loads(value)]
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        value = json.dumps([dumps(generation) for generation in return_val])
+        evicted = self._backend.set(self.make_key(prompt, llm_string), value, time.time() + self.ttl_seconds)
+        if evicted:
+            self._count("evictions", evicted)
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        # SQLite reads and commits block, so they run off the event loop; the memory backend stays inline.
+        # to_thread copies the context, so bypass_llm_cache still applies there
+        if isinstance(self._backend, SQLiteCacheBackend):
+            return await asyncio.to_thread(self.lookup, prompt, llm_string)
+        return self.lookup(prompt, llm_string)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if isinstance(self._backend, SQLiteCacheBackend):
+            await asyncio.to_thread(self.update, prompt, llm_string, return_val)
+        else:
+            self.update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        self._backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["entries"] = len(self._backend)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_default_cache: Optional[ResearchLLMCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[ResearchLLMCache]:
+    """Return the process-wide LLM cache, or None when LLM_CACHE_BACKEND is 'none'."""
+    global _default_cache
+    if LLM_CACHE_BACKEND == "none":
+        return None
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = ResearchLLMCache()
+    return _default_cache
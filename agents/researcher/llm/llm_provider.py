@@ -0,0 +1,102 @@
+"""
+Central provider for the chat models used by the research chains.
+
+Every model talking to the same endpoint shares one pooled httpx client
+(sync and async), so concurrent chains reuse keep-alive connections instead
+of each opening their own.
+"""
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+from langchain_openai import ChatOpenAI
+
+from agents.researcher.llm.llm_cache import get_llm_cache
+from agents.researcher.runtime.rate_limiter import (AsyncRateLimitedTransport, RateLimitedTransport,
+                                                    rate_limit_enabled)
+from agents.researcher.runtime.usage_ledger import get_usage_callback
+
+load_dotenv()
+
+# Connection pool configuration, shared by every model on an endpoint
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "10"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+_http_clients: Dict[str, Tuple[httpx.Client, httpx.AsyncClient]] = {}
+_chat_models: Dict[Tuple, ChatOpenAI] = {}
+_lock = threading.Lock()
+
+
+def _endpoint_key(base_url: Optional[str]) -> str:
+    return base_url or "https://api.openai.com/v1"
+
+
+def _build_http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    timeout = httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS)
+    limits = httpx.Limits(max_connections=LLM_MAX_CONNECTIONS,
+                          max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                          keepalive_expiry=LLM_KEEPALIVE_EXPIRY)
+    transport = httpx.HTTPTransport(limits=limits)
+    async_transport = httpx.AsyncHTTPTransport(limits=limits)
+    if rate_limit_enabled():
+        # Every model on the endpoint waits on the shared OpenAI buckets and concurrency limit
+        transport = RateLimitedTransport("openai", transport)
+        async_transport = AsyncRateLimitedTransport("openai", async_transport)
+    return (httpx.Client(timeout=timeout, transport=transport),
+            httpx.AsyncClient(timeout=timeout, transport=async_transport))
+
+
+def get_http_clients(base_url: Optional[str] = None) -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """Return the pooled (sync, async) HTTP clients for an endpoint, creating them on first use."""
+    key = _endpoint_key(base_url)
+    with _lock:
+        clients = _http_clients.get(key)
+        if clients is None:
+            clients = _build_http_clients()
+            _http_clients[key] = clients
+    return clients
+
+
+def get_chat_model(model: Optional[str] = None, temperature: float = 0.0,
+                   max_tokens: Optional[int] = None) -> ChatOpenAI:
+    """
+    Return the shared chat model for the given configuration.
+
+    Args:
+        model: Model name, defaults to the LLM_MODEL environment variable
+        temperature: Sampling temperature, 0 for deterministic output
+        max_tokens: Optional limit on response tokens
+
+    Returns:
+        A ChatOpenAI instance using the endpoint's pooled HTTP clients
+    """
+    model = model or os.getenv("LLM_MODEL")
+    base_url = os.getenv("OPENAI_API_BASE")
+    key = (model, _endpoint_key(base_url), temperature, max_tokens)
+
+    with _lock:
+        chat_model = _chat_models.get(key)
+    if chat_model is not None:
+        return chat_model
+
+    http_client, http_async_client = get_http_clients(base_url)
+    chat_model = ChatOpenAI(
+        model_name=model,
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        openai_api_base=base_url,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        max_retries=LLM_MAX_RETRIES,
+        http_client=http_client,
+        http_async_client=http_async_client,
+        cache=get_llm_cache(),  # Deterministic calls are served from the shared LLM cache
+        callbacks=[get_usage_callback()],  # Token usage goes to the per-task ledger
+    )
+    with _lock:
+        return _chat_models.setdefault(key, chat_model)
@@ -0,0 +1,36 @@
+"""
+Local copy of the ReAct agent prompt.
+
+The research chains used to fetch ``hwchase17/react`` from the LangChain hub
+on import, which needed a network round trip. The template is versioned here
+so that changes to it are deliberate and show up in review.
+"""
+from langchain_core.prompts import PromptTemplate
+
+# Bump the version whenever the template text changes
+REACT_PROMPT_VERSION = "hwchase17/react@1"
+
+REACT_TEMPLATE = """Answer the following questions as best you can. You have access to the following tools:
+
+{tools}
+
+Use the following format:
+
+Question: the input question you must answer
+Thought: you should always think about what to do
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (this Thought/Action/Action Input/Observation can repeat N times)
+Thought: I now know the final answer
+Final Answer: the final answer to the original input question
+
+Begin!
+
+Question: {input}
+Thought:{agent_scratchpad}"""
+
+
+def get_react_prompt() -> PromptTemplate:
+    """Return the ReAct prompt used by the research AgentExecutors."""
+    return PromptTemplate.from_template(REACT_TEMPLATE, metadata={"version": REACT_PROMPT_VERSION})
@@ -0,0 +1,133 @@
+"""
+Token-capped scratchpad for the ReAct research agents.
+
+create_react_agent renders every earlier step back into the prompt in full.
+Each search adds up to a couple of thousand tokens that every later step
+sends again, so the prompt cost of a run grows quadratically with its
+iterations. format_bounded_scratchpad keeps the thought and action of every
+step, and the latest observations verbatim. Older observations are cut to
+a summary: the number, source id and title of each search result, so they
+can still be cited. If the scratchpad is still over its cap, the summaries
+are dropped oldest first, and then the latest observations are truncated.
+"""
+import logging
+import os
+import re
+from typing import List, Sequence, Tuple
+
+from langchain.agents.output_parsers import ReActSingleInputOutputParser
+from langchain_core.agents import AgentAction
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import Runnable, RunnablePassthrough
+from langchain_core.tools import BaseTool
+from langchain_core.tools.render import render_text_description
+
+from agents.researcher.llm.context_packer import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+# Cap on the rendered scratchpad, and how many of the latest observations are kept verbatim
+REACT_SCRATCHPAD_MAX_TOKENS = int(os.getenv("REACT_SCRATCHPAD_MAX_TOKENS", "3000"))
+REACT_SCRATCHPAD_KEEP_RECENT = int(os.getenv("REACT_SCRATCHPAD_KEEP_RECENT", "1"))
+# Longest summary of an older observation
+SUMMARY_MAX_TOKENS = 200
+# Tokens of the prefixes and line breaks around each observation
+STEP_OVERHEAD_TOKENS = 8
+
+OBSERVATION_PREFIX = "Observation: "
+LLM_PREFIX = "Thought: "
+SUMMARY_NOTE = "(summarized) "
+OMITTED_OBSERVATION = "(earlier observation omitted)"
+TRUNCATED_NOTE = " ... (truncated)"
+
+# One search result as format_search_observation renders it: its number, source and title
+_RESULT_LINE = re.compile(r"^(\d+\. \[[^\]]*\] [^:]*):")
+
+
+def summarize_observation(observation: str, counter: TokenCounter, max_tokens: int = SUMMARY_MAX_TOKENS) -> str:
+    """
+    A short stand-in for an older observation. Search results keep the header and
+    the number, source and title of each result; any other text keeps its first line.
+    Observations that are already short are kept as they are.
+    """
+    observation = str(observation)
+    if counter.count(observation) <= max_tokens:
+        return observation
+    lines = [line.strip() for line in observation.splitlines() if line.strip()]
+    results = [match.group(1) for match in map(_RESULT_LINE.match, lines) if match]
+    summary = SUMMARY_NOTE + "\n".join(lines[:1] + results)
+    return counter.truncate(summary, max_tokens)
+
+
+def format_bounded_scratchpad(intermediate_steps: Sequence[Tuple[AgentAction, str]], counter: TokenCounter,
+                              max_tokens: int = REACT_SCRATCHPAD_MAX_TOKENS,
+                              keep_recent: int = REACT_SCRATCHPAD_KEEP_RECENT) -> str:
+    """format_log_to_str for the steps so far, kept within max_tokens."""
+    steps = list(intermediate_steps)
+    if not steps:
+        return ""
+    logs = [action.log for action, _ in steps]
+    observations: List[str] = [str(observation) for _, observation in steps]
+    older = max(0, len(steps) - keep_recent)
+    for index in range(older):
+        observations[index] = summarize_observation(observations[index], counter)
+
+    # Logs and verbatim observations come back on every step; the counter encodes each once
+    log_tokens = sum(len(tokens) for tokens in counter.encode_many(logs))
+    observation_tokens = [len(tokens) for tokens in counter.encode_many(observations)]
+    used = log_tokens + sum(observation_tokens) + STEP_OVERHEAD_TOKENS * len(steps)
+
+    # Still over the cap: drop the summaries, oldest first
+    omitted, omitted_tokens = 0, counter.count(OMITTED_OBSERVATION)
+    for index in range(older):
+        if used <= max_tokens:
+            break
+        if observation_tokens[index] > omitted_tokens:
+            used -= observation_tokens[index] - omitted_tokens
+            observations[index], observation_tokens[index] = OMITTED_OBSERVATION, omitted_tokens
+            omitted += 1
+
+    # Then cut the latest observations, the oldest of them first; the actions are never cut
+    truncated, note_tokens = 0, counter.count(TRUNCATED_NOTE)
+    for index in range(older, len(steps)):
+        if used <= max_tokens:
+            break
+        keep = max(0, observation_tokens[index] - (used - max_tokens) - note_tokens)
+        if keep + note_tokens >= observation_tokens[index]:
+            continue
+        observations[index] = counter.truncate(observations[index], keep) + TRUNCATED_NOTE
+        used -= observation_tokens[index] - (keep + note_tokens)
+        observation_tokens[index] = keep + note_tokens
+        truncated += 1
+
+    if omitted or truncated:
+        logger.info(f"Scratchpad of {len(steps)} steps: omitted {omitted} and truncated {truncated} "
+                    f"observations to fit {max_tokens} tokens")
+    return "".join(f"{log}\n{OBSERVATION_PREFIX}{observation}\n{LLM_PREFIX}"
+                   for log, observation in zip(logs, observations))
+
+
+def create_bounded_react_agent(llm: BaseLanguageModel, tools: Sequence[BaseTool], prompt: BasePromptTemplate,
+                               counter: TokenCounter, output_parser=None,
+                               max_tokens: int = REACT_SCRATCHPAD_MAX_TOKENS,
+                               keep_recent: int = REACT_SCRATCHPAD_KEEP_RECENT) -> Runnable:
+    """create_react_agent with its scratchpad kept within max_tokens."""
+    missing_vars = {"tools", "tool_names", "agent_scratchpad"}.difference(
+        prompt.input_variables + list(prompt.partial_variables))
+    if missing_vars:
+        raise ValueError(f"Prompt missing required variables: {missing_vars}")
+
+    prompt = prompt.partial(
+        tools=render_text_description(list(tools)),
+        tool_names=", ".join([tool.name for tool in tools]),
+    )
+    return (
+        RunnablePassthrough.assign(
+            agent_scratchpad=lambda x: format_bounded_scratchpad(
+                x["intermediate_steps"], counter, max_tokens, keep_recent),
+        )
+        | prompt
+        | llm.bind(stop=["\nObservation"])
+        | (output_parser or ReActSingleInputOutputParser())
+    )
@@ -0,0 +1,51 @@
+"""
+The model's tokenizer and the process-wide token counter over it.
+
+Both research chains count tokens: the deep research chain to pack its
+prompts and compress search results, both to keep the ReAct scratchpad
+within its cap. They share one TokenCounter, so a text encoded by one is
+never encoded again by the other. The tokenizer is loaded on first use.
+"""
+import logging
+import os
+import re
+from functools import lru_cache
+
+import tiktoken
+
+from agents.researcher.llm.context_packer import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+
+class ApproximateTokenizer:
+    """Offline stand-in for tiktoken: roughly 4 characters per token, lossless decode"""
+
+    _pieces = re.compile(r"\s*\S{1,4}|\s+")
+
+    def encode(self, text: str):
+        return self._pieces.findall(text)
+
+    def decode(self, tokens) -> str:
+        return "".join(tokens)
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer():
+    """Load the tokenizer for the model on first use (tiktoken may need to download its BPE files)"""
+    model = os.getenv('LLM_MODEL')
+    try:
+        try:
+            return tiktoken.encoding_for_model(model if model else "gpt-3.5-turbo")
+        except KeyError:
+            # Fallback for unknown models; its BPE file may need a download just the same
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Could not load tiktoken encoding, approximating token counts: {e}")
+        return ApproximateTokenizer()
+
+
+@lru_cache(maxsize=None)
+def get_token_counter() -> TokenCounter:
+    """Memoized token counter over the model's tokenizer"""
+    return TokenCounter(get_tokenizer)
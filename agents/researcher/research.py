@@ -1,24 +1,59 @@
 
 
-from typing import Any, Dict
-from agents.constants import HUMAN_FEEDBACK
+import asyncio
+import traceback
+from typing import Any, Dict, List, Optional
+from agents.constants import AWAITING_HUMAN_FEEDBACK, DEEP_RESEARCH_CONCURRENCY, HUMAN_FEEDBACK
 from agents.researcher.deep_researcher.graph import init_deep_research_team
 from agents.researcher.memory.researcher_state import ResearchState
 from agents.researcher.initial_researcher.chains.initial_research_chain import RelatedTopics
+from agents.researcher.memory.research_topics import Topic
 
 from  .initial_researcher.graph import init_research_team
+from .initial_researcher.agents.Human_Agent import HumanAgent
 import datetime
-from langgraph.checkpoint.memory import MemorySaver
+from agents.checkpointer import get_checkpointer
+from agents.graph_registry import get_compiled_graph
+from agents.researcher.runtime.usage_ledger import budget_exceeded
+
+def get_default_checkpointer():
+    """
+    Checkpointer shared by the research graphs and the orchestrator, so the
+    compiled graphs are reused across requests. Durable when CHECKPOINTER_BACKEND
+    is sqlite or postgres.
+    """
+    return get_checkpointer()
+
+def _initial_research_thread(task_id) -> Dict[str, Any]:
+    # Kept apart from the orchestrator's own thread for the task, which shares the checkpointer
+    return {"configurable": {"thread_id": f"{task_id}-initial"}}
+
+def _topic_key(topic):
+    # A Topic, or the dict a checkpointer without the model class may hand back
+    if isinstance(topic, dict):
+        return topic.get("topic"), topic.get("description")
+    return getattr(topic, "topic", topic), getattr(topic, "description", None)
 
 class ResearchAgent:
     """A simple research agent that can gather information based on requests."""
     
-    def __init__(self, websocket=None, stream_output=False, headers=None):
+    def __init__(self, websocket=None, stream_output=False, headers=None,
+                 deep_research_concurrency: int = DEEP_RESEARCH_CONCURRENCY, checkpointer=None):
         print("Init ResearchAgent")
+        self.checkpointer = checkpointer if checkpointer is not None else get_default_checkpointer()
+        self.deep_research_concurrency = deep_research_concurrency
+        self.human_agent = HumanAgent()
+
+    @staticmethod
+    def _unwrap_task(task):
+        # The orchestrator nests the request: task = {'task': {'query': '...', 'task_id': ...}}
+        if isinstance(task, dict) and isinstance(task.get("task"), dict):
+            return task["task"]
+        return task
     
     async def run_initial_research(self,research_state: ResearchState):
         print("Running initial research...")
-        task = research_state.get("task")
+        task = self._unwrap_task(research_state.get("task"))
         query = task.get("query")
         ### todo source can be based on some plan
         source = task.get("source", "web")
@@ -29,46 +64,99 @@ class ResearchAgent:
         # else:
         #     print_agent_output(f"Running initial research on the following query: {query}", agent="RESEARCHER")
         research_report =  await self.get_research_report(query=query, task_id=task_id)
+        if research_report is None:
+            # Parked until a reviewer answers through resume_with_feedback; nothing is held in memory
+            print(f"Task {task_id} is waiting for human feedback.")
+            return {"task": task, "initial_research": None,
+                    "execution_status": AWAITING_HUMAN_FEEDBACK}
         # print(f"Initial research completed with report: {research_report}")
         print(f"Type of research report: {type(research_report)}")
         print(f"Task {task}")
         return {"task": task, "initial_research": research_report,
                 "execution_status": "InitialResearch"}
     
-    async def get_research_report(self,query: str, task_id:str):
+    def _initial_researcher(self):
+        return get_compiled_graph("initial_researcher", init_research_team,
+                                  checkpointer=self.checkpointer,
+                                  interrupt_before=[HUMAN_FEEDBACK],
+                                  png_path="initial_researcher.png")
+
+    async def _finished_result(self, researcher, thread) -> Optional[RelatedTopics]:
+        """The research result once the graph has finished, None while it waits for feedback."""
+        snapshot = await researcher.aget_state(thread)
+        if snapshot.next:
+            return None
+        return snapshot.values.get("research_result")
+
+    async def get_research_report(self,query: str, task_id:str) -> Optional[RelatedTopics]:
+        """
+        Run the initial research up to the human review.
+
+        The graph interrupts before HUMAN_FEEDBACK and its state stays in the
+        checkpointer, so the task is parked without holding a worker. Returns
+        the research result, or None while the task waits for feedback.
+        """
         # Initialize the researcher
         # researcher = GPTResearcher(query=query, report_type=research_report, parent_query=parent_query,
         #                            verbose=verbose, report_source=source, tone=tone, websocket=self.websocket, headers=self.headers)
         
-        researcher_workflow  = init_research_team()
-        ## Temporary in-memory checkpointing
-        memory = MemorySaver()
-        researcher = researcher_workflow.compile(checkpointer=memory,interrupt_before=[HUMAN_FEEDBACK])
-        researcher.get_graph().draw_mermaid_png(output_file_path="initial_researcher.png")
-
-        thread = {"configurable":{"thread_id": task_id}}
-        initial_input = {"query": query}
-        response= await researcher.ainvoke(initial_input,thread)
+        researcher = self._initial_researcher()
+        thread = _initial_research_thread(task_id)
+        snapshot = await self._reusable_state(researcher, thread, lambda values: values.get("query") == query)
+        if snapshot.next and HUMAN_FEEDBACK not in snapshot.next:
+            # Interrupted by a crash or restart: continue after the last completed node
+            print(f"Resuming initial research of task {task_id} at {snapshot.next}")
+            response = await researcher.ainvoke(None, thread)
+        elif not snapshot.values:
+            initial_input = {"query": query}
+            response= await researcher.ainvoke(initial_input,thread)
+        else:
+            response = snapshot.values
         print("Response:", response)
-        print(researcher.get_state(thread).next)
-        while True:
-            user_input = input("Enter your feedback: ")
-            feedback = {HUMAN_FEEDBACK: user_input}
-            response = researcher.update_state(thread,feedback,as_node=HUMAN_FEEDBACK)
-            print("Response after feedback:", response)
-            print(researcher.get_state(thread).next)
-            print("Final state:", researcher.get_state(thread))
-            response= await researcher.ainvoke(None,thread,)
-            print("Response after second input:", response)
-            if user_input.lower() == "accept":
-                print("Feedback accepted, proceeding to next step.")
-                break
-        
-        # print(f"Research completed with response {response}")
-        # print(f"Type of response: {type(response)}")
-        research_result = response["research_result"]
-        ### todo verify the response, it should be a dict with research_result
-        return research_result;
+        return await self._finished_result(researcher, thread)
+
+    async def _reusable_state(self, graph, thread, same_request):
+        """
+        The thread's state, if it holds the request asked for now. The checkpointer
+        outlives the process, so a task id used before for another query or topic
+        finds that research; its thread is deleted and the request starts fresh.
+        """
+        snapshot = await graph.aget_state(thread)
+        if not snapshot.values or same_request(snapshot.values):
+            return snapshot
+        thread_id = thread["configurable"]["thread_id"]
+        print(f"Thread {thread_id} holds research for another request, starting it fresh")
+        await self.checkpointer.adelete_thread(thread_id)
+        return await graph.aget_state(thread)
+
+    async def get_pending_review(self, task_id) -> Optional[RelatedTopics]:
+        """The research a reviewer is asked to look at, or None if the task is not waiting for feedback."""
+        researcher = self._initial_researcher()
+        snapshot = await researcher.aget_state(_initial_research_thread(task_id))
+        if HUMAN_FEEDBACK not in snapshot.next:
+            return None
+        return snapshot.values.get("research_result")
+
+    async def resume_with_feedback(self, task_id, feedback: str) -> Optional[RelatedTopics]:
+        """
+        Resume a parked task with the reviewer's feedback.
+
+        The feedback is applied as the HUMAN_FEEDBACK node, through
+        HumanAgent.get_human_feedback. "accept" finishes the initial research
+        and returns its result; any other feedback sends the research back for
+        revision, after which the task parks again and None is returned.
+        """
+        researcher = self._initial_researcher()
+        thread = _initial_research_thread(task_id)
+        snapshot = await researcher.aget_state(thread)
+        if HUMAN_FEEDBACK not in snapshot.next:
+            raise ValueError(f"Task {task_id} is not waiting for human feedback")
+
+        update = self.human_agent.get_human_feedback({**snapshot.values, HUMAN_FEEDBACK: feedback})
+        await researcher.aupdate_state(thread, update, as_node=HUMAN_FEEDBACK)
+        response = await researcher.ainvoke(None, thread)
+        print("Response after feedback:", response)
+        return await self._finished_result(researcher, thread)
 
     async def get_deep_research_report(self, task:dict,initial_research: RelatedTopics):
         # Placeholder for deep research logic
@@ -80,69 +168,27 @@ class ResearchAgent:
         try:
             # Implement the logic to get deep research report
             # This could involve more complex queries, multiple sources, etc.
-            deep_researcher_workflow  = init_deep_research_team()
-
-            ## Temporary in-memory checkpointing
-            memory = MemorySaver()
-            # deep_researcher = deep_researcher_workflow.compile(checkpointer=memory,interrupt_before=[HUMAN_FEEDBACK])
-            
             ## without interrupting before HUMAN_FEEDBACK
-            deep_researcher = deep_researcher_workflow.compile(checkpointer=memory)
-            deep_researcher.get_graph().draw_mermaid_png(output_file_path="deep_researcher.png")
+            deep_researcher = get_compiled_graph("deep_researcher", init_deep_research_team,
+                                                 checkpointer=self.checkpointer,
+                                                 png_path="deep_researcher.png")
             print("Deep Researcher Workflow initialized.")
             
-            researched_topics = []        
-            # ### This can be parallelized and deep iterations should be possible based on users feedback
-            thread = {"configurable":{"thread_id": f"{task_id}-deep"}}
-            
-            for i, topic in enumerate(initial_research.topics):
-                print(f"Processing topic {i+1}/{len(initial_research.topics)}: {topic.topic}")
-                # "task_id": f"{task_id}-topic-{i}",
-                research_task: Dict[str, Any] = {
-                    "query": query,
-                    "source": source,
-                    "task_id": f"{task_id}-topic-{i}",
-                    "topic": topic
-                }            
-                
-                # Create properly structured input for deep researcher's ResearchState
-                deep_research_input = {
-                    "task": research_task,
-                    "research_from": "WebSearch",  # Default value
-                    "research_state": "Planning",
-                    "human_feedback": "",
-                    "research_result": RelatedTopics(topics=[]),  # Empty initial result
-                    "hallucination_score": True,
-                    "research_reviewer_score": True,
-                    "response_grader_score": True
-                }
-
-                try:
-                    response = await deep_researcher.ainvoke(deep_research_input, thread)
-                    print(f"Deep research response for topic {i+1}: {type(response)}")
-                    print(f"Response keys: {response.keys() if isinstance(response, dict) else 'Not a dict'}")
-                    
-                    # Handle response as dictionary (which it is based on console output)
-                    if isinstance(response, dict) and 'research_result' in response and response['research_result']:
-                        research_result = response['research_result']
-                        if hasattr(research_result, 'topics') and research_result.topics:
-                            researched_topics.extend(research_result.topics)
-                            print(f"Added {len(research_result.topics)} topics from deep research")
-                        else:
-                            print(f"Research result has no topics, keeping original topic: {topic.topic}")
-                            researched_topics.append(topic)
-                    else:
-                        # If no research result, keep the original topic
-                        researched_topics.append(topic)
-                        print(f"No deep research result in response, keeping original topic: {topic.topic}")
-                        
-                except Exception as topic_error:
-                    print(f"Error processing topic {i+1}: {topic_error}")
-                    import traceback
-                    traceback.print_exc()
-                    # Keep the original topic if deep research fails
-                    researched_topics.append(topic)
-            
+            # Each topic runs on its own thread so checkpoints never interleave,
+            # and the semaphore keeps the fan-out within the configured limit.
+            concurrency = task.get("deep_research_concurrency") or self.deep_research_concurrency
+            semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+            topics = initial_research.topics
+            print(f"Researching {len(topics)} topics with concurrency {concurrency}")
+
+            results = await asyncio.gather(*[
+                self._research_topic(deep_researcher, semaphore, query, source, task_id, i, topic, len(topics))
+                for i, topic in enumerate(topics)
+            ])
+
+            # gather preserves input order, so the report follows the initial topic order
+            researched_topics = [topic for topic_result in results for topic in topic_result]
+
             # Create and return RelatedTopics object
             related_topics = RelatedTopics(topics=researched_topics)
             print(f"Deep research completed with {len(researched_topics)} total topics.")
@@ -154,6 +200,72 @@ class ResearchAgent:
             # Return the initial research if deep research fails
             return initial_research
         
+    async def _research_topic(self, deep_researcher, semaphore: asyncio.Semaphore, query: str, source: str,
+                              task_id: str, index: int, topic: Topic, total: int) -> List[Topic]:
+        """
+        Run the deep research graph for a single topic.
+        Failures are isolated to the topic: the original topic is returned instead.
+        """
+        async with semaphore:
+            reason = budget_exceeded()
+            if reason:
+                # Degrade gracefully: the topic keeps its initial research
+                print(f"Skipping deep research of topic {index+1}/{total}, {reason}.")
+                return [topic]
+            print(f"Processing topic {index+1}/{total}: {topic.topic}")
+            topic_task_id = f"{task_id}-topic-{index}"
+            research_task: Dict[str, Any] = {
+                "query": query,
+                "source": source,
+                "task_id": topic_task_id,
+                "topic": topic
+            }
+
+            # Create properly structured input for deep researcher's ResearchState
+            deep_research_input = {
+                "task": research_task,
+                "research_from": "WebSearch",  # Default value
+                "research_state": "Planning",
+                "human_feedback": "",
+                "research_result": RelatedTopics(topics=[]),  # Empty initial result
+                "hallucination_score": True,
+                "research_reviewer_score": True,
+                "response_grader_score": True
+            }
+            thread = {"configurable": {"thread_id": topic_task_id}}
+
+            def same_topic(values):
+                stored = values.get("task") or {}
+                return stored.get("query") == query and _topic_key(stored.get("topic")) == _topic_key(topic)
+
+            try:
+                snapshot = await self._reusable_state(deep_researcher, thread, same_topic)
+                if snapshot.next:
+                    # Interrupted by a crash or restart: continue after the last completed node
+                    print(f"Resuming deep research of topic {index+1} at {snapshot.next}")
+                    response = await deep_researcher.ainvoke(None, thread)
+                elif snapshot.values:
+                    # Already researched before the restart
+                    response = snapshot.values
+                else:
+                    response = await deep_researcher.ainvoke(deep_research_input, thread)
+                print(f"Deep research response for topic {index+1}: {type(response)}")
+
+                if isinstance(response, dict) and response.get('research_result'):
+                    research_result = response['research_result']
+                    if hasattr(research_result, 'topics') and research_result.topics:
+                        print(f"Added {len(research_result.topics)} topics from deep research")
+                        return list(research_result.topics)
+                    print(f"Research result has no topics, keeping original topic: {topic.topic}")
+                else:
+                    print(f"No deep research result in response, keeping original topic: {topic.topic}")
+            except Exception as topic_error:
+                print(f"Error processing topic {index+1}: {topic_error}")
+                traceback.print_exc()
+
+            # Keep the original topic if deep research fails or returns nothing
+            return [topic]
+
     async def run_parallel_deep_research(self, research_state: ResearchState):
         # Placeholder for parallel deep research logic
         print("Running parallel deep research...")
@@ -224,6 +336,13 @@ if __name__ == "__main__":
         initial_result = await agent.run_initial_research(initial_state)
         print(f"✅ Initial Research Completed!")
         print(f"Initial research status: {initial_result.get('execution_status')}")
+        if initial_result["initial_research"] is None:
+            # Parked for human review; the state stays in the checkpointer until a reviewer answers
+            task_id = initial_result["task"]["task_id"]
+            print(f"⏸️ Task {task_id} is waiting for human feedback.")
+            print(f"Review it with `await agent.get_pending_review('{task_id}')` and resume with "
+                  f"`await agent.resume_with_feedback('{task_id}', 'accept')` or your revision notes.")
+            return {"initial_research": initial_result}
         
         # Create state for deep research
         deep_research_state = {
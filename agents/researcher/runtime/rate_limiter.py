@@ -0,0 +1,400 @@
+"""
+Process-wide rate limiting for outbound OpenAI and Tavily calls.
+
+Every request passes through requests-per-minute and tokens-per-minute token
+buckets shared by the whole provider account, plus those of its model when
+the model has limits of its own, and an adaptive (AIMD) concurrency limit
+per provider: the limit grows by about one slot per round of healthy
+responses and is halved on a 429 or when latency exceeds its target.
+Requests waiting for a slot are woken when one is freed. The
+limiter is hooked in at the HTTP transport of the pooled clients, so every
+chain and search tool shares it without any change at the call sites.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import httpx
+
+from agents.researcher.runtime.task_context import record_throttle
+
+# Account-wide defaults per provider, override with e.g. OPENAI_RPM or OPENAI_TPM. A model
+# only gets buckets of its own when given limits of its own, in a "models" entry of its
+# provider's limits or with e.g. OPENAI_GPT_4O_MINI_TPM
+DEFAULT_RATE_LIMITS: Dict[str, Dict[str, Any]] = {
+    "openai": {"rpm": 500, "tpm": 200_000, "concurrency": 8, "max_concurrency": 32, "latency_target": 60.0},
+    "tavily": {"rpm": 100, "tpm": None, "concurrency": 4, "max_concurrency": 16, "latency_target": 15.0},
+}
+RATE_LIMIT_MIN_CONCURRENCY = 1
+
+
+def _env_name(*parts: str) -> str:
+    return "_".join("".join(c if c.isalnum() else "_" for c in part.upper()) for part in parts if part)
+
+
+def _env_limit(default, *parts: str):
+    value = os.getenv(_env_name(*parts))
+    if value is None or value == "":
+        return default
+    return None if value.lower() in ("none", "off") else float(value)
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding up to one minute's budget."""
+
+    def __init__(self, per_minute: float, clock=time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """
+        Take amount tokens right away and return how long the caller must wait
+        before using them. Reservations may run the bucket into debt, which
+        queues later callers behind earlier ones.
+        """
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            now = self._clock()
+            return min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+
+
+class AdaptiveConcurrencyLimiter:
+    """Concurrency limit adjusted by additive increase / multiplicative decrease."""
+
+    def __init__(self, initial: int = 8, min_limit: int = RATE_LIMIT_MIN_CONCURRENCY, max_limit: int = 32,
+                 latency_target: Optional[float] = None, decrease_factor: float = 0.5,
+                 decrease_interval: float = 1.0, clock=time.monotonic):
+        """
+        Args:
+            initial: Starting number of concurrent requests
+            min_limit / max_limit: Bounds of the limit
+            latency_target: Responses slower than this count as overload
+            decrease_factor: Multiplier applied to the limit on overload
+            decrease_interval: Minimum seconds between two decreases, so one burst
+                of 429s halves the limit once instead of collapsing it
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.decrease_interval = decrease_interval
+        self._limit = float(max(min_limit, min(initial, max_limit)))
+        self._in_flight = 0
+        self._clock = clock
+        self._last_decrease = float("-inf")
+        self._lock = threading.Lock()
+        # Sync callers wait on the condition; async callers on a future resolved through their loop
+        self._slot_freed = threading.Condition(self._lock)
+        self._async_waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _take_slot(self) -> bool:
+        if self._in_flight < int(self._limit):
+            self._in_flight += 1
+            return True
+        return False
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            return self._take_slot()
+
+    def acquire(self):
+        """Block until a slot is free and take it."""
+        with self._slot_freed:
+            while not self._take_slot():
+                self._slot_freed.wait()
+
+    async def aacquire(self):
+        """Wait, without blocking the event loop, until a slot is free and take it."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._take_slot():
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await waiter
+            finally:
+                with self._lock:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+
+    def _notify(self):
+        # Every waiter checks again; the limit may have grown by more than one slot
+        self._slot_freed.notify_all()
+        while self._async_waiters:
+            loop, waiter = self._async_waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                pass  # The waiter's loop is closed
+
+    def release(self, overloaded: bool = False, latency: Optional[float] = None):
+        """Free a slot and adapt the limit to how the request went."""
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if self.latency_target is not None and latency is not None and latency > self.latency_target:
+                overloaded = True
+            if overloaded:
+                now = self._clock()
+                if now - self._last_decrease >= self.decrease_interval:
+                    self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+                    self._last_decrease = now
+            else:
+                self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+            self._notify()
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+@dataclass
+class Lease:
+    """A granted request slot; hand it back with RateLimiter.release."""
+    provider: str
+    model: Optional[str]
+    tokens: float
+    waited: float
+    started: float
+
+
+class RateLimiter:
+    """Registry of buckets and concurrency limiters shared by the whole process."""
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, Any]]] = None, clock=time.monotonic):
+        self.limits = limits if limits is not None else DEFAULT_RATE_LIMITS
+        self._clock = clock
+        self._buckets: Dict[Tuple[str, Optional[str]], Tuple[Optional[TokenBucket], Optional[TokenBucket]]] = {}
+        self._concurrency: Dict[str, AdaptiveConcurrencyLimiter] = {}
+        self._cooldown_until: Dict[str, float] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _config(self, provider: str) -> Dict[str, Any]:
+        return self.limits.get(provider, {})
+
+    def _get_buckets(self, provider: str, model: Optional[str] = None):
+        """The account-wide buckets of the provider, or those of one of its models."""
+        key = (provider, model)
+        with self._lock:
+            buckets = self._buckets.get(key)
+            if buckets is None:
+                if model is None:
+                    config = self._config(provider)
+                    rpm = _env_limit(config.get("rpm"), provider, "RPM")
+                    tpm = _env_limit(config.get("tpm"), provider, "TPM")
+                else:
+                    model_config = self._config(provider).get("models", {}).get(model, {})
+                    rpm = _env_limit(model_config.get("rpm"), provider, model, "RPM")
+                    tpm = _env_limit(model_config.get("tpm"), provider, model, "TPM")
+                buckets = (TokenBucket(rpm, self._clock) if rpm else None,
+                           TokenBucket(tpm, self._clock) if tpm else None)
+                self._buckets[key] = buckets
+            return buckets
+
+    def get_concurrency_limiter(self, provider: str) -> AdaptiveConcurrencyLimiter:
+        with self._lock:
+            limiter = self._concurrency.get(provider)
+            if limiter is None:
+                config = self._config(provider)
+                limiter = AdaptiveConcurrencyLimiter(
+                    initial=int(_env_limit(config.get("concurrency", 8), provider, "CONCURRENCY")),
+                    max_limit=int(_env_limit(config.get("max_concurrency", 32), provider, "MAX_CONCURRENCY")),
+                    latency_target=_env_limit(config.get("latency_target"), provider, "LATENCY_TARGET"),
+                    clock=self._clock)
+                self._concurrency[provider] = limiter
+                self._stats[provider] = {"requests": 0, "rate_limited": 0, "throttled_seconds": 0.0}
+            return limiter
+
+    def _reserve(self, provider: str, model: Optional[str], tokens: float) -> float:
+        # Every model draws on the account's buckets, so together they stay within its limits
+        delay = 0.0
+        for request_bucket, token_bucket in [self._get_buckets(provider)] + (
+                [self._get_buckets(provider, model)] if model else []):
+            if request_bucket:
+                delay = max(delay, request_bucket.reserve(1))
+            if token_bucket and tokens:
+                delay = max(delay, token_bucket.reserve(tokens))
+        with self._lock:
+            cooldown = self._cooldown_until.get(provider, 0.0) - self._clock()
+        return max(delay, cooldown)
+
+    def _grant(self, provider: str, model: Optional[str], tokens: float, started: float) -> Lease:
+        waited = max(0.0, self._clock() - started)
+        with self._lock:
+            stats = self._stats[provider]
+            stats["requests"] += 1
+            stats["throttled_seconds"] += waited
+        record_throttle(waited)
+        return Lease(provider, model, tokens, waited, self._clock())
+
+    def acquire(self, provider: str, model: Optional[str] = None, tokens: float = 0) -> Lease:
+        """Block until the request may be sent."""
+        started = self._clock()
+        concurrency = self.get_concurrency_limiter(provider)
+        delay = self._reserve(provider, model, tokens)
+        if delay > 0:
+            time.sleep(delay)
+        concurrency.acquire()
+        return self._grant(provider, model, tokens, started)
+
+    async def aacquire(self, provider: str, model: Optional[str] = None, tokens: float = 0) -> Lease:
+        """Wait, without blocking the event loop, until the request may be sent."""
+        started = self._clock()
+        concurrency = self.get_concurrency_limiter(provider)
+        delay = self._reserve(provider, model, tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await concurrency.aacquire()
+        return self._grant(provider, model, tokens, started)
+
+    def release(self, lease: Lease, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        """Report the outcome of a request and free its concurrency slot."""
+        latency = self._clock() - lease.started
+        rate_limited = status_code == 429
+        overloaded = rate_limited or (status_code is not None and status_code >= 500)
+        self.get_concurrency_limiter(lease.provider).release(overloaded=overloaded, latency=latency)
+        if rate_limited:
+            with self._lock:
+                self._stats[lease.provider]["rate_limited"] += 1
+                if retry_after:
+                    # Hold back every new request to the provider until it is ready again
+                    until = self._clock() + retry_after
+                    self._cooldown_until[lease.provider] = max(self._cooldown_until.get(lease.provider, 0.0), until)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-provider request counts, 429s, throttle time and current concurrency limit."""
+        with self._lock:
+            report = {provider: dict(stats) for provider, stats in self._stats.items()}
+            for provider, limiter in self._concurrency.items():
+                report[provider]["concurrency_limit"] = limiter.limit
+                report[provider]["in_flight"] = limiter.in_flight
+        return report
+
+
+def estimate_request(request: httpx.Request) -> Tuple[Optional[str], float]:
+    """
+    Read the model and an upper bound of the tokens a request will consume.
+
+    Like the provider's own limiter, the estimate counts the prompt (about four
+    bytes per token) plus the requested max_tokens.
+    """
+    try:
+        content = request.content
+        body = json.loads(content) if content else {}
+    except (httpx.RequestNotRead, ValueError):
+        return None, 0.0
+    if not isinstance(body, dict):
+        return None, 0.0
+    max_tokens = body.get("max_tokens") or body.get("max_completion_tokens") or 0
+    return body.get("model"), len(content) / 4 + max_tokens
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """Sync httpx transport that waits for rate-limit capacity before sending."""
+
+    def __init__(self, provider: str, transport: httpx.BaseTransport, limiter: Optional[RateLimiter] = None):
+        self.provider = provider
+        self._transport = transport
+        self._limiter = limiter
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        limiter = self._limiter or get_rate_limiter()
+        model, tokens = estimate_request(request)
+        lease = limiter.acquire(self.provider, model, tokens)
+        response = None
+        try:
+            response = self._transport.handle_request(request)
+            return response
+        finally:
+            limiter.release(lease, response.status_code if response is not None else None,
+                            _retry_after(response) if response is not None else None)
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """Async httpx transport that waits for rate-limit capacity before sending."""
+
+    def __init__(self, provider: str, transport: httpx.AsyncBaseTransport, limiter: Optional[RateLimiter] = None):
+        self.provider = provider
+        self._transport = transport
+        self._limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        limiter = self._limiter or get_rate_limiter()
+        model, tokens = estimate_request(request)
+        lease = await limiter.aacquire(self.provider, model, tokens)
+        response = None
+        try:
+            response = await self._transport.handle_async_request(request)
+            return response
+        finally:
+            limiter.release(lease, response.status_code if response is not None else None,
+                            _retry_after(response) if response is not None else None)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def rate_limit_enabled() -> bool:
+    return os.getenv("RATE_LIMIT_ENABLED", "true").lower() not in ("0", "false", "no")
+
+
+_default_limiter: Optional[RateLimiter] = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter, creating it on first use."""
+    global _default_limiter
+    if _default_limiter is None:
+        with _default_limiter_lock:
+            if _default_limiter is None:
+                _default_limiter = RateLimiter()
+    return _default_limiter
@@ -0,0 +1,72 @@
+"""
+Limits on the grader -> research revise loops.
+
+Each research node counts its attempts in the graph state and keeps the topic
+names of the result it was asked to revise. When the graders ask for another
+revision, loop_exit_reason decides whether the loop should stop instead: the
+task's budget is spent, the attempts are used up, or the last revision came
+back with materially the same topics as the one before. The reason is written
+to the state as loop_exit_reason, so a finished run records why it stopped.
+"""
+import os
+from typing import Any, Dict, List, Mapping, Optional
+
+from agents.researcher.runtime.usage_ledger import budget_exceeded
+
+# Revisions after the first attempt, for the initial research graph and each deep research topic
+MAX_RESEARCH_REVISIONS = int(os.getenv("MAX_RESEARCH_REVISIONS", "3"))
+MAX_DEEP_RESEARCH_REVISIONS = int(os.getenv("MAX_DEEP_RESEARCH_REVISIONS", "2"))
+# Share of topics two consecutive results must have in common to count as the same result
+CONVERGENCE_THRESHOLD = float(os.getenv("RESEARCH_CONVERGENCE_THRESHOLD", "0.8"))
+
+# Why a revise loop ended
+PASSED = "passed"
+BUDGET = "budget"
+MAX_REVISIONS = "max_revisions"
+CONVERGED = "converged"
+
+
+def normalize_topic_name(name: str) -> str:
+    return " ".join(str(name or "").lower().split())
+
+
+def topic_names(research_result) -> List[str]:
+    """Normalized topic names of a research result, in order."""
+    if not research_result or not getattr(research_result, "topics", None):
+        return []
+    return [normalize_topic_name(topic.topic) for topic in research_result.topics]
+
+
+def topic_overlap(previous: List[str], current: List[str]) -> float:
+    """Jaccard similarity of two topic name lists; two empty results are the same."""
+    previous_set, current_set = set(previous), set(current)
+    if not previous_set and not current_set:
+        return 1.0
+    return len(previous_set & current_set) / len(previous_set | current_set)
+
+
+def start_attempt(state: Mapping[str, Any]) -> Dict[str, Any]:
+    """State update for a research node starting another attempt on the state's result."""
+    return {
+        "research_attempts": (state.get("research_attempts") or 0) + 1,
+        "previous_topic_names": topic_names(state.get("research_result")),
+    }
+
+
+def loop_exit_reason(state: Mapping[str, Any], revise: bool, max_revisions: int) -> Optional[str]:
+    """Why the loop should end now, or None to revise again."""
+    if budget_exceeded():
+        return BUDGET
+    if not revise:
+        return PASSED
+    attempts = state.get("research_attempts") or 0
+    if attempts > max_revisions:
+        return MAX_REVISIONS
+    # The first attempt has nothing to converge with. Topics an incremental revision kept
+    # are in both results by design; only the slots it researched again are compared
+    accepted = set(state.get("accepted_topic_names") or [])
+    previous = [name for name in state.get("previous_topic_names") or [] if name not in accepted]
+    current = [name for name in topic_names(state.get("research_result")) if name not in accepted]
+    if attempts > 1 and topic_overlap(previous, current) >= CONVERGENCE_THRESHOLD:
+        return CONVERGED
+    return None
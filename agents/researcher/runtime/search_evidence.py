@@ -0,0 +1,58 @@
+"""
+Search results a research step was based on, collected while it runs.
+
+A node opens a collection scope around its chain call; every search tool
+called inside it, in asyncio tasks or executor threads alike, adds its
+results. The node then puts the collected snippets into the graph state, so
+graders can check topics against the evidence they came from.
+"""
+import contextlib
+import contextvars
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+# Snippets kept per step; the graders only need the text the topics were written from
+MAX_EVIDENCE_RESULTS = 50
+
+_collector = contextvars.ContextVar("search_evidence_collector", default=None)
+_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def collect_search_evidence() -> Iterator[List[Dict[str, Any]]]:
+    """Collect the results of every search run inside the block into the yielded list."""
+    evidence: List[Dict[str, Any]] = []
+    token = _collector.set(evidence)
+    try:
+        yield evidence
+    finally:
+        _collector.reset(token)
+
+
+def record_search_results(results: Any):
+    """Add search results to the current collection scope, if any; other tool output is ignored."""
+    evidence: Optional[List[Dict[str, Any]]] = _collector.get()
+    if evidence is None or not isinstance(results, list):
+        return
+    with _lock:
+        seen = {item.get("url") for item in evidence}
+        for result in results:
+            if not isinstance(result, dict) or len(evidence) >= MAX_EVIDENCE_RESULTS:
+                continue
+            if result.get("url") in seen:
+                continue
+            seen.add(result.get("url"))
+            evidence.append({"title": result.get("title") or "", "url": result.get("url") or "",
+                             "content": result.get("content") or ""})
+
+
+def merge_search_evidence(earlier: Optional[List[Dict[str, Any]]],
+                          evidence: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The earlier evidence followed by the new results it does not have yet, one per url."""
+    merged = list(earlier or [])
+    seen = {item.get("url") for item in merged}
+    for item in evidence:
+        if item.get("url") not in seen:
+            seen.add(item.get("url"))
+            merged.append(item)
+    return merged
@@ -0,0 +1,56 @@
+"""
+Per-task context shared by every node, chain and tool running for a task.
+
+The current task id lives in a context variable, so it follows the work into
+graph nodes, asyncio tasks and the executor threads langchain runs sync
+tools in, without being passed through every call.
+"""
+import contextlib
+import contextvars
+import threading
+from collections import defaultdict
+from typing import Dict, Optional
+
+_current_task_id = contextvars.ContextVar("current_task_id", default=None)
+
+# Seconds each task spent waiting on the rate limiter
+_throttle_seconds: Dict[str, float] = defaultdict(float)
+_lock = threading.Lock()
+
+
+def get_current_task_id() -> Optional[str]:
+    return _current_task_id.get()
+
+
+@contextlib.contextmanager
+def task_scope(task_id):
+    """Attribute everything run inside the block to the given task."""
+    token = _current_task_id.set(str(task_id) if task_id is not None else None)
+    try:
+        yield
+    finally:
+        _current_task_id.reset(token)
+
+
+def record_throttle(seconds: float, task_id: Optional[str] = None):
+    """Add time spent waiting for rate-limit capacity to the (current) task."""
+    task_id = task_id if task_id is not None else get_current_task_id()
+    if task_id is None or seconds <= 0:
+        return
+    with _lock:
+        _throttle_seconds[str(task_id)] += seconds
+
+
+def get_throttle_seconds(task_id) -> float:
+    """Total seconds the task has been throttled so far."""
+    with _lock:
+        return _throttle_seconds.get(str(task_id), 0.0)
+
+
+def reset_task_stats(task_id=None):
+    """Forget the recorded throttle time of one task, or of every task."""
+    with _lock:
+        if task_id is None:
+            _throttle_seconds.clear()
+        else:
+            _throttle_seconds.pop(str(task_id), None)
@@ -0,0 +1,271 @@
+"""
+Token, search and cost accounting per task, graph node and model.
+
+A callback handler attached to every chat model records the prompt and
+completion tokens of each response; the Tavily client records each search.
+Entries are attributed to the task of the current task scope and to the
+LangGraph node the call was made from. Tasks may carry a budget, which the
+graphs check to stop revising once it is spent.
+"""
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple, TypedDict
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables.config import var_child_runnable_config
+
+from agents.researcher.runtime.task_context import get_current_task_id
+
+# USD per million (prompt, completion) tokens; the longest matching model prefix wins
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4": (30.00, 60.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+# Tavily bills credits per search: basic searches cost one, advanced searches two
+SEARCH_CREDITS = {"basic": 1, "advanced": 2}
+SEARCH_COST_PER_CREDIT = float(os.getenv("TAVILY_COST_PER_CREDIT", "0.008"))
+UNSCOPED_TASK_ID = "unscoped"
+
+COUNTERS = ("llm_calls", "cached_llm_calls", "prompt_tokens", "completion_tokens",
+            "searches", "cached_searches", "search_credits", "cost_usd",
+            "pregraded_topics", "llm_calls_saved")
+
+
+class TaskBudget(TypedDict, total=False):
+    """Spending limits of a task; any limit left out is unlimited."""
+    max_tokens: int
+    max_cost_usd: float
+    max_searches: int
+
+
+def model_cost(model: Optional[str], prompt_tokens: int, completion_tokens: int) -> float:
+    """Cost in USD of a call, 0 for models without a known price."""
+    if not model:
+        return 0.0
+    matches = [prefix for prefix in MODEL_PRICES if model.startswith(prefix)]
+    if not matches:
+        return 0.0
+    prompt_price, completion_price = MODEL_PRICES[max(matches, key=len)]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def node_from_metadata(metadata: Optional[Dict[str, Any]]) -> str:
+    """
+    Name of the graph node a call was made from, including parent graphs,
+    e.g. "deep_researcher/research".
+    """
+    metadata = metadata or {}
+    namespace = metadata.get("langgraph_checkpoint_ns")
+    if namespace:
+        return "/".join(part.split(":")[0] for part in namespace.split("|") if part)
+    return metadata.get("langgraph_node") or "unknown"
+
+
+def current_node() -> str:
+    """Node of the runnable currently executing, for calls made outside a callback."""
+    config = var_child_runnable_config.get() or {}
+    return node_from_metadata(config.get("metadata"))
+
+
+class UsageLedger:
+    """Thread-safe counters per task, keyed by (node, model)."""
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[Tuple[str, str], Dict[str, float]]] = defaultdict(dict)
+        self._budgets: Dict[str, TaskBudget] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _task(task_id) -> str:
+        if task_id is None:
+            task_id = get_current_task_id()
+        return str(task_id) if task_id is not None else UNSCOPED_TASK_ID
+
+    def _add(self, task_id, node: str, model: str, **amounts):
+        with self._lock:
+            entry = self._entries[self._task(task_id)].setdefault(
+                (node, model), {counter: 0 for counter in COUNTERS})
+            for counter, amount in amounts.items():
+                entry[counter] += amount
+
+    def record_llm(self, model: Optional[str], prompt_tokens: int, completion_tokens: int,
+                   node: str = "unknown", cached: bool = False, task_id=None):
+        """Record one LLM response; cache hits are counted but cost nothing."""
+        if cached:
+            self._add(task_id, node, model or "unknown", cached_llm_calls=1)
+            return
+        self._add(task_id, node, model or "unknown", llm_calls=1, prompt_tokens=prompt_tokens,
+                  completion_tokens=completion_tokens,
+                  cost_usd=model_cost(model, prompt_tokens, completion_tokens))
+
+    def record_search(self, search_depth: str = "basic", node: Optional[str] = None,
+                      cached: bool = False, provider: str = "tavily", task_id=None):
+        """Record one web search; searches served from the cache cost nothing."""
+        node = node or current_node()
+        if cached:
+            self._add(task_id, node, provider, cached_searches=1)
+            return
+        credits = SEARCH_CREDITS.get(search_depth, 1)
+        self._add(task_id, node, provider, searches=1, search_credits=credits,
+                  cost_usd=credits * SEARCH_COST_PER_CREDIT)
+
+    def record_pregrade(self, decided_topics: int, llm_calls_saved: int, node: Optional[str] = None,
+                        task_id=None):
+        """Record topics graded locally and the LLM grader calls that spared."""
+        self._add(task_id, node or current_node(), "heuristic", pregraded_topics=decided_topics,
+                  llm_calls_saved=llm_calls_saved)
+
+    def set_budget(self, task_id, budget: Optional[TaskBudget]):
+        with self._lock:
+            if budget:
+                self._budgets[self._task(task_id)] = dict(budget)
+            else:
+                self._budgets.pop(self._task(task_id), None)
+
+    def totals(self, task_id=None) -> Dict[str, float]:
+        with self._lock:
+            entries = list(self._entries.get(self._task(task_id), {}).values())
+        totals = {counter: 0 for counter in COUNTERS}
+        for entry in entries:
+            for counter in COUNTERS:
+                totals[counter] += entry[counter]
+        totals["total_tokens"] = totals["prompt_tokens"] + totals["completion_tokens"]
+        return totals
+
+    def budget_exceeded(self, task_id=None) -> Optional[str]:
+        """Reason the task's budget is spent, or None while it may keep going."""
+        with self._lock:
+            budget = self._budgets.get(self._task(task_id))
+        if not budget:
+            return None
+        totals = self.totals(task_id)
+        if budget.get("max_tokens") is not None and totals["total_tokens"] >= budget["max_tokens"]:
+            return f"token budget of {budget['max_tokens']} spent ({totals['total_tokens']} used)"
+        if budget.get("max_cost_usd") is not None and totals["cost_usd"] >= budget["max_cost_usd"]:
+            return f"cost budget of ${budget['max_cost_usd']:.2f} spent (${totals['cost_usd']:.4f} used)"
+        if budget.get("max_searches") is not None and totals["searches"] >= budget["max_searches"]:
+            return f"search budget of {budget['max_searches']} spent ({totals['searches']} used)"
+        return None
+
+    def summary(self, task_id=None) -> Dict[str, Any]:
+        """Totals of a task, broken down by node and by model."""
+        task = self._task(task_id)
+        with self._lock:
+            entries = dict(self._entries.get(task, {}))
+            budget = self._budgets.get(task)
+        by_node: Dict[str, Dict[str, float]] = defaultdict(lambda: {counter: 0 for counter in COUNTERS})
+        by_model: Dict[str, Dict[str, float]] = defaultdict(lambda: {counter: 0 for counter in COUNTERS})
+        for (node, model), entry in entries.items():
+            for counter in COUNTERS:
+                by_node[node][counter] += entry[counter]
+                by_model[model][counter] += entry[counter]
+        return {
+            "task_id": task,
+            "totals": self.totals(task),
+            "by_node": dict(by_node),
+            "by_model": dict(by_model),
+            "budget": budget,
+            "budget_exceeded": self.budget_exceeded(task),
+        }
+
+    def format_summary(self, task_id=None) -> str:
+        summary = self.summary(task_id)
+        totals = summary["totals"]
+        lines = [f"Usage for task {summary['task_id']}: {totals['llm_calls']} LLM calls "
+                 f"({totals['cached_llm_calls']} cached), {totals['prompt_tokens']} prompt + "
+                 f"{totals['completion_tokens']} completion tokens, {totals['searches']} searches "
+                 f"({totals['cached_searches']} cached), ${totals['cost_usd']:.4f}"]
+        if totals["pregraded_topics"]:
+            lines.append(f"  Pre-grading: {totals['pregraded_topics']} topics graded locally, "
+                         f"{totals['llm_calls_saved']} LLM calls saved")
+        for node, usage in sorted(summary["by_node"].items()):
+            lines.append(f"  {node}: {usage['llm_calls']} calls, "
+                         f"{usage['prompt_tokens'] + usage['completion_tokens']} tokens, "
+                         f"{usage['searches']} searches, ${usage['cost_usd']:.4f}")
+        if summary["budget_exceeded"]:
+            lines.append(f"  Budget: {summary['budget_exceeded']}")
+        return "\n".join(lines)
+
+    def reset(self, task_id=None):
+        """Forget the usage and budget of one task, or of every task."""
+        with self._lock:
+            if task_id is None:
+                self._entries.clear()
+                self._budgets.clear()
+            else:
+                self._entries.pop(str(task_id), None)
+                self._budgets.pop(str(task_id), None)
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """Feeds the token usage of every chat model response into the ledger."""
+
+    def __init__(self, ledger: UsageLedger):
+        self.ledger = ledger
+        self._runs: Dict[UUID, Tuple[str, Optional[str]]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, metadata: Optional[Dict[str, Any]], invocation_params: Optional[Dict[str, Any]]):
+        params = invocation_params or {}
+        with self._lock:
+            self._runs[run_id] = (node_from_metadata(metadata), params.get("model_name") or params.get("model"))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs):
+        self._start(run_id, metadata, kwargs.get("invocation_params"))
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, metadata=None, **kwargs):
+        self._start(run_id, metadata, kwargs.get("invocation_params"))
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        with self._lock:
+            node, model = self._runs.pop(run_id, ("unknown", None))
+        llm_output = response.llm_output or {}
+        model = llm_output.get("model_name") or model
+
+        prompt_tokens = completion_tokens = 0
+        cached = False
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                # Cache hits come back with their cost zeroed out
+                cached = cached or usage.get("total_cost") == 0
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+        if not cached and not (prompt_tokens or completion_tokens):
+            token_usage = llm_output.get("token_usage") or {}
+            prompt_tokens = token_usage.get("prompt_tokens", 0)
+            completion_tokens = token_usage.get("completion_tokens", 0)
+
+        self.ledger.record_llm(model, prompt_tokens, completion_tokens, node=node, cached=cached)
+
+
+_default_ledger = UsageLedger()
+_default_handler = UsageCallbackHandler(_default_ledger)
+
+
+def get_usage_ledger() -> UsageLedger:
+    """Return the process-wide usage ledger."""
+    return _default_ledger
+
+
+def get_usage_callback() -> UsageCallbackHandler:
+    """Callback handler recording into the process-wide ledger."""
+    return _default_handler
+
+
+def budget_exceeded(task_id=None) -> Optional[str]:
+    """Shortcut for the process-wide ledger, used by the graph routers."""
+    return _default_ledger.budget_exceeded(task_id)
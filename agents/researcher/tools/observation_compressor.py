@@ -0,0 +1,110 @@
+"""
+Extractive compression of search results for the research agents.
+
+Oversized Tavily results used to be cut at a token limit, which kept
+whatever came first and broke the text mid-sentence. compress_search_results
+splits the results into sentences instead, ranks them against the query and
+topic with BM25 (vectorized over all sentences with NumPy, no model calls),
+and keeps the best sentences that fit the token budget. Each kept sentence
+stays under the title and url of the result it came from, in its original
+order, so the agent can still cite its sources.
+"""
+import re
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+from agents.researcher.grading.heuristic_grader import STOPWORDS
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.5
+BM25_B = 0.75
+# A sentence sharing this much of its words with one already kept is a repeat
+DUPLICATE_OVERLAP = 0.8
+# Tokens of the keys and punctuation around each result once it is rendered for the prompt
+RESULT_OVERHEAD_TOKENS = 16
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])|\n+")
+_TERM = re.compile(r"[a-z0-9][a-z0-9\-]*")
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_BREAK.split(str(text or "")) if sentence.strip()]
+
+
+def _terms(text: str) -> List[str]:
+    return [term for term in _TERM.findall(text.lower()) if term not in STOPWORDS and len(term) > 1]
+
+
+def bm25_scores(sentences: Sequence[str], query: str, k1: float = BM25_K1, b: float = BM25_B) -> np.ndarray:
+    """BM25 score of every sentence for the query, the sentences being the corpus."""
+    query_terms = list(dict.fromkeys(_terms(query)))
+    if not sentences or not query_terms:
+        return np.zeros(len(sentences))
+    column = {term: index for index, term in enumerate(query_terms)}
+    sentence_terms = [_terms(sentence) for sentence in sentences]
+
+    # Term frequencies of the query terms, sentences by terms
+    rows, cols = [], []
+    for row, terms in enumerate(sentence_terms):
+        for term in terms:
+            if term in column:
+                rows.append(row)
+                cols.append(column[term])
+    tf = np.zeros((len(sentences), len(query_terms)))
+    np.add.at(tf, (np.array(rows, dtype=int), np.array(cols, dtype=int)), 1.0)
+
+    lengths = np.array([len(terms) for terms in sentence_terms], dtype=float)
+    average_length = lengths.mean() or 1.0
+    df = (tf > 0).sum(axis=0)
+    idf = np.log((len(sentences) - df + 0.5) / (df + 0.5) + 1.0)
+    norm = k1 * (1.0 - b + b * lengths / average_length)
+    return ((tf * (k1 + 1.0)) / (tf + norm[:, None]) * idf).sum(axis=1)
+
+
+def compress_search_results(results: List[Dict[str, Any]], query: str, max_tokens: int,
+                            count_tokens_many: Callable[[List[str]], List[int]]) -> List[Dict[str, Any]]:
+    """
+    The results cut down to their highest-scoring sentences within max_tokens.
+    Results keep their title and url; those left without a sentence are dropped.
+    """
+    sentences, owners = [], []
+    for index, result in enumerate(results):
+        for sentence in split_sentences(result.get("content")):
+            sentences.append(sentence)
+            owners.append(index)
+    if not sentences:
+        return []
+
+    headers = [f"{result.get('title') or ''} {result.get('url') or ''}" for result in results]
+    costs = count_tokens_many(sentences + headers)
+    sentence_costs = costs[:len(sentences)]
+    header_costs = [cost + RESULT_OVERHEAD_TOKENS for cost in costs[len(sentences):]]
+
+    scores = bm25_scores(sentences, query)
+    # Best score first; ties keep the search engine's order. Sentences sharing nothing
+    # with the query are left out, unless nothing does and the order is all there is
+    order = np.lexsort((np.arange(len(sentences)), -scores))
+    if scores.any():
+        order = order[scores[order] > 0]
+
+    kept, kept_terms, used, opened = set(), [], 0, set()
+    for position in order:
+        owner = owners[position]
+        cost = sentence_costs[position] + (0 if owner in opened else header_costs[owner])
+        if used + cost > max_tokens:
+            continue
+        terms = set(_terms(sentences[position]))
+        if terms and any(len(terms & other) >= DUPLICATE_OVERLAP * len(terms) for other in kept_terms):
+            continue
+        kept.add(position)
+        kept_terms.append(terms)
+        opened.add(owner)
+        used += cost
+
+    kept_by_result: Dict[int, List[str]] = {}
+    for position in sorted(kept):
+        kept_by_result.setdefault(owners[position], []).append(sentences[position])
+    return [{"title": result.get("title") or "", "url": result.get("url") or "",
+             "content": " ".join(kept_by_result[index])}
+            for index, result in enumerate(results) if index in kept_by_result]
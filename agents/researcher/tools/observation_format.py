@@ -0,0 +1,102 @@
+"""
+Compact rendering of search results for the ReAct scratchpad.
+
+LangChain puts a tool's return value into the prompt as its repr: every
+dict key, quote, score and url of every result, on every following step.
+format_search_observation renders results as numbered snippets instead, each
+under a short source id such as S1 and its domain. The full urls stay in a
+SourceTable outside the prompt, one per research invocation; the agent cites
+the ids, and resolve_sources maps them back to urls in the parsed topics.
+"""
+import contextlib
+import contextvars
+import re
+import threading
+from typing import Any, Dict, Iterator, Optional
+
+from agents.researcher.grading.heuristic_grader import source_domain
+
+_source_table = contextvars.ContextVar("search_source_table", default=None)
+
+# A citation of one of our source ids, bracketed or not
+_SOURCE_ID = re.compile(r"\[?\bS(\d+)\b\]?")
+# A source made only of such citations, e.g. "S1" or "[S2], S3"; anything else, like a url, is left alone
+_SOURCE_IDS = re.compile(r"^\s*\[?S\d+\]?(?:\s*(?:[,;&]|and)?\s*\[?S\d+\]?)*\s*$")
+
+
+class SourceTable:
+    """Short source ids of one research invocation and the urls they stand for."""
+
+    def __init__(self):
+        self._ids: Dict[str, str] = {}
+        self._urls: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def add(self, url: str) -> str:
+        with self._lock:
+            source_id = self._ids.get(url)
+            if source_id is None:
+                source_id = f"S{len(self._ids) + 1}"
+                self._ids[url] = source_id
+                self._urls[source_id] = url
+            return source_id
+
+    def url(self, source_id: str) -> Optional[str]:
+        return self._urls.get(source_id)
+
+    def resolve(self, text: str) -> str:
+        """Replace the source ids a source cites with their urls; unknown ids are left as they are."""
+        text = str(text or "")
+        if not _SOURCE_IDS.match(text):
+            return text
+        def replace(match):
+            return self._urls.get(f"S{match.group(1)}", match.group(0))
+        return _SOURCE_ID.sub(replace, text)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+@contextlib.contextmanager
+def source_table() -> Iterator[SourceTable]:
+    """Give the searches run inside the block one table of source ids."""
+    table = SourceTable()
+    token = _source_table.set(table)
+    try:
+        yield table
+    finally:
+        _source_table.reset(token)
+
+
+def format_search_observation(results: Any) -> Any:
+    """
+    Search results as numbered snippets with source ids, registered in the current
+    source table. Without one the full url is shown, so a source is never lost.
+    Anything but a list of results, e.g. an error message, is returned as it is.
+    """
+    if not isinstance(results, list) or not all(isinstance(result, dict) for result in results):
+        return results
+    if not results:
+        return "No search results."
+    table: Optional[SourceTable] = _source_table.get()
+    lines = ["Search results (cite sources by id):" if table is not None else "Search results:"]
+    for number, result in enumerate(results, 1):
+        url = result.get("url") or ""
+        title = " ".join(str(result.get("title") or "").split())
+        content = " ".join(str(result.get("content") or "").split())
+        if table is not None and url:
+            source = f"{table.add(url)} {source_domain(url) or url}"
+        else:
+            source = url or "unknown source"
+        lines.append(f"{number}. [{source}] {title}: {content}")
+    return "\n".join(lines)
+
+
+def resolve_sources(research_result, table: SourceTable):
+    """The research result with the source ids its topics cite replaced by urls."""
+    if research_result is None or not len(table) or not getattr(research_result, "topics", None):
+        return research_result
+    topics = [topic.model_copy(update={"source": table.resolve(topic.source)})
+              if _SOURCE_IDS.match(str(topic.source or "")) else topic
+              for topic in research_result.topics]
+    return research_result.model_copy(update={"topics": topics})
@@ -0,0 +1,186 @@
+"""
+Two-tier cache for web search results.
+
+Entries live in an in-memory LRU and in an on-disk SQLite table, both with a
+per-entry TTL and a size bound, so overlapping topics, tasks and revise loops
+reuse earlier searches instead of spending search quota again.
+"""
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", os.path.join(".cache", "search_cache.sqlite"))
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+SEARCH_CACHE_MEMORY_ENTRIES = int(os.getenv("SEARCH_CACHE_MEMORY_ENTRIES", "512"))
+SEARCH_CACHE_DISK_ENTRIES = int(os.getenv("SEARCH_CACHE_DISK_ENTRIES", "10000"))
+
+
+def normalize_query(query: str) -> str:
+    """Lower-case the query and collapse whitespace so trivial variations share an entry."""
+    return " ".join(str(query).lower().split())
+
+
+class SearchCache:
+    """LRU memory tier in front of a SQLite tier, with TTL and hit/miss counters."""
+
+    def __init__(self, path: Optional[str] = SEARCH_CACHE_PATH, ttl_seconds: float = SEARCH_CACHE_TTL_SECONDS,
+                 max_memory_entries: int = SEARCH_CACHE_MEMORY_ENTRIES,
+                 max_disk_entries: int = SEARCH_CACHE_DISK_ENTRIES):
+        """
+        Args:
+            path: SQLite file for the disk tier; None or "" keeps the cache in memory only
+            ttl_seconds: Default time to live of an entry
+            max_memory_entries: Entries kept in the memory tier before LRU eviction
+            max_disk_entries: Entries kept on disk before the least recently used are evicted
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0,
+                       "evictions": 0, "expirations": 0}
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_access ON search_cache(last_access)")
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(query: str, **search_params) -> str:
+        """Key on the normalized query plus every search parameter (max_results, search_depth, ...)."""
+        material = json.dumps({"query": normalize_query(query), "params": search_params},
+                              sort_keys=True, default=str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a copy of the cached value, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    # Disk recency is flushed in bulk on the next write instead of per hit
+                    self._touched[key] = now
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return copy.deepcopy(value)
+                del self._memory[key]
+                self._stats["expirations"] += 1
+                if self._conn is not None:
+                    self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self._stats["misses"] += 1
+                return None
+
+            if self._conn is not None:
+                row = self._conn.execute("SELECT value, expires_at FROM search_cache WHERE key = ?",
+                                         (key,)).fetchone()
+                if row is not None:
+                    if row[1] > now:
+                        self._conn.execute("UPDATE search_cache SET last_access = ? WHERE key = ?", (now, key))
+                        self._conn.commit()
+                        value = json.loads(row[0])
+                        self._remember(key, row[1], value)
+                        self._stats["hits"] += 1
+                        self._stats["disk_hits"] += 1
+                        return copy.deepcopy(value)
+                    self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._stats["expirations"] += 1
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a value in both tiers, evicting the least recently used entries when full."""
+        now = time.time()
+        expires_at = now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, default=str), expires_at, now))
+                self._evict_disk(now)
+                self._conn.commit()
+
+    def _remember(self, key: str, expires_at: float, value: Any):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _evict_disk(self, now: float):
+        if self._touched:
+            self._conn.executemany("UPDATE search_cache SET last_access = ? WHERE key = ?",
+                                   [(accessed, key) for key, accessed in self._touched.items()])
+            self._touched.clear()
+        self._conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (now,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM search_cache WHERE key IN "
+                "(SELECT key FROM search_cache ORDER BY last_access ASC LIMIT ?)", (overflow,))
+            self._stats["evictions"] += overflow
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters plus current tier sizes."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            if self._conn is not None:
+                stats["disk_entries"] = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM search_cache")
+                self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_default_cache: Optional[SearchCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """Return the process-wide search cache, or None when SEARCH_CACHE_ENABLED is false."""
+    global _default_cache
+    if os.getenv("SEARCH_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = SearchCache()
+    return _default_cache
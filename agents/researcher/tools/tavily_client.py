@@ -0,0 +1,214 @@
+"""
+Long-lived Tavily search client shared by every search tool.
+
+The client keeps pooled HTTP connections open between calls (sync and async),
+so searches no longer pay for client construction, dotenv loading and a fresh
+TLS handshake on every tool invocation.
+"""
+import asyncio
+import os
+import threading
+import weakref
+from typing import Any, Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from agents.researcher.runtime.rate_limiter import (AsyncRateLimitedTransport, RateLimitedTransport,
+                                                    RateLimiter, rate_limit_enabled)
+from agents.researcher.runtime.usage_ledger import get_usage_ledger
+from agents.researcher.tools.search_cache import SearchCache, get_search_cache
+
+TAVILY_API_URL = "https://api.tavily.com"
+
+# Connection pool and concurrency configuration
+SEARCH_TIMEOUT_SECONDS = float(os.getenv("TAVILY_TIMEOUT_SECONDS", "30"))
+SEARCH_MAX_CONNECTIONS = int(os.getenv("TAVILY_MAX_CONNECTIONS", "20"))
+SEARCH_MAX_KEEPALIVE = int(os.getenv("TAVILY_MAX_KEEPALIVE", "10"))
+SEARCH_KEEPALIVE_EXPIRY = float(os.getenv("TAVILY_KEEPALIVE_EXPIRY", "60"))
+SEARCH_CONCURRENCY = int(os.getenv("TAVILY_SEARCH_CONCURRENCY", "4"))
+
+
+class TavilySearchClient:
+    """Tavily search client with pooled sync and async HTTP connections."""
+
+    def __init__(self, api_key: Optional[str] = None, timeout: float = SEARCH_TIMEOUT_SECONDS,
+                 max_connections: int = SEARCH_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = SEARCH_MAX_KEEPALIVE,
+                 keepalive_expiry: float = SEARCH_KEEPALIVE_EXPIRY,
+                 transport: Optional[httpx.BaseTransport] = None,
+                 async_transport: Optional[httpx.AsyncBaseTransport] = None,
+                 cache: Optional[SearchCache] = None,
+                 rate_limiter: Optional[RateLimiter] = None):
+        if api_key is None:
+            load_dotenv()
+            api_key = os.getenv("TAVILY_API_KEY")
+        self.api_key = api_key
+        self._timeout = httpx.Timeout(timeout)
+        self._limits = httpx.Limits(max_connections=max_connections,
+                                    max_keepalive_connections=max_keepalive_connections,
+                                    keepalive_expiry=keepalive_expiry)
+        self._transport = transport
+        self._async_transport = async_transport
+        self._client: Optional[httpx.Client] = None
+        # An httpx.AsyncClient is bound to the event loop it was first used on
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        # Optional result cache; searches with identical parameters are served from it
+        self.cache = cache
+        # Shared Tavily buckets; the process-wide limiter is used unless one is given
+        self.rate_limiter = rate_limiter
+
+    def _sync_client(self) -> httpx.Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    transport = self._transport or httpx.HTTPTransport(limits=self._limits)
+                    if self.rate_limiter is not None or rate_limit_enabled():
+                        transport = RateLimitedTransport("tavily", transport, self.rate_limiter)
+                    self._client = httpx.Client(base_url=TAVILY_API_URL, timeout=self._timeout,
+                                                transport=transport)
+        return self._client
+
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            transport = self._async_transport or httpx.AsyncHTTPTransport(limits=self._limits)
+            if self.rate_limiter is not None or rate_limit_enabled():
+                transport = AsyncRateLimitedTransport("tavily", transport, self.rate_limiter)
+            client = httpx.AsyncClient(base_url=TAVILY_API_URL, timeout=self._timeout,
+                                       transport=transport)
+            self._async_clients[loop] = client
+        return client
+
+    def _build_payload(self, query: str, max_results: int, search_depth: str, include_answer: bool,
+                       include_raw_content: bool, include_images: bool,
+                       include_domains: Optional[List[str]], exclude_domains: Optional[List[str]]) -> Dict[str, Any]:
+        if not self.api_key:
+            raise ValueError("TAVILY_API_KEY is not set")
+        return {
+            "api_key": self.api_key,
+            "query": query,
+            "max_results": max_results,
+            "search_depth": search_depth,
+            "include_domains": include_domains or [],
+            "exclude_domains": exclude_domains or [],
+            "include_answer": include_answer,
+            "include_raw_content": include_raw_content,
+            "include_images": include_images,
+        }
+
+    def _lookup(self, payload: Dict[str, Any]):
+        if self.cache is None:
+            return None, None
+        search_params = {k: v for k, v in payload.items() if k not in ("api_key", "query")}
+        cache_key = self.cache.make_key(payload["query"], **search_params)
+        return cache_key, self.cache.get(cache_key)
+
+    def _store(self, cache_key: Optional[str], results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if self.cache is not None and cache_key is not None:
+            self.cache.set(cache_key, results)
+        return results
+
+    @staticmethod
+    def clean_results(raw_results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Keep the same result shape as langchain's TavilySearchResults."""
+        clean_results = []
+        for result in raw_results.get("results", []):
+            clean_result = {
+                "title": result.get("title"),
+                "url": result.get("url"),
+                "content": result.get("content"),
+                "score": result.get("score"),
+            }
+            if raw_content := result.get("raw_content"):
+                clean_result["raw_content"] = raw_content
+            clean_results.append(clean_result)
+        return clean_results
+
+    def search(self, query: str, max_results: int = 5, search_depth: str = "advanced",
+               include_answer: bool = False, include_raw_content: bool = False, include_images: bool = False,
+               include_domains: Optional[List[str]] = None,
+               exclude_domains: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Run a single search over the pooled sync connection."""
+        payload = self._build_payload(query, max_results, search_depth, include_answer, include_raw_content,
+                                      include_images, include_domains, exclude_domains)
+        cache_key, cached = self._lookup(payload)
+        if cached is not None:
+            get_usage_ledger().record_search(search_depth, cached=True)
+            return cached
+
+        response = self._sync_client().post("/search", json=payload)
+        response.raise_for_status()
+        get_usage_ledger().record_search(search_depth)
+        return self._store(cache_key, self.clean_results(response.json()))
+
+    async def asearch(self, query: str, max_results: int = 5, search_depth: str = "advanced",
+                      include_answer: bool = False, include_raw_content: bool = False, include_images: bool = False,
+                      include_domains: Optional[List[str]] = None,
+                      exclude_domains: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Run a single search over the pooled async connection."""
+        payload = self._build_payload(query, max_results, search_depth, include_answer, include_raw_content,
+                                      include_images, include_domains, exclude_domains)
+        # The cache's SQLite tier reads and commits synchronously; keep it off the event loop
+        cache_key, cached = await asyncio.to_thread(self._lookup, payload) if self.cache is not None else (None, None)
+        if cached is not None:
+            get_usage_ledger().record_search(search_depth, cached=True)
+            return cached
+
+        response = await self._async_client().post("/search", json=payload)
+        response.raise_for_status()
+        get_usage_ledger().record_search(search_depth)
+        results = self.clean_results(response.json())
+        if cache_key is not None:
+            await asyncio.to_thread(self._store, cache_key, results)
+        return results
+
+    async def search_many(self, queries: List[str], max_concurrency: int = SEARCH_CONCURRENCY,
+                          **search_params) -> List[List[Dict[str, Any]]]:
+        """
+        Run several searches concurrently, at most max_concurrency at a time.
+
+        Results come back in the order of the queries. A failing query yields an
+        empty result list instead of failing the whole batch.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def _search_one(query: str) -> List[Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    return await self.asearch(query, **search_params)
+                except Exception as e:
+                    print(f"Search failed for '{query}': {e}")
+                    return []
+
+        return list(await asyncio.gather(*[_search_one(query) for query in queries]))
+
+    def close(self):
+        """Close the sync connection pool. Async pools close with their event loop."""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    async def aclose(self):
+        """Close the async connection pool of the running event loop."""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+_default_client: Optional[TavilySearchClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_search_client() -> TavilySearchClient:
+    """Return the process-wide Tavily client, creating it on first use."""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = TavilySearchClient(cache=get_search_cache())
+    return _default_client
@@ -0,0 +1,87 @@
+import sys
+import time
+from pathlib import Path
+from typing import TypedDict
+
+import pytest
+from langgraph.graph import END, StateGraph
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents.checkpoint_retention import CheckpointCompactor, RetentionPolicy, checkpoint_timestamp
+from agents.checkpointer import BoundedMemorySaver, create_checkpointer, list_thread_ids
+
+
+class CounterState(TypedDict, total=False):
+    count: int
+
+
+def _counter_graph(checkpointer, steps=1, interrupt=False):
+    workflow = StateGraph(CounterState)
+    workflow.add_node("increment", lambda state: {"count": state.get("count", 0) + 1})
+    workflow.set_entry_point("increment")
+    workflow.add_conditional_edges("increment", lambda state: "again" if state["count"] < steps else "done",
+                                   {"again": "increment", "done": END})
+    return workflow.compile(checkpointer=checkpointer, interrupt_before=["increment"] if interrupt else None)
+
+
+def _run(graph, thread_id, task_id):
+    graph.invoke({"count": 0}, {"configurable": {"thread_id": thread_id},
+                                "metadata": {"research_task_id": task_id}})
+
+
+def _research_tasks(checkpointer):
+    """A finished task and a parked one, each with an initial research and a topic sub-thread."""
+    graph, parked = _counter_graph(checkpointer), _counter_graph(checkpointer, interrupt=True)
+    for task_id, task_graph in (("done", graph), ("parked", parked)):
+        _run(graph, f"{task_id}-initial", task_id)
+        _run(graph, f"{task_id}-topic-0", task_id)
+        _run(task_graph, task_id, task_id)
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "memory"])
+def test_finished_subthreads_are_deleted_once_their_task_is_done(tmp_path, backend):
+    checkpointer = create_checkpointer(backend, sqlite_path=str(tmp_path / "checkpoints.sqlite"))
+    _research_tasks(checkpointer)
+
+    report = CheckpointCompactor(checkpointer, RetentionPolicy(max_checkpoints_per_thread=None)).compact()
+
+    assert report.finished_subthreads == 2 and report.expired_threads == 0
+    assert report.checkpoints > 0 and report.bytes_reclaimed > 0
+    assert set(list_thread_ids(checkpointer)) == {"done", "parked", "parked-initial", "parked-topic-0"}
+
+
+def test_tasks_past_their_max_age_are_deleted_with_all_their_threads(tmp_path):
+    checkpointer = create_checkpointer("sqlite", sqlite_path=str(tmp_path / "checkpoints.sqlite"))
+    _research_tasks(checkpointer)
+    compactor = CheckpointCompactor(checkpointer, RetentionPolicy(max_age_seconds=3600, batch_size=2,
+                                                                  delete_finished_subthreads=False))
+
+    assert compactor.compact().checkpoints == 0
+    report = compactor.compact(now=time.time() + 7200)
+
+    assert report.expired_threads == 6
+    assert list_thread_ids(checkpointer) == []
+
+
+def test_long_threads_are_trimmed_to_their_latest_checkpoints(tmp_path):
+    checkpointer = create_checkpointer("sqlite", sqlite_path=str(tmp_path / "checkpoints.sqlite"))
+    graph = _counter_graph(checkpointer, steps=10)
+    config = {"configurable": {"thread_id": "long"}}
+    graph.invoke({"count": 0}, config)
+
+    report = CheckpointCompactor(checkpointer, RetentionPolicy(max_checkpoints_per_thread=3)).compact()
+
+    assert report.trimmed_threads == 1
+    assert len(list(graph.get_state_history(config))) == 3
+    assert graph.get_state(config).values == {"count": 10}
+
+
+def test_checkpoint_ids_carry_their_write_time():
+    checkpointer = BoundedMemorySaver()
+    _counter_graph(checkpointer).invoke({"count": 0}, {"configurable": {"thread_id": "t"}})
+    latest = checkpointer.get_tuple({"configurable": {"thread_id": "t"}})
+    assert abs(checkpoint_timestamp(latest.config["configurable"]["checkpoint_id"]) - time.time()) < 60
@@ -0,0 +1,107 @@
+import sqlite3
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TypedDict
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.graph import END, StateGraph
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents.checkpoint_retention import CheckpointCompactor, RetentionPolicy
+from agents.checkpoint_serde import COMPACT_MSGPACK, CompactSerializer
+from agents.checkpointer import create_checkpointer
+from agents.researcher.memory.research_topics import RelatedTopics, Topic
+
+DESCRIPTION = " ".join(f"finding{i % 37} about agents, graphs and checkpoints" for i in range(30))
+
+
+def _related_topics(count=10):
+    return RelatedTopics(topics=[Topic(topic=f"Topic {i}", description=f"{i}: {DESCRIPTION}", source="web")
+                                 for i in range(count)])
+
+
+def test_research_models_round_trip_in_a_fraction_of_the_default_size():
+    value = {"research_result": _related_topics(), "topic": Topic(topic="t", description="d", source="s"),
+             "scores": [True, False]}
+    serde = CompactSerializer()
+
+    compact = serde.dumps_typed(value)
+    default = JsonPlusSerializer().dumps_typed(value)
+
+    assert serde.loads_typed(compact) == value
+    assert len(compact[1]) < len(default[1]) / 4
+    # Checkpoints written with the default serializer are still read
+    assert serde.loads_typed(default) == value
+
+
+
+def test_other_values_round_trip_through_langgraphs_serializer():
+    value = {"messages": [HumanMessage(content="research agents"), AIMessage(content="done")],
+             "started": datetime(2024, 5, 1, tzinfo=timezone.utc), "research_result": _related_topics(2)}
+    serde = CompactSerializer(compress_threshold=0)
+
+    assert serde.loads_typed(serde.dumps_typed(value)) == value
+    # Compact values that embed langgraph's ext codes directly, as earlier versions wrote them, are still read
+    message = HumanMessage(content="research agents")
+    _, legacy = JsonPlusSerializer().dumps_typed(message)
+    assert serde.loads_typed((COMPACT_MSGPACK, legacy)) == message
+
+class GradedState(TypedDict, total=False):
+    research_result: RelatedTopics
+    score: bool
+    round: int
+
+
+def _grading_graph(checkpointer, rounds=6):
+    """Writes the research once, then only flips a grade until done."""
+    def research(state):
+        return {"research_result": _related_topics(), "round": 0}
+
+    def grade(state):
+        return {"score": state["round"] % 2 == 0, "round": state["round"] + 1}
+
+    workflow = StateGraph(GradedState)
+    workflow.add_node("research", research)
+    workflow.add_node("grade", grade)
+    workflow.set_entry_point("research")
+    workflow.add_edge("research", "grade")
+    workflow.add_conditional_edges("grade", lambda state: "again" if state["round"] < rounds else "done",
+                                   {"again": "grade", "done": END})
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def _stored_bytes(path):
+    conn = sqlite3.connect(path)
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    total = conn.execute("SELECT SUM(length(checkpoint) + length(metadata)) FROM checkpoints").fetchone()[0]
+    if "checkpoint_blobs" in tables:
+        total += conn.execute("SELECT COALESCE(SUM(length(blob)), 0) FROM checkpoint_blobs").fetchone()[0]
+    conn.close()
+    return total
+
+
+def test_sqlite_checkpoints_store_only_the_channels_a_step_changed(tmp_path):
+    config = {"configurable": {"thread_id": "task-1-topic-0"}}
+    plain_path, delta_path = str(tmp_path / "plain.sqlite"), str(tmp_path / "delta.sqlite")
+    plain = _grading_graph(SqliteSaver(sqlite3.connect(plain_path, check_same_thread=False)))
+    delta = _grading_graph(create_checkpointer("sqlite", sqlite_path=delta_path))
+
+    plain.invoke({}, config)
+    delta.invoke({}, config)
+
+    assert delta.get_state(config).values == plain.get_state(config).values
+    delta_history = [snapshot.values for snapshot in delta.get_state_history(config)]
+    assert delta_history == [snapshot.values for snapshot in plain.get_state_history(config)]
+    assert _stored_bytes(delta_path) < _stored_bytes(plain_path) / 5
+
+    # Trimming keeps the channel values the remaining checkpoints still point at
+    report = CheckpointCompactor(delta.checkpointer, RetentionPolicy(max_checkpoints_per_thread=2)).compact()
+    assert report.blobs > 0
+    assert delta.get_state(config).values == plain.get_state(config).values
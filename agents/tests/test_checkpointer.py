@@ -0,0 +1,167 @@
+import asyncio
+import sys
+from pathlib import Path
+from typing import TypedDict
+
+import pytest
+from langgraph.graph import END, StateGraph
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents import checkpointer as checkpointer_module
+from agents.checkpointer import (BoundedMemorySaver, ThreadedCheckpointSaver, alist_thread_ids, create_checkpointer,
+                                 list_thread_ids, pin_thread)
+from agents.constants import HUMAN_FEEDBACK, INITIAL_RESEARCH
+from agents.graph_registry import clear_graph_registry
+from agents.orchestrator import OrchestratorAgent
+from agents.researcher import research
+from agents.researcher.initial_researcher.memory.initial_research_state import InitialResearchState
+from agents.researcher.memory.research_topics import RelatedTopics, Topic
+from agents.researcher.research import ResearchAgent
+
+
+class CounterState(TypedDict, total=False):
+    count: int
+
+
+def _counter_workflow():
+    workflow = StateGraph(CounterState)
+    workflow.add_node("increment", lambda state: {"count": state.get("count", 0) + 1})
+    workflow.set_entry_point("increment")
+    workflow.add_edge("increment", END)
+    return workflow
+
+
+def test_sqlite_checkpoints_survive_a_restart_and_work_from_any_event_loop(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    saver = create_checkpointer("sqlite", sqlite_path=path)
+    assert isinstance(saver, ThreadedCheckpointSaver)
+
+    graph = _counter_workflow().compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": "task-1"}}
+    asyncio.run(graph.ainvoke({"count": 1}, config))
+    asyncio.run(graph.ainvoke({"count": 5}, {"configurable": {"thread_id": "task-2"}}))
+
+    # A new process opens the same file
+    restarted = _counter_workflow().compile(checkpointer=create_checkpointer("sqlite", sqlite_path=path))
+    assert asyncio.run(restarted.aget_state(config)).values == {"count": 2}
+    assert list_thread_ids(restarted.checkpointer) == ["task-2", "task-1"]
+    assert asyncio.run(alist_thread_ids(restarted.checkpointer)) == ["task-2", "task-1"]
+
+
+def _looping_workflow(steps):
+    workflow = StateGraph(CounterState)
+    workflow.add_node("increment", lambda state: {"count": state.get("count", 0) + 1})
+    workflow.set_entry_point("increment")
+    workflow.add_conditional_edges("increment", lambda state: "again" if state["count"] < steps else "done",
+                                   {"again": "increment", "done": END})
+    return workflow
+
+
+def test_bounded_memory_saver_keeps_the_latest_checkpoints_of_each_thread():
+    saver = BoundedMemorySaver(max_bytes=0, max_threads=0, keep_last=3)
+    graph = _looping_workflow(steps=20).compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": "long"}}
+    graph.invoke({"count": 0}, config)
+
+    assert graph.get_state(config).values == {"count": 20}
+    assert len(list(graph.get_state_history(config))) == 3
+    footprint = saver.memory_footprint()
+    assert footprint["checkpoints"] == 3 and footprint["threads"] == 1
+    # Only the channel values the kept checkpoints reference are held, not one per step
+    assert len(saver.blobs) <= 3 * 3
+    assert footprint["bytes"] > 0
+
+
+def test_bounded_memory_saver_evicts_least_recently_used_finished_threads():
+    saver = BoundedMemorySaver(max_bytes=0, max_threads=2, keep_last=2)
+    graph = _counter_workflow().compile(checkpointer=saver)
+    parked = _counter_workflow().compile(checkpointer=saver, interrupt_before=["increment"])
+
+    parked.invoke({"count": 0}, {"configurable": {"thread_id": "waiting"}})
+    graph.invoke({"count": 0}, {"configurable": {"thread_id": "pinned"}})
+    saver.pin_thread("pinned")
+    for i in range(3):
+        graph.invoke({"count": i}, {"configurable": {"thread_id": f"done-{i}"}})
+
+    assert set(list_thread_ids(saver)) == {"waiting", "pinned", "done-2"}
+    assert saver.memory_footprint()["evictions"] == 2
+    assert graph.get_state({"configurable": {"thread_id": "done-0"}}).values == {}
+    # Evicting a thread releases everything it held
+    saver.delete_thread("done-2")
+    saver.delete_thread("pinned")
+    saver.delete_thread("waiting")
+    assert saver.memory_footprint()["bytes"] == 0
+    assert not saver.blobs and not saver.writes
+
+
+def test_a_task_pinned_by_its_int_id_is_not_evicted():
+    saver = BoundedMemorySaver(max_bytes=0, max_threads=2, keep_last=2)
+    graph = _counter_workflow().compile(checkpointer=saver)
+    task_id = 1700000000  # OrchestratorAgent task ids are ints
+
+    graph.invoke({"count": 0}, {"configurable": {"thread_id": task_id}})
+    pin_thread(saver, task_id)
+    for i in range(3):
+        graph.invoke({"count": i}, {"configurable": {"thread_id": f"done-{i}"}})
+
+    assert str(task_id) in list_thread_ids(saver)
+    assert saver.memory_footprint()["pinned_threads"] == 1
+    saver.delete_thread(task_id)
+    assert str(task_id) not in list_thread_ids(saver)
+    assert saver.memory_footprint()["pinned_threads"] == 0
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_checkpointer("redis")
+
+
+def test_orchestrator_resumes_unfinished_tasks_after_a_crash(tmp_path, monkeypatch):
+    path = str(tmp_path / "checkpoints.sqlite")
+    initial_runs, deep_runs = [], []
+
+    def build_initial_research_team():
+        def research_node(state):
+            initial_runs.append(state["query"])
+            return {"research_result": RelatedTopics(
+                topics=[Topic(topic="LangGraph", description="desc", source="web")])}
+
+        workflow = StateGraph(InitialResearchState)
+        workflow.add_node(INITIAL_RESEARCH, research_node)
+        workflow.add_node(HUMAN_FEEDBACK, lambda state: {})  # the research is accepted without review here
+        workflow.set_entry_point(INITIAL_RESEARCH)
+        workflow.add_edge(INITIAL_RESEARCH, END)
+        return workflow
+
+    async def flaky_deep_research(self, state):
+        deep_runs.append(state["task"]["task_id"])
+        if len(deep_runs) == 1:
+            raise RuntimeError("worker crashed")
+        return {"deep_research": state["initial_research"], "execution_status": "DeepResearch"}
+
+    monkeypatch.setattr(research, "init_research_team", build_initial_research_team)
+    monkeypatch.setattr(ResearchAgent, "run_parallel_deep_research", flaky_deep_research)
+
+    def start_process():
+        clear_graph_registry()
+        monkeypatch.setattr(checkpointer_module, "_default_checkpointer",
+                            create_checkpointer("sqlite", sqlite_path=path))
+
+    start_process()
+    request = {"task": {"query": "What is LangGraph?", "source": "web", "task_id": "crash-1"}}
+    with pytest.raises(RuntimeError):
+        asyncio.run(OrchestratorAgent({}).run_research_task(request))
+
+    start_process()
+    results = asyncio.run(OrchestratorAgent({}).resume_unfinished_tasks())
+
+    assert list(results) == ["crash-1"]
+    assert results["crash-1"]["publication_result"]["status"] == "published"
+    assert initial_runs == ["What is LangGraph?"]  # the completed node was not paid for again
+    assert deep_runs == ["crash-1", "crash-1"]
+    assert asyncio.run(OrchestratorAgent({}).resume_unfinished_tasks()) == {}
+    clear_graph_registry()
@@ -0,0 +1,92 @@
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents.researcher.llm.context_packer import ContextPacker, PromptPart, TokenCounter
+
+
+class WordTokenizer:
+    """One token per word, counting how often it encodes."""
+
+    def __init__(self):
+        self.encoded = 0
+        self.batches = 0
+
+    def encode(self, text):
+        self.encoded += 1
+        return text.split(" ")
+
+    def encode_batch(self, texts):
+        self.batches += 1
+        self.encoded += len(texts)
+        return [text.split(" ") for text in texts]
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+def _words(prefix, count):
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+
+def test_parts_share_the_budget_by_weight_and_small_parts_keep_their_size():
+    packer = ContextPacker(TokenCounter(WordTokenizer))
+    packed = packer.pack([
+        PromptPart("instructions", _words("i", 100), required=True),
+        PromptPart("topic", _words("t", 50)),
+        PromptPart("history", _words("h", 1000), weight=2),
+        PromptPart("observations", _words("o", 1000)),
+    ], budget=700)
+
+    # 600 tokens left: the topic fits its share, the other two split the remaining 550 by weight
+    assert packed.tokens == {"instructions": 100, "topic": 50, "history": 366, "observations": 183}
+    assert packed.truncated == ["history", "observations"]
+    assert packed["history"] == _words("h", 366)
+    assert packed.total_tokens <= 700
+
+
+def test_each_part_is_encoded_once_in_one_batch_and_then_served_from_the_cache():
+    tokenizer = WordTokenizer()
+    counter = TokenCounter(lambda: tokenizer)
+    packer = ContextPacker(counter)
+    parts = [PromptPart("instructions", _words("i", 10), required=True),
+             PromptPart("history", _words("h", 500), max_tokens=100)]
+
+    first = packer.pack(parts, budget=1000)
+    second = packer.pack(parts, budget=1000)
+    counter.count(_words("h", 500))
+
+    assert first == second and first.tokens["history"] == 100
+    assert tokenizer.encoded == 2 and tokenizer.batches == 1
+    assert counter.cache_info()["hits"] == 3
+
+
+def test_the_token_cache_is_bounded():
+    counter = TokenCounter(WordTokenizer, maxsize=3, max_tokens=25)
+    for i in range(10):
+        counter.count(_words(f"w{i}-", 10))
+
+    info = counter.cache_info()
+    assert info["entries"] == 2 and info["tokens"] == 20
+
+
+def test_unknown_model_offline_falls_back_to_the_approximate_tokenizer(monkeypatch):
+    from agents.researcher.llm import tokenizer
+
+    def unknown_model(model):
+        raise KeyError(model)
+
+    def offline(name):
+        raise OSError("no network to fetch the BPE file")
+
+    monkeypatch.setattr(tokenizer.tiktoken, "encoding_for_model", unknown_model)
+    monkeypatch.setattr(tokenizer.tiktoken, "get_encoding", offline)
+    tokenizer.get_tokenizer.cache_clear()
+    try:
+        assert isinstance(tokenizer.get_tokenizer(), tokenizer.ApproximateTokenizer)
+    finally:
+        tokenizer.get_tokenizer.cache_clear()
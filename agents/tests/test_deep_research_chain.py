@@ -0,0 +1,73 @@
+import asyncio
+import json
+import random
+import re
+import sys
+from pathlib import Path
+
+from langchain_core.runnables import RunnableLambda
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents.researcher.deep_researcher.chains import deep_research_chain
+from agents.researcher.memory.research_topics import Topic
+
+
+def _fake_react_model(prompt_value, **kwargs):
+    """Searches once with the enhanced tool, then answers with what the search returned."""
+    prompt = prompt_value.to_string()
+    observations = re.findall(r"Observation: (query=.*)", prompt)
+    if not observations:
+        topic = re.search(r"related topic (.*?) - ", prompt).group(1)
+        return f"Thought: search first\nAction: Enhanced Web Search for Topics\nAction Input: {topic}"
+    answer = {"topics": [{"topic": "seen", "description": observations[-1].strip(), "source": "web"}]}
+    return f"Thought: done\nFinal Answer: ```json\n{json.dumps(answer)}\n```"
+
+
+def test_concurrent_deep_research_runs_keep_their_own_search_context(monkeypatch):
+    async def search(inputs):
+        # Interleave the runs: every search yields before reading back its context
+        await asyncio.sleep(random.uniform(0, 0.02))
+        return f"query={inputs['query']} description={inputs['description']}"
+
+    monkeypatch.setattr(deep_research_chain, "get_chat_model", lambda **kwargs: RunnableLambda(_fake_react_model))
+    monkeypatch.setattr(deep_research_chain, "SearchUsingTavilyEnhancedAsync", search)
+    monkeypatch.setattr(deep_research_chain, "_limit_search_result", lambda result, *args: result)
+    for cached in (deep_research_chain.get_agent_executor, deep_research_chain.get_agent_chain,
+                   deep_research_chain.get_research_chain):
+        cached.cache_clear()
+
+    async def research(i):
+        topic = Topic(topic=f"topic {i}", description=f"about {i}", source="web")
+        return await deep_research_chain.get_research_chain().ainvoke({"query": f"q{i}", "topic": topic})
+
+    async def run_all():
+        return await asyncio.gather(*(research(i) for i in range(40)))
+
+    try:
+        results = asyncio.run(run_all())
+    finally:
+        for cached in (deep_research_chain.get_agent_executor, deep_research_chain.get_agent_chain,
+                       deep_research_chain.get_research_chain):
+            cached.cache_clear()
+
+    assert [result.topics[0].description for result in results] == [
+        f"query=q{i} description=about {i}" for i in range(40)]
+    # Nothing leaks out of the invocations
+    assert deep_research_chain.get_search_context() == ("", {})
+
+
+def test_agent_input_carries_the_history_once_within_the_budget(monkeypatch):
+    monkeypatch.setattr(deep_research_chain, "MAX_CONTEXT_TOKENS", 1500)
+    history = " ".join(f"finding-{i}" for i in range(3000))
+    topic = Topic(topic="Checkpointing", description="how graphs persist state", source="web")
+
+    agent_input = deep_research_chain.format_prompt_for_agent({"query": "q", "topic": topic, "history": history})
+    prompt = agent_input["input"]
+
+    assert prompt.count("finding-0 ") == 1
+    assert "Checkpointing - how graphs persist state" in prompt
+    assert deep_research_chain.count_tokens(prompt) <= 1500 + 20
@@ -0,0 +1,80 @@
+import sys
+from pathlib import Path
+
+import pytest
+from langgraph.graph import END, StateGraph
+from typing import TypedDict
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents import graph_registry
+from agents.graph_registry import clear_graph_registry, export_graph_png, get_compiled_graph, graph_structure_hash
+
+
+class CounterState(TypedDict):
+    count: int
+
+
+builds = []
+
+
+def build_counter_workflow():
+    builds.append(1)
+    workflow = StateGraph(CounterState)
+    workflow.add_node("increment", lambda state: {"count": state["count"] + 1})
+    workflow.set_entry_point("increment")
+    workflow.add_edge("increment", END)
+    return workflow
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    clear_graph_registry()
+    builds.clear()
+    yield
+    clear_graph_registry()
+
+
+def test_graph_is_compiled_once():
+    first = get_compiled_graph("counter", build_counter_workflow)
+    second = get_compiled_graph("counter", build_counter_workflow)
+    assert first is second
+    assert len(builds) == 1
+    assert first.invoke({"count": 1}) == {"count": 2}
+
+
+def test_checkpointer_gets_its_own_graph():
+    from langgraph.checkpoint.memory import MemorySaver
+
+    plain = get_compiled_graph("counter", build_counter_workflow)
+    with_memory = get_compiled_graph("counter", build_counter_workflow, checkpointer=MemorySaver())
+    assert plain is not with_memory
+
+
+def test_png_is_only_rendered_when_structure_changes(tmp_path, monkeypatch):
+    graph = get_compiled_graph("counter", build_counter_workflow)
+    renders = []
+
+    def fake_render(self, output_file_path=None, **kwargs):
+        renders.append(output_file_path)
+        Path(output_file_path).write_bytes(b"png")
+
+    monkeypatch.setattr("langchain_core.runnables.graph.Graph.draw_mermaid_png", fake_render)
+    png = str(tmp_path / "counter.png")
+
+    assert export_graph_png(graph, png) is True
+    assert export_graph_png(graph, png) is False
+    # A new process only has the hash file to go on
+    graph_registry._rendered_hashes.clear()
+    assert export_graph_png(graph, png) is False
+    assert renders == [png]
+    assert (tmp_path / "counter.png.sha256").read_text() == graph_structure_hash(graph)
+
+
+def test_export_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.delenv("EXPORT_GRAPH_PNG", raising=False)
+    monkeypatch.setattr(graph_registry, "export_graph_png", lambda *args: pytest.fail("rendered without opt-in"))
+    get_compiled_graph("counter", build_counter_workflow, png_path=str(tmp_path / "counter.png"))
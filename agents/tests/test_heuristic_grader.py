@@ -0,0 +1,161 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents.researcher.grading.heuristic_grader import (ACCEPT, REJECT, UNCERTAIN, HeuristicGrader,
+                                                        grade_result, source_domain)
+from agents.researcher.initial_researcher.agents import (Hallucination_Grader_Agent, Initial_Research_Agent,
+                                                         Research_Reviewer_Agent)
+from agents.researcher.initial_researcher.agents.Hallucination_Grader_Agent import HallucinationGraderAgent
+from agents.researcher.initial_researcher.agents.Initial_Research_Agent import InitialResearchAgent
+from agents.researcher.initial_researcher.agents.Research_Reviewer_Agent import ResearchReviewerAgent
+from agents.researcher.initial_researcher.chains.research_reviewer_chain import (GradeResearchTopicsBatch,
+                                                                                TopicVerdict)
+from agents.researcher.initial_researcher.tools import tavily_search
+from agents.researcher.memory.research_topics import RelatedTopics, Topic
+from agents.researcher.runtime.search_evidence import collect_search_evidence, record_search_results
+from agents.researcher.runtime.task_context import task_scope
+from agents.researcher.runtime.usage_ledger import get_usage_ledger
+from agents.researcher.tools.tavily_client import TavilySearchClient
+
+EVIDENCE = [
+    {"title": "LangGraph checkpointers", "url": "https://langchain-ai.github.io/langgraph/persistence",
+     "content": "LangGraph checkpointers persist graph state after every superstep, so interrupted "
+                "threads resume from the latest checkpoint."},
+    {"title": "Vector databases", "url": "https://en.wikipedia.org/wiki/Vector_database",
+     "content": "A vector database stores embeddings and answers approximate nearest neighbour queries."},
+]
+
+GROUNDED = Topic(topic="Checkpointers", source="langchain-ai.github.io",
+                 description="Checkpointers persist graph state after every superstep so threads resume.")
+PARTLY = Topic(topic="Vector stores", source="https://blog.vendor.io/vectors",
+               description="Vector databases answer nearest neighbour queries for retrieval pipelines at scale "
+                           "with sharding, replication and tiered storage.")
+INVENTED = Topic(topic="Quantum routers", source="https://blog.vendor.io/quantum",
+                 description="Photonic quantum routers entangle datacenter racks for zero latency.")
+
+
+def test_topics_are_decided_only_when_the_evidence_is_clear():
+    grader = HeuristicGrader()
+
+    assert grader.grade_topic(GROUNDED, EVIDENCE).decision == ACCEPT
+    assert grader.grade_topic(PARTLY, EVIDENCE).decision == UNCERTAIN
+    assert grader.grade_topic(INVENTED, EVIDENCE).decision == REJECT
+    assert grader.grade_topic(GROUNDED, []).decision == UNCERTAIN
+    # Sources are checked before the text
+    assert grader.grade_topic(GROUNDED.model_copy(update={"source": "N/A"}), EVIDENCE).decision == REJECT
+    assert grader.grade_topic(GROUNDED.model_copy(update={"source": "https://www.example.com/a"}),
+                              EVIDENCE).decision == REJECT
+
+
+def test_source_domains():
+    assert source_domain("https://www.nature.com/articles/1") == "nature.com"
+    assert source_domain("en.wikipedia.org/wiki/Graph") == "en.wikipedia.org"
+    assert source_domain("web") is None
+    assert source_domain("Nature article on graphs") is None
+
+
+def test_a_result_is_graded_locally_only_when_every_topic_agrees():
+    grader = HeuristicGrader()
+
+    assert grade_result(grader.grade_topics([GROUNDED, GROUNDED], EVIDENCE)) is True
+    assert grade_result(grader.grade_topics([INVENTED, INVENTED, GROUNDED], EVIDENCE)) is False
+    assert grade_result(grader.grade_topics([GROUNDED, PARTLY], EVIDENCE)) is None
+    # A missing source is a reviewer concern, not evidence of hallucination
+    no_source = GROUNDED.model_copy(update={"source": ""})
+    assert grade_result(grader.grade_topics([no_source, no_source], EVIDENCE)) is None
+
+
+class CountingBatchChain:
+    def __init__(self):
+        self.inputs = []
+
+    async def ainvoke(self, inputs):
+        self.inputs.append(inputs)
+        lines = inputs["topics"].splitlines()
+        return GradeResearchTopicsBatch(verdicts=[TopicVerdict(index=i + 1, binary_score=True)
+                                                  for i in range(len(lines))])
+
+
+def test_reviewer_escalates_only_uncertain_topics_and_counts_saved_calls(monkeypatch):
+    batch_chain = CountingBatchChain()
+    monkeypatch.setattr(Research_Reviewer_Agent, "get_research_reviewer_batch_chain", lambda: batch_chain)
+    monkeypatch.setattr(Research_Reviewer_Agent, "REVIEW_BATCH_SIZE", 12)
+    ledger = get_usage_ledger()
+    ledger.reset("pregrade-task")
+    state = {"query": "q", "research_result": RelatedTopics(topics=[GROUNDED, PARTLY, INVENTED, PARTLY]),
+             "search_evidence": EVIDENCE}
+
+    with task_scope("pregrade-task"):
+        result = asyncio.run(ResearchReviewerAgent().areview_research(state))
+        # Nothing is left to the LLM, so the batch call itself is saved
+        asyncio.run(ResearchReviewerAgent().areview_research(
+            {**state, "research_result": RelatedTopics(topics=[GROUNDED, INVENTED])}))
+
+    assert len(batch_chain.inputs) == 1
+    assert [line.split(". ")[0] for line in batch_chain.inputs[0]["topics"].splitlines()] == ["1", "2"]
+    assert [topic.topic for topic in result["research_result"].topics] == [
+        "Checkpointers", "Vector stores", "Vector stores"]
+    totals = ledger.totals("pregrade-task")
+    assert totals["pregraded_topics"] == 4 and totals["llm_calls_saved"] == 1
+    assert "1 LLM calls saved" in ledger.format_summary("pregrade-task")
+
+
+def test_hallucination_grader_skips_the_llm_when_the_evidence_settles_it(monkeypatch):
+    def no_chain():
+        raise AssertionError("LLM grader called")
+
+    monkeypatch.setattr(Hallucination_Grader_Agent, "get_hallucination_grader_chain", no_chain)
+    state = {"query": "q", "research_result": RelatedTopics(topics=[GROUNDED]), "search_evidence": EVIDENCE}
+
+    result = asyncio.run(HallucinationGraderAgent().averify_hallucinations(state))
+
+    assert result["hallucination_score"] is True
+
+
+def test_kept_topics_still_pass_the_pregrade_after_a_revise_pass(monkeypatch):
+    replacement = Topic(topic="Vector databases", source="https://en.wikipedia.org/wiki/Vector_database",
+                        description="A vector database stores embeddings and answers nearest neighbour queries.")
+
+    class RevisingChain:
+        def invoke(self, inputs):
+            # The revise pass only searches for the replacement
+            record_search_results(EVIDENCE[1:])
+            return RelatedTopics(topics=[replacement])
+
+    def no_chain():
+        raise AssertionError("LLM grader called")
+
+    monkeypatch.setattr(Initial_Research_Agent, "get_research_chain", lambda: RevisingChain())
+    monkeypatch.setattr(Hallucination_Grader_Agent, "get_hallucination_grader_chain", no_chain)
+    state = {"query": "q", "research_result": RelatedTopics(topics=[GROUNDED]), "search_evidence": EVIDENCE[:1],
+             "research_attempts": 1, "target_topic_count": 2, "rejected_topic_names": ["quantum routers"]}
+
+    state.update(InitialResearchAgent().run_initial_research(state))
+    result = HallucinationGraderAgent().verify_hallucinations(state)
+
+    assert [topic.topic for topic in state["research_result"].topics] == ["Checkpointers", "Vector databases"]
+    assert [item["url"] for item in state["search_evidence"]] == [item["url"] for item in EVIDENCE]
+    assert result["hallucination_score"] is True
+
+
+def test_search_tool_results_are_collected_as_evidence(monkeypatch):
+    def handler(request):
+        return httpx.Response(200, json={"results": EVIDENCE + EVIDENCE[:1]})
+
+    client = TavilySearchClient(api_key="key", transport=httpx.MockTransport(handler),
+                                async_transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(tavily_search, "get_search_client", lambda: client)
+
+    tavily_search.SearchUsingTavily("outside any scope")
+    with collect_search_evidence() as evidence:
+        asyncio.run(tavily_search.SearchUsingTavilyAsync("langgraph"))
+
+    assert [item["url"] for item in evidence] == [item["url"] for item in EVIDENCE]
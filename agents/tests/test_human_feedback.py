@@ -0,0 +1,94 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from langgraph.graph import END, StateGraph
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents.constants import AWAITING_HUMAN_FEEDBACK, HUMAN_FEEDBACK, INITIAL_PLAN, INITIAL_RESEARCH
+from agents.graph_registry import clear_graph_registry
+from agents.orchestrator import OrchestratorAgent
+from agents.researcher import research
+from agents.researcher.initial_researcher import graph as initial_graph
+from agents.researcher.initial_researcher.agents.Human_Agent import HumanAgent
+from agents.researcher.initial_researcher.memory.initial_research_state import InitialResearchState
+from agents.researcher.memory.research_topics import RelatedTopics, Topic
+from agents.researcher.research import ResearchAgent
+
+
+def _fake_initial_research_team(drafts):
+    """Initial research graph with the real human-feedback wiring and no LLM calls."""
+    def research_node(state):
+        drafts.append(state.get(HUMAN_FEEDBACK))
+        topic = Topic(topic=f"draft {len(drafts)}", description="desc", source="web")
+        return {"research_result": RelatedTopics(topics=[topic])}
+
+    def build():
+        workflow = StateGraph(InitialResearchState)
+        workflow.add_node(INITIAL_RESEARCH, research_node)
+        workflow.add_node(HUMAN_FEEDBACK, HumanAgent().get_human_feedback)
+        workflow.add_node(INITIAL_PLAN, lambda state: {"research_state": "InitialPlanner"})
+        workflow.set_entry_point(INITIAL_RESEARCH)
+        workflow.add_edge(INITIAL_RESEARCH, HUMAN_FEEDBACK)
+        workflow.add_conditional_edges(HUMAN_FEEDBACK, initial_graph._decide_next_step,
+                                       {"accept": INITIAL_PLAN, "revise": INITIAL_RESEARCH})
+        workflow.add_edge(INITIAL_PLAN, END)
+        return workflow
+    return build
+
+
+@pytest.fixture
+def drafts(monkeypatch):
+    drafts = []
+    clear_graph_registry()
+    monkeypatch.setattr(research, "init_research_team", _fake_initial_research_team(drafts))
+
+    async def fake_deep_research(self, state):
+        return {"deep_research": state["initial_research"], "execution_status": "DeepResearch"}
+
+    monkeypatch.setattr(ResearchAgent, "run_parallel_deep_research", fake_deep_research)
+    yield drafts
+    clear_graph_registry()
+
+
+def test_task_parks_for_feedback_and_resumes_from_another_instance(drafts):
+    request = {"task": {"query": "What is LangGraph?", "source": "web", "task_id": "review-1"}}
+
+    async def run():
+        parked = await OrchestratorAgent({}).run_research_task(request)
+        pending = await ResearchAgent().get_pending_review("review-1")
+
+        revised = await OrchestratorAgent({}).resume_research_task("review-1", "add more sources")
+        revised_pending = await ResearchAgent().get_pending_review("review-1")
+
+        finished = await OrchestratorAgent({}).resume_research_task("review-1", "accept")
+        return parked, pending, revised, revised_pending, finished
+
+    parked, pending, revised, revised_pending, finished = asyncio.run(run())
+
+    assert parked["execution_status"] == AWAITING_HUMAN_FEEDBACK
+    assert pending.topics[0].topic == "draft 1"
+    assert revised["execution_status"] == AWAITING_HUMAN_FEEDBACK
+    assert revised_pending.topics[0].topic == "draft 2"
+    assert drafts == [None, "add more sources"]
+
+    assert finished["deep_research"].topics[0].topic == "draft 2"
+    assert finished["publication_result"]["status"] == "published"
+
+
+def test_parked_tasks_do_not_hold_the_event_loop(drafts):
+    async def run():
+        tasks = [OrchestratorAgent({}).run_research_task(
+            {"task": {"query": f"query {i}", "source": "web", "task_id": f"batch-{i}"}}) for i in range(20)]
+        return await asyncio.wait_for(asyncio.gather(*tasks), timeout=30)
+
+    results = asyncio.run(run())
+    assert all(result["execution_status"] == AWAITING_HUMAN_FEEDBACK for result in results)
+
+    with pytest.raises(ValueError):
+        asyncio.run(OrchestratorAgent({}).resume_research_task("never-started", "accept"))
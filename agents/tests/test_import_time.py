@@ -0,0 +1,52 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# Budget for a cold `import agents`, overridable for slow CI machines
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "5"))
+
+_IMPORT_PROBE = """
+import json, time
+start = time.perf_counter()
+import agents
+elapsed = time.perf_counter() - start
+
+from agents.researcher.initial_researcher.chains import (
+    initial_research_chain, hallucination_grader_chain, research_reviewer_chain)
+from agents.researcher.deep_researcher.chains import deep_research_chain
+
+built = {
+    "initial_research_chain": initial_research_chain.get_research_chain.cache_info().currsize,
+    "hallucination_grader_chain": hallucination_grader_chain.get_hallucination_grader_chain.cache_info().currsize,
+    "research_reviewer_chain": research_reviewer_chain.get_research_reviewer_chain.cache_info().currsize,
+    "research_reviewer_batch_chain": research_reviewer_chain.get_research_reviewer_batch_chain.cache_info().currsize,
+    "deep_research_chain": deep_research_chain.get_research_chain.cache_info().currsize,
+    "tokenizer": deep_research_chain.get_tokenizer.cache_info().currsize,
+}
+print(json.dumps({"elapsed": elapsed, "built": built}))
+"""
+
+
+def _probe_import():
+    env = dict(os.environ)
+    # Any network access during import would fail fast instead of hanging
+    env.update({"HTTPS_PROXY": "http://127.0.0.1:9", "HTTP_PROXY": "http://127.0.0.1:9"})
+    result = subprocess.run([sys.executable, "-c", _IMPORT_PROBE], cwd=project_root, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_agents_is_within_budget_and_builds_nothing():
+    report = _probe_import()
+    print(f"import agents took {report['elapsed']:.2f}s (budget {IMPORT_BUDGET_SECONDS:.1f}s)")
+
+    assert report["built"] == {name: 0 for name in report["built"]}
+    assert report["elapsed"] < IMPORT_BUDGET_SECONDS
@@ -0,0 +1,284 @@
+import asyncio
+import inspect
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from agents.constants import HALLUCINATION_GRADER, HUMAN_FEEDBACK, INITIAL_RESEARCH, RESEARCH_REVIEWER
+from agents.researcher.initial_researcher.agents import (Hallucination_Grader_Agent, Initial_Research_Agent,
+                                                         Research_Reviewer_Agent)
+from agents.researcher.initial_researcher.agents.Research_Reviewer_Agent import ResearchReviewerAgent
+from agents.researcher.initial_researcher.chains.hallucination_grader_chain import GradeHallucinations
+from agents.researcher.initial_researcher.chains.research_reviewer_chain import (GradeResearchTopics,
+                                                                                GradeResearchTopicsBatch,
+                                                                                TopicVerdict)
+from agents.researcher.initial_researcher import graph as initial_graph
+from agents.researcher.initial_researcher.graph import init_research_team
+from agents.researcher.memory.research_topics import RelatedTopics, Topic
+from agents.researcher.runtime.search_evidence import record_search_results
+
+
+class FakeReviewerChain:
+    """Grades a topic as relevant unless its name starts with 'bad'."""
+
+    def __init__(self):
+        self.async_calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def invoke(self, inputs):
+        raise AssertionError("sync invoke called from the async path")
+
+    async def ainvoke(self, inputs):
+        self.async_calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return GradeResearchTopics(binary_score=not inputs["topic"].startswith("bad"))
+
+
+class FakeBatchReviewerChain:
+    """Grades every listed topic in one call, optionally leaving some out."""
+
+    def __init__(self, skip=()):
+        self.calls = 0
+        self.skip = skip
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        verdicts = []
+        for line in inputs["topics"].splitlines():
+            number, rest = line.split(". Related topic: ", 1)
+            name = rest.split(", Description of topic:")[0]
+            if name not in self.skip:
+                verdicts.append(TopicVerdict(index=int(number), binary_score=not name.startswith("bad")))
+        return GradeResearchTopicsBatch(verdicts=verdicts)
+
+
+def _topics(*names):
+    return RelatedTopics(topics=[Topic(topic=name, description="desc", source="web") for name in names])
+
+
+def test_llm_nodes_are_wired_to_async_variants():
+    workflow = init_research_team()
+    for node in (INITIAL_RESEARCH, HALLUCINATION_GRADER, RESEARCH_REVIEWER):
+        assert inspect.iscoroutinefunction(workflow.nodes[node].runnable.afunc)
+
+
+def _review(monkeypatch, names, batch_size=12, concurrency=4, batch_chain=None):
+    chain = FakeReviewerChain()
+    batch_chain = batch_chain or FakeBatchReviewerChain()
+    monkeypatch.setattr(Research_Reviewer_Agent, "get_research_reviewer_chain", lambda: chain)
+    monkeypatch.setattr(Research_Reviewer_Agent, "get_research_reviewer_batch_chain", lambda: batch_chain)
+    monkeypatch.setattr(Research_Reviewer_Agent, "REVIEW_BATCH_SIZE", batch_size)
+    monkeypatch.setattr(Research_Reviewer_Agent, "REVIEW_CONCURRENCY", concurrency)
+    result = asyncio.run(ResearchReviewerAgent().areview_research(
+        {"query": "q", "research_result": _topics(*names)}))
+    return result, chain, batch_chain
+
+
+def test_async_review_filters_failed_topics(monkeypatch):
+    chain = FakeReviewerChain()
+    monkeypatch.setattr(Research_Reviewer_Agent, "get_research_reviewer_chain", lambda: chain)
+    monkeypatch.setattr(Research_Reviewer_Agent, "REVIEW_BATCH_SIZE", 0)
+
+    result = asyncio.run(ResearchReviewerAgent().areview_research(
+        {"query": "q", "research_result": _topics("good one", "bad one", "good two")}))
+
+    assert chain.async_calls == 3
+    assert [topic.topic for topic in result["research_result"].topics] == ["good one", "good two"]
+    assert result["research_reviewer_score"] is True
+
+
+def test_review_grades_all_topics_in_one_batch_call(monkeypatch):
+    result, chain, batch_chain = _review(monkeypatch, ["good one", "bad one", "good two"])
+
+    assert batch_chain.calls == 1 and chain.async_calls == 0
+    assert [topic.topic for topic in result["research_result"].topics] == ["good one", "good two"]
+    assert result["research_reviewer_score"] is True
+
+
+def test_topics_the_batch_left_out_are_graded_one_by_one(monkeypatch):
+    result, chain, batch_chain = _review(monkeypatch, ["good one", "bad one", "good two"],
+                                         batch_chain=FakeBatchReviewerChain(skip=("good two",)))
+
+    assert batch_chain.calls == 1 and chain.async_calls == 1
+    assert [topic.topic for topic in result["research_result"].topics] == ["good one", "good two"]
+
+
+def test_large_results_are_graded_concurrently_within_the_bound(monkeypatch):
+    names = [f"{'bad' if i % 3 == 0 else 'good'} {i}" for i in range(10)]
+    result, chain, batch_chain = _review(monkeypatch, names, batch_size=4, concurrency=3)
+
+    assert batch_chain.calls == 0 and chain.async_calls == 10
+    assert 1 < chain.max_in_flight <= 3
+    assert [topic.topic for topic in result["research_result"].topics] == [n for n in names if n.startswith("good")]
+
+
+class SlowChain:
+    """Answers after a delay, one answer per call, having found the given search evidence."""
+
+    def __init__(self, answers, delay, evidence=()):
+        self.answers = list(answers)
+        self.delay = delay
+        self.evidence = list(evidence)
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        record_search_results(self.evidence)
+        await asyncio.sleep(self.delay)
+        answer = self.answers[min(self.calls, len(self.answers)) - 1]
+        return answer(inputs) if callable(answer) else answer
+
+
+def _evidence(text):
+    return [{"title": "Search result", "url": "https://docs.example.org/topics", "content": text}]
+
+
+def test_graders_run_in_parallel_and_revise_until_all_pass(monkeypatch):
+    research = SlowChain([_topics("good one", "bad one"), _topics("good one", "good two")], delay=0,
+                         evidence=_evidence("good desc"))
+    # The first draft is judged a hallucination, the revised one is grounded
+    grader = SlowChain([GradeHallucinations(binary_score=False), GradeHallucinations(binary_score=True)], delay=0.2)
+    reviewer = FakeBatchReviewerChain()
+    reviewer_ainvoke = reviewer.ainvoke
+
+    async def slow_review(inputs):
+        await asyncio.sleep(0.2)
+        return await reviewer_ainvoke(inputs)
+
+    reviewer.ainvoke = slow_review
+    single_reviewer = FakeReviewerChain()
+    monkeypatch.setattr(Initial_Research_Agent, "get_research_chain", lambda: research)
+    monkeypatch.setattr(Research_Reviewer_Agent, "get_research_reviewer_chain", lambda: single_reviewer)
+    monkeypatch.setattr(Hallucination_Grader_Agent, "get_hallucination_grader_chain", lambda: grader)
+    monkeypatch.setattr(Research_Reviewer_Agent, "get_research_reviewer_batch_chain", lambda: reviewer)
+
+    graph = init_research_team().compile(checkpointer=MemorySaver(), interrupt_before=[HUMAN_FEEDBACK])
+    config = {"configurable": {"thread_id": "parallel-graders"}}
+    started = time.perf_counter()
+    asyncio.run(graph.ainvoke({"query": "q", "research_result": None}, config))
+    elapsed = time.perf_counter() - started
+
+    state = graph.get_state(config)
+    assert state.next == (HUMAN_FEEDBACK,)
+    # The evidence settles "good one"; the revise pass kept it and only its replacement was reviewed
+    assert research.calls == 2 and grader.calls == 2
+    assert reviewer.calls == 0 and single_reviewer.async_calls == 2
+    assert [topic.topic for topic in state.values["research_result"].topics] == ["good one", "good two"]
+    # Two rounds of graders taking 0.2s each, not 0.4s each
+    assert elapsed < 0.7
+
+
+def _run_failing_grader_loop(monkeypatch, research_answers, max_revisions):
+    research = SlowChain(research_answers, delay=0)
+    grader = SlowChain([GradeHallucinations(binary_score=False)], delay=0)
+    monkeypatch.setattr(Initial_Research_Agent, "get_research_chain", lambda: research)
+    monkeypatch.setattr(Hallucination_Grader_Agent, "get_hallucination_grader_chain", lambda: grader)
+    monkeypatch.setattr(Research_Reviewer_Agent, "get_research_reviewer_batch_chain", FakeBatchReviewerChain)
+    monkeypatch.setattr(initial_graph, "MAX_RESEARCH_REVISIONS", max_revisions)
+
+    graph = init_research_team().compile(checkpointer=MemorySaver(), interrupt_before=[HUMAN_FEEDBACK])
+    config = {"configurable": {"thread_id": f"failing-grader-{max_revisions}"}}
+    asyncio.run(graph.ainvoke({"query": "q", "research_result": None}, config))
+    return graph.get_state(config), research
+
+
+def test_a_revision_with_the_same_topics_ends_the_loop(monkeypatch):
+    state, research = _run_failing_grader_loop(monkeypatch, [_topics("good one", "good two")], max_revisions=5)
+
+    assert state.next == (HUMAN_FEEDBACK,)
+    assert research.calls == 2
+    assert state.values["loop_exit_reason"] == "converged"
+
+
+def test_revisions_stop_at_the_configured_maximum(monkeypatch):
+    answers = [_topics(f"good {i}", f"good {i} again") for i in range(10)]
+    state, research = _run_failing_grader_loop(monkeypatch, answers, max_revisions=2)
+
+    assert state.next == (HUMAN_FEEDBACK,)
+    assert research.calls == 3 and state.values["research_attempts"] == 3
+    assert state.values["loop_exit_reason"] == "max_revisions"
+
+
+class RecordingChain(SlowChain):
+    def __init__(self, answers, evidence=()):
+        super().__init__(answers, delay=0, evidence=evidence)
+        self.inputs = []
+
+    async def ainvoke(self, inputs):
+        self.inputs.append(inputs)
+        return await super().ainvoke(inputs)
+
+
+def test_revise_passes_research_only_replacements_for_rejected_topics(monkeypatch):
+    research = RecordingChain([_topics("good one", "bad one", "bad two", "good two"),
+                               _topics("good one", "bad one", "good three", "good four", "good five")],
+                              evidence=_evidence("good two desc"))
+    grader = SlowChain([GradeHallucinations(binary_score=False), GradeHallucinations(binary_score=True)], delay=0)
+    reviewer = FakeBatchReviewerChain()
+    monkeypatch.setattr(Initial_Research_Agent, "get_research_chain", lambda: research)
+    monkeypatch.setattr(Hallucination_Grader_Agent, "get_hallucination_grader_chain", lambda: grader)
+    monkeypatch.setattr(Research_Reviewer_Agent, "get_research_reviewer_batch_chain", lambda: reviewer)
+
+    graph = init_research_team().compile(checkpointer=MemorySaver(), interrupt_before=[HUMAN_FEEDBACK])
+    config = {"configurable": {"thread_id": "incremental-revise"}}
+    asyncio.run(graph.ainvoke({"query": "q", "research_result": None}, config))
+
+    revise_input = research.inputs[1]
+    assert revise_input["needed"] == 2
+    assert revise_input["covered"] == ["good one", "good two"]
+    assert revise_input["rejected"] == ["bad one", "bad two"]
+    state = graph.get_state(config)
+    assert [topic.topic for topic in state.values["research_result"].topics] == [
+        "good one", "good two", "good three", "good four"]
+    assert state.values["loop_exit_reason"] == "passed"
+
+
+def test_a_failed_hallucination_grade_keeps_only_grounded_reviewed_topics(monkeypatch):
+    # Nothing in the evidence grounds the reviewed topics, so the revision starts over
+    research = RecordingChain([_topics("good one", "bad one", "good two"), _topics("good three", "good four")])
+    grader = SlowChain([GradeHallucinations(binary_score=False), GradeHallucinations(binary_score=True)], delay=0)
+    monkeypatch.setattr(Initial_Research_Agent, "get_research_chain", lambda: research)
+    monkeypatch.setattr(Hallucination_Grader_Agent, "get_hallucination_grader_chain", lambda: grader)
+    monkeypatch.setattr(Research_Reviewer_Agent, "get_research_reviewer_batch_chain", FakeBatchReviewerChain)
+
+    graph = init_research_team().compile(checkpointer=MemorySaver(), interrupt_before=[HUMAN_FEEDBACK])
+    config = {"configurable": {"thread_id": "ungrounded-kept-topics"}}
+    asyncio.run(graph.ainvoke({"query": "q", "research_result": None}, config))
+
+    assert "needed" not in research.inputs[1] and "history" in research.inputs[1]
+    state = graph.get_state(config)
+    assert [topic.topic for topic in state.values["research_result"].topics] == ["good three", "good four"]
+
+
+def test_incremental_revisions_with_a_failing_grader_run_to_the_maximum(monkeypatch):
+    kept = [f"good {i}" for i in range(9)]
+    # The kept topics are grounded; the replacements are not, so the grader goes on failing
+    research = RecordingChain([_topics(*kept, "bad one")] + [_topics(f"fresh {i}") for i in range(10)],
+                              evidence=_evidence("good desc"))
+    grader = SlowChain([GradeHallucinations(binary_score=False)], delay=0)
+    monkeypatch.setattr(Initial_Research_Agent, "get_research_chain", lambda: research)
+    monkeypatch.setattr(Hallucination_Grader_Agent, "get_hallucination_grader_chain", lambda: grader)
+    monkeypatch.setattr(Research_Reviewer_Agent, "get_research_reviewer_chain", FakeReviewerChain)
+    monkeypatch.setattr(Research_Reviewer_Agent, "get_research_reviewer_batch_chain", FakeBatchReviewerChain)
+    monkeypatch.setattr(initial_graph, "MAX_RESEARCH_REVISIONS", 3)
+
+    graph = init_research_team().compile(checkpointer=MemorySaver(), interrupt_before=[HUMAN_FEEDBACK])
+    config = {"configurable": {"thread_id": "incremental-failing-grader"}}
+    asyncio.run(graph.ainvoke({"query": "q", "research_result": None}, config))
+
+    assert all(inputs["needed"] == 1 for inputs in research.inputs[1:])
+    state = graph.get_state(config)
+    assert research.calls == 4
+    assert state.values["loop_exit_reason"] == "max_revisions"
+    assert [topic.topic for topic in state.values["research_result"].topics] == kept + ["fresh 2"]
@@ -0,0 +1,90 @@
+import sys
+from pathlib import Path
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents.researcher.llm.llm_cache import ResearchLLMCache, bypass_llm_cache
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path):
+    return ResearchLLMCache(backend=request.param, path=str(tmp_path / "llm.sqlite"))
+
+
+def test_identical_call_is_served_from_cache(cache):
+    llm = FakeListChatModel(responses=["first", "second"], cache=cache)
+
+    assert llm.invoke("grade this topic").content == "first"
+    assert llm.invoke("grade this topic").content == "first"
+    assert llm.invoke("grade another topic").content == "second"
+    assert cache.stats()["hits"] == 1
+
+
+def test_bypass_skips_lookup_but_refreshes_entry(cache):
+    llm = FakeListChatModel(responses=["first", "second", "third"], cache=cache)
+    llm.invoke("grade this topic")
+
+    with bypass_llm_cache():
+        assert llm.invoke("grade this topic").content == "second"
+    assert llm.invoke("grade this topic").content == "second"
+    assert cache.stats()["bypassed"] == 1
+
+
+def test_model_configuration_is_part_of_the_key(cache):
+    first = FakeListChatModel(responses=["a"], cache=cache)
+    other = FakeListChatModel(responses=["b"], cache=cache, sleep=0.0)
+    first.invoke("same prompt")
+    assert other.invoke("same prompt").content == "b"
+
+
+def test_entries_expire_and_are_bounded(tmp_path):
+    cache = ResearchLLMCache(backend="memory", ttl_seconds=0, max_entries=1)
+    llm = FakeListChatModel(responses=["a", "b", "c"], cache=cache)
+    llm.invoke("p")
+    assert llm.invoke("p").content == "b"
+
+    bounded = ResearchLLMCache(backend="sqlite", path=str(tmp_path / "llm.sqlite"), max_entries=1)
+    llm = FakeListChatModel(responses=["a", "b", "c"], cache=bounded)
+    llm.invoke("p1")
+    llm.invoke("p2")
+    assert bounded.stats()["entries"] == 1
+    assert bounded.stats()["evictions"] == 1
+
+
+def test_async_calls_use_the_sqlite_backend_off_the_event_loop(tmp_path):
+    import asyncio
+    import threading
+
+    cache = ResearchLLMCache(backend="sqlite", path=str(tmp_path / "llm.sqlite"))
+    backend_get, backend_set = cache._backend.get, cache._backend.set
+    threads = []
+
+    def get(key):
+        threads.append(threading.get_ident())
+        return backend_get(key)
+
+    def set(key, value, expires_at):
+        threads.append(threading.get_ident())
+        return backend_set(key, value, expires_at)
+
+    cache._backend.get, cache._backend.set = get, set
+    llm = FakeListChatModel(responses=["first", "second"], cache=cache)
+
+    async def invoke_twice():
+        first = await llm.ainvoke("grade this topic")
+        with bypass_llm_cache():
+            second = await llm.ainvoke("grade this topic")
+        return threading.get_ident(), first.content, second.content
+
+    loop_thread, first, second = asyncio.run(invoke_twice())
+
+    assert (first, second) == ("first", "second")
+    assert cache.stats()["bypassed"] == 1
+    # One lookup and two writes, none of them on the loop
+    assert len(threads) == 3 and loop_thread not in threads
@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents.researcher.llm import llm_provider
+from agents.researcher.llm.llm_provider import get_chat_model, get_http_clients
+from agents.researcher.runtime.rate_limiter import RateLimitedTransport
+
+
+def test_same_configuration_returns_the_same_model(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("LLM_MODEL", "gpt-4o-mini")
+    assert get_chat_model() is get_chat_model()
+    assert get_chat_model(max_tokens=100) is not get_chat_model()
+
+
+def test_models_on_one_endpoint_share_the_connection_pool(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("OPENAI_API_BASE", "https://llm.internal/v1")
+    grader = get_chat_model("gpt-4o-mini")
+    researcher = get_chat_model("gpt-4o", max_tokens=4000)
+
+    http_client, http_async_client = get_http_clients("https://llm.internal/v1")
+    assert grader.http_client is researcher.http_client is http_client
+    assert grader.http_async_client is researcher.http_async_client is http_async_client
+    assert http_client is not get_http_clients("https://other.internal/v1")[0]
+
+
+def test_pool_limits_come_from_configuration(monkeypatch):
+    monkeypatch.setattr(llm_provider, "LLM_MAX_CONNECTIONS", 7)
+    monkeypatch.setattr(llm_provider, "LLM_MAX_KEEPALIVE", 3)
+    http_client, _ = llm_provider._build_http_clients()
+    transport = http_client._transport
+    assert isinstance(transport, RateLimitedTransport)
+    pool = transport._transport._pool
+    assert pool._max_connections == 7
+    assert pool._max_keepalive_connections == 3
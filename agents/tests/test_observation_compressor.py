@@ -0,0 +1,67 @@
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents.researcher.deep_researcher.chains import deep_research_chain
+from agents.researcher.tools.observation_compressor import bm25_scores, compress_search_results, split_sentences
+
+FILLER = "The company was founded many years ago and has offices in several cities. " * 8
+
+RESULTS = [
+    {"title": "About us", "url": "https://vendor.example.org/about", "content": FILLER, "score": 0.9},
+    {"title": "LangGraph persistence", "url": "https://docs.example.org/persistence",
+     "content": "Checkpointers save graph state after every step. "
+                "Our newsletter is sent every Friday. "
+                "A thread resumes from its latest checkpoint after an interrupt."},
+    {"title": "Mirror", "url": "https://mirror.example.org/persistence",
+     "content": "Checkpointers save graph state after every step!"},
+]
+
+
+def _word_counts(texts):
+    return [len(text.split()) for text in texts]
+
+
+def test_sentences_are_ranked_against_the_query():
+    sentences = split_sentences(RESULTS[1]["content"])
+    scores = bm25_scores(sentences, "graph checkpointers resume thread state")
+
+    assert len(sentences) == 3
+    assert scores[1] == 0 and scores[0] > 0 and scores[2] > 0
+
+
+def test_the_most_relevant_sentences_are_kept_under_their_sources_within_budget():
+    compressed = compress_search_results(RESULTS, "checkpointers graph state thread resumes", 60, _word_counts)
+
+    assert [result["url"] for result in compressed] == ["https://docs.example.org/persistence"]
+    # Whole sentences, in their original order, without the off-topic one or the mirrored repeat
+    assert compressed[0]["content"] == ("Checkpointers save graph state after every step. "
+                                        "A thread resumes from its latest checkpoint after an interrupt.")
+
+
+def test_oversized_search_observations_are_compressed_not_cut(monkeypatch):
+    results = [dict(result) for result in RESULTS]
+
+    with deep_research_chain.search_context("graph checkpointers", {"description": "resuming threads"}):
+        limited = deep_research_chain._limit_search_result(results, "LangGraph persistence", 120, "Enhanced search")
+
+    # The budget applies to the observation the agent receives
+    assert limited.startswith("Search results:")
+    assert deep_research_chain.count_tokens(limited) <= 120
+    assert "https://docs.example.org/persistence" in limited and "founded" not in limited
+    assert limited.endswith("Checkpointers save graph state after every step.")
+
+
+def test_observations_are_measured_as_formatted_not_as_the_raw_results():
+    results = [dict(result) for result in RESULTS[1:]]
+    observation = deep_research_chain.format_search_observation(results)
+    # The repr carries every key, quote and score on top of the formatted text
+    budget = deep_research_chain.count_tokens(observation)
+    assert deep_research_chain.count_tokens(str(results)) > budget
+
+    assert deep_research_chain._limit_search_result(results, "LangGraph persistence", budget,
+                                                    "Enhanced search") == observation
@@ -0,0 +1,52 @@
+import json
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents.researcher.deep_researcher.chains.deep_research_chain import count_tokens
+from agents.researcher.memory.research_topics import RelatedTopics, Topic
+from agents.researcher.tools.observation_format import format_search_observation, resolve_sources, source_table
+
+RECORDED_RESULTS = json.loads((Path(__file__).parent / "fixtures" / "tavily_results.json").read_text())
+
+
+def test_recorded_results_take_far_fewer_tokens_than_their_repr():
+    with source_table() as sources:
+        observation = format_search_observation(RECORDED_RESULTS)
+
+    before, after = count_tokens(str(RECORDED_RESULTS)), count_tokens(observation)
+    print(f"observation tokens: {before} as repr, {after} formatted")
+    assert after < before * 0.8
+    assert "_search_metadata" not in observation and "score" not in observation
+    assert "https://" not in observation
+    assert observation.splitlines()[1].startswith("1. [S1 langchain-ai.github.io] Persistence - LangGraph: ")
+    assert len(sources) == 5
+
+
+def test_cited_source_ids_are_resolved_to_urls():
+    with source_table() as sources:
+        format_search_observation(RECORDED_RESULTS[:2])
+        # A later search in the same invocation reuses the id of a url it has seen
+        observation = format_search_observation(RECORDED_RESULTS[1:3])
+    result = RelatedTopics(topics=[Topic(topic="Checkpointers", description="d", source="S1"),
+                                   Topic(topic="Versions", description="d", source="[S2], S3"),
+                                   Topic(topic="Other", description="d", source="S9 and web"),
+                                   Topic(topic="Paths", description="d", source="https://host/S1/page")])
+
+    resolved = resolve_sources(result, sources)
+
+    assert "[S2 blog.langchain.dev]" in observation and "[S3 " in observation
+    assert [topic.source for topic in resolved.topics] == [
+        RECORDED_RESULTS[0]["url"], f"{RECORDED_RESULTS[1]['url']}, {RECORDED_RESULTS[2]['url']}", "S9 and web",
+        "https://host/S1/page"]
+
+
+def test_outside_an_invocation_urls_stay_in_the_observation():
+    observation = format_search_observation(RECORDED_RESULTS[:1])
+
+    assert RECORDED_RESULTS[0]["url"] in observation
+    assert format_search_observation("ConnectError('boom')") == "ConnectError('boom')"
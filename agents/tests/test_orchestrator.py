@@ -66,6 +66,22 @@ def test_init_research_team(orchestrator):
     print(f"Actual nodes: {actual_nodes}")
     assert all(node in workflow.nodes for node in expected_nodes)
 
+def test_reported_usage_is_released(orchestrator):
+    """Test that a task's ledger entries, budget and throttle time are dropped once reported"""
+    from agents.researcher.runtime.task_context import get_throttle_seconds, record_throttle
+    from agents.researcher.runtime.usage_ledger import get_usage_ledger
+    ledger = get_usage_ledger()
+    ledger.set_budget("report-task", {"max_tokens": 10})
+    ledger.record_llm("gpt-4o-mini", 100, 20, node="research", task_id="report-task")
+    record_throttle(0.5, task_id="report-task")
+
+    orchestrator._report_usage("report-task")
+
+    assert orchestrator.usage_summary["totals"]["total_tokens"] == 120
+    assert ledger.totals("report-task")["total_tokens"] == 0
+    assert ledger.budget_exceeded("report-task") is None
+    assert get_throttle_seconds("report-task") == 0.0
+
 # @pytest.mark.asyncio
 # async def test_run_research_task(orchestrator):
 #     """Test if research task runs correctly"""
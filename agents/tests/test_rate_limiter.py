@@ -0,0 +1,121 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents.researcher.runtime.rate_limiter import (AdaptiveConcurrencyLimiter, AsyncRateLimitedTransport,
+                                                    RateLimitedTransport, RateLimiter, TokenBucket)
+from agents.researcher.runtime.task_context import get_throttle_seconds, reset_task_stats, task_scope
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_queues_callers_once_the_minute_budget_is_spent():
+    clock = FakeClock()
+    bucket = TokenBucket(per_minute=60, clock=clock)  # one token per second
+
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == 1.0
+    assert bucket.reserve(1) == 2.0
+
+    clock.now = 10.0
+    assert bucket.available == 8.0
+
+
+def test_concurrency_limit_grows_additively_and_halves_on_overload():
+    clock = FakeClock()
+    limiter = AdaptiveConcurrencyLimiter(initial=4, max_limit=16, latency_target=5.0, clock=clock)
+
+    for _ in range(8):
+        assert limiter.try_acquire()
+        limiter.release(latency=0.1)
+    assert limiter.limit == 5
+
+    limiter.release(overloaded=True)
+    limiter.release(overloaded=True)  # same burst, decreased once
+    assert limiter.limit == 2
+
+    clock.now = 2.0
+    limiter.release(latency=30.0)  # too slow counts as overload
+    assert limiter.limit == 1
+
+
+def test_429_shrinks_concurrency_and_throttle_time_is_charged_to_the_task():
+    reset_task_stats()
+    limiter = RateLimiter({"tavily": {"rpm": 600, "concurrency": 4}})
+    responses = iter([httpx.Response(429, headers={"retry-after": "0.2"}), httpx.Response(200, json={})])
+    transport = RateLimitedTransport("tavily", httpx.MockTransport(lambda request: next(responses)), limiter)
+
+    with httpx.Client(transport=transport, base_url="https://api.tavily.com") as client:
+        with task_scope("task-1"):
+            assert client.post("/search", json={"query": "a"}).status_code == 429
+            assert client.post("/search", json={"query": "b"}).status_code == 200
+
+    stats = limiter.stats()["tavily"]
+    assert stats["rate_limited"] == 1
+    assert stats["concurrency_limit"] == 2
+    assert get_throttle_seconds("task-1") >= 0.15  # waited out the Retry-After
+    assert get_throttle_seconds("task-2") == 0.0
+
+
+def test_async_requests_never_exceed_the_concurrency_limit():
+    limiter = RateLimiter({"openai": {"rpm": 6000, "tpm": 10_000_000, "concurrency": 2, "max_concurrency": 2}})
+    active = {"now": 0, "peak": 0}
+
+    async def handler(request):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.02)
+        active["now"] -= 1
+        return httpx.Response(200, json={})
+
+    async def run():
+        transport = AsyncRateLimitedTransport("openai", httpx.MockTransport(handler), limiter)
+        async with httpx.AsyncClient(transport=transport, base_url="https://api.openai.com/v1") as client:
+            await asyncio.gather(*[client.post("/chat/completions", json={"model": "gpt-4o-mini"})
+                                   for _ in range(6)])
+
+    asyncio.run(run())
+    assert active["peak"] == 2
+    assert limiter.stats()["openai"]["requests"] == 6
+
+
+def test_models_of_one_provider_share_the_account_budget():
+    reset_task_stats()
+    limiter = RateLimiter({"openai": {"rpm": None, "tpm": 6000, "concurrency": 4}})
+    transport = RateLimitedTransport("openai", httpx.MockTransport(lambda request: httpx.Response(200, json={})),
+                                     limiter)
+
+    with httpx.Client(transport=transport, base_url="https://api.openai.com/v1") as client:
+        with task_scope("task-1"):
+            client.post("/chat/completions", json={"model": "gpt-4o", "max_tokens": 6000})
+            # Another model, but the same account: it waits for the minute budget to refill
+            client.post("/chat/completions", json={"model": "gpt-4o-mini", "max_tokens": 20})
+
+    assert get_throttle_seconds("task-1") >= 0.2
+
+
+def test_async_waiter_is_woken_by_a_slot_freed_in_another_thread():
+    limiter = AdaptiveConcurrencyLimiter(initial=1, max_limit=1)
+    limiter.acquire()
+
+    async def wait_for_slot():
+        loop = asyncio.get_running_loop()
+        # A sync request finishing in an executor thread frees the slot
+        loop.call_later(0.05, lambda: loop.run_in_executor(None, limiter.release))
+        await asyncio.wait_for(limiter.aacquire(), timeout=1.0)
+
+    asyncio.run(wait_for_slot())
+    assert limiter.in_flight == 1
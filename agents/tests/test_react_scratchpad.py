@@ -0,0 +1,89 @@
+import sys
+from pathlib import Path
+
+from langchain_core.agents import AgentAction
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents.researcher.llm.context_packer import TokenCounter
+from agents.researcher.llm.react_prompt import get_react_prompt
+from agents.researcher.llm.react_scratchpad import (
+    OMITTED_OBSERVATION, create_bounded_react_agent, format_bounded_scratchpad, summarize_observation)
+
+
+class WordTokenizer:
+    """One token per word."""
+
+    def encode(self, text):
+        return text.split(" ")
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+def _observation(step, results=3, words=100):
+    lines = ["Search results (cite sources by id):"]
+    for number in range(1, results + 1):
+        content = " ".join(f"step{step}-word{i}" for i in range(words))
+        lines.append(f"{number}. [S{step}{number} example.com] Title {step}.{number}: {content}")
+    return "\n".join(lines)
+
+
+def _steps(count):
+    return [(AgentAction("Enhanced Web Search for Topics", f"topic {step}",
+                         f"Thought: search {step}\nAction: Enhanced Web Search for Topics\nAction Input: topic {step}"),
+             _observation(step)) for step in range(count)]
+
+
+def test_latest_observation_stays_verbatim_and_older_ones_keep_their_sources():
+    counter = TokenCounter(WordTokenizer)
+    steps = _steps(3)
+
+    scratchpad = format_bounded_scratchpad(steps, counter, max_tokens=2000, keep_recent=1)
+
+    assert _observation(2) in scratchpad
+    assert "step0-word50" not in scratchpad and "step1-word50" not in scratchpad
+    assert "1. [S01 example.com] Title 0.1" in scratchpad
+    assert "3. [S13 example.com] Title 1.3" in scratchpad
+    # Every action is still there for the agent to see what it already searched
+    assert all(action.log in scratchpad for action, _ in steps)
+
+
+def test_scratchpad_stays_within_the_cap_as_the_steps_grow():
+    counter = TokenCounter(WordTokenizer)
+    sizes = []
+    for count in range(1, 9):
+        scratchpad = format_bounded_scratchpad(_steps(count), counter, max_tokens=600, keep_recent=1)
+        sizes.append(counter.count(scratchpad))
+
+    assert max(sizes) <= 600
+    # The summaries go first, then the latest observation is cut
+    scratchpad = format_bounded_scratchpad(_steps(8), counter, max_tokens=600, keep_recent=1)
+    assert OMITTED_OBSERVATION in scratchpad
+    assert "step7-word0" in scratchpad
+
+
+def test_short_observations_are_not_summarized():
+    counter = TokenCounter(WordTokenizer)
+    assert summarize_observation("No search results.", counter) == "No search results."
+
+
+def test_bounded_agent_renders_the_capped_scratchpad_into_the_prompt():
+    prompts = []
+
+    def fake_model(prompt_value, **kwargs):
+        prompts.append(prompt_value.to_string())
+        return "Thought: done\nFinal Answer: ok"
+
+    agent = create_bounded_react_agent(RunnableLambda(fake_model), [], get_react_prompt(),
+                                       TokenCounter(WordTokenizer), max_tokens=600, keep_recent=1)
+    result = agent.invoke({"input": "question", "intermediate_steps": _steps(6)})
+
+    assert result.return_values["output"] == "ok"
+    assert "step5-word0" in prompts[0]
+    assert "step0-word50" not in prompts[0]
@@ -0,0 +1,164 @@
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents.graph_registry import clear_graph_registry
+from agents.researcher import research
+from agents.researcher.research import ResearchAgent
+from agents.researcher.memory.research_topics import RelatedTopics, Topic
+
+
+class FakeDeepResearcher:
+    """Stands in for the compiled deep research graph."""
+
+    def __init__(self, delays, fail_on=()):
+        self.delays = delays
+        self.fail_on = set(fail_on)
+        self.thread_ids = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def aget_state(self, config):
+        # No checkpoint yet: every topic starts fresh
+        return SimpleNamespace(next=(), values={})
+
+    async def ainvoke(self, state, config):
+        self.thread_ids.append(config["configurable"]["thread_id"])
+        topic = state["task"]["topic"]
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays[topic.topic])
+            if topic.topic in self.fail_on:
+                raise RuntimeError("search failed")
+            deep_topic = Topic(topic=f"{topic.topic} (deep)", description="details", source="web")
+            return {"research_result": RelatedTopics(topics=[deep_topic])}
+        finally:
+            self.in_flight -= 1
+
+    def get_graph(self):
+        return self
+
+    def draw_mermaid_png(self, output_file_path=None):
+        return b""
+
+
+class FakeWorkflow:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def compile(self, **kwargs):
+        return self.graph
+
+
+def _topics(*names):
+    return RelatedTopics(topics=[Topic(topic=name, description="desc", source="web") for name in names])
+
+
+@pytest.fixture
+def fake_graph(monkeypatch):
+    graph = FakeDeepResearcher(delays={"a": 0.05, "b": 0.01, "c": 0.03, "d": 0.0})
+    monkeypatch.setattr(research, "init_deep_research_team", lambda: FakeWorkflow(graph))
+    clear_graph_registry()
+    yield graph
+    clear_graph_registry()
+
+
+def test_deep_research_keeps_topic_order_and_thread_ids(fake_graph):
+    agent = ResearchAgent(deep_research_concurrency=4)
+    task = {"query": "q", "task_id": "t1"}
+
+    report = asyncio.run(agent.get_deep_research_report(task, _topics("a", "b", "c", "d")))
+
+    assert [topic.topic for topic in report.topics] == ["a (deep)", "b (deep)", "c (deep)", "d (deep)"]
+    assert sorted(fake_graph.thread_ids) == ["t1-topic-0", "t1-topic-1", "t1-topic-2", "t1-topic-3"]
+    assert fake_graph.max_in_flight > 1
+
+
+def test_deep_research_respects_concurrency_limit(fake_graph):
+    agent = ResearchAgent()
+    task = {"query": "q", "task_id": "t2", "deep_research_concurrency": 2}
+
+    asyncio.run(agent.get_deep_research_report(task, _topics("a", "b", "c", "d")))
+
+    assert fake_graph.max_in_flight == 2
+
+
+def test_failing_topic_is_isolated(fake_graph):
+    fake_graph.fail_on = {"b"}
+    agent = ResearchAgent()
+
+    report = asyncio.run(agent.get_deep_research_report({"query": "q", "task_id": "t3"}, _topics("a", "b", "c")))
+
+    assert [topic.topic for topic in report.topics] == ["a (deep)", "b", "c (deep)"]
+
+
+class StoredGraph:
+    """A graph whose finished threads stay in a durable checkpointer, keyed by thread id."""
+
+    def __init__(self):
+        self.states = {}
+        self.runs = 0
+
+    async def aget_state(self, config):
+        return SimpleNamespace(next=(), values=self.states.get(config["configurable"]["thread_id"], {}))
+
+    async def ainvoke(self, state, config):
+        self.runs += 1
+        subject = state["task"]["topic"].topic if "task" in state else state["query"]
+        result = {**state, "research_result": _topics(f"{subject} for {state.get('query') or state['task']['query']}")}
+        self.states[config["configurable"]["thread_id"]] = result
+        return result
+
+    async def adelete_thread(self, thread_id):
+        self.states.pop(thread_id, None)
+
+    def get_graph(self):
+        return self
+
+    def draw_mermaid_png(self, output_file_path=None):
+        return b""
+
+
+@pytest.fixture
+def stored_graph(monkeypatch):
+    graph = StoredGraph()
+    monkeypatch.setattr(research, "init_research_team", lambda: FakeWorkflow(graph))
+    monkeypatch.setattr(research, "init_deep_research_team", lambda: FakeWorkflow(graph))
+    clear_graph_registry()
+    yield graph
+    clear_graph_registry()
+
+
+def test_a_reused_task_id_only_returns_research_for_the_same_query(stored_graph):
+    agent = ResearchAgent(checkpointer=stored_graph)
+
+    first = asyncio.run(agent.get_research_report(query="q1", task_id="task-123"))
+    second = asyncio.run(agent.get_research_report(query="q2", task_id="task-123"))
+    again = asyncio.run(agent.get_research_report(query="q2", task_id="task-123"))
+
+    assert [topic.topic for topic in first.topics] == ["q1 for q1"]
+    assert [topic.topic for topic in second.topics] == ["q2 for q2"]
+    assert again == second and stored_graph.runs == 2
+
+
+def test_a_reused_topic_thread_only_returns_research_for_the_same_topic(stored_graph):
+    agent = ResearchAgent(checkpointer=stored_graph)
+
+    def deep(query, *names):
+        report = asyncio.run(agent.get_deep_research_report({"query": query, "task_id": "t4"}, _topics(*names)))
+        return [topic.topic for topic in report.topics]
+
+    assert deep("q1", "a") == ["a for q1"]
+    assert deep("q2", "a") == ["a for q2"]
+    assert deep("q2", "b") == ["b for q2"]
+    assert deep("q2", "b") == ["b for q2"]
+    assert stored_graph.runs == 3
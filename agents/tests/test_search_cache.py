@@ -0,0 +1,61 @@
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents.researcher.tools.search_cache import SearchCache
+
+RESULTS = [{"title": "t", "url": "https://example.com", "content": "c", "score": 0.5}]
+
+
+def test_key_normalizes_query_and_includes_params():
+    key = SearchCache.make_key("  LangGraph   agents ", max_results=3, search_depth="advanced")
+    assert key == SearchCache.make_key("langgraph agents", search_depth="advanced", max_results=3)
+    assert key != SearchCache.make_key("langgraph agents", max_results=5, search_depth="advanced")
+    assert key != SearchCache.make_key("langgraph agents", max_results=3, search_depth="advanced",
+                                       include_raw_content=True)
+
+
+def test_disk_tier_survives_a_new_process(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    SearchCache(path=path).set("k", RESULTS)
+
+    cache = SearchCache(path=path)
+    assert cache.get("k") == RESULTS
+    assert cache.get("k") == RESULTS
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 0)
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = SearchCache(path=str(tmp_path / "cache.sqlite"))
+    cache.set("k", RESULTS, ttl_seconds=0.01)
+    time.sleep(0.02)
+    assert cache.get("k") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["disk_entries"] == 0
+
+
+def test_lru_eviction_in_both_tiers(tmp_path):
+    cache = SearchCache(path=str(tmp_path / "cache.sqlite"), max_memory_entries=2, max_disk_entries=2)
+    cache.set("a", RESULTS)
+    cache.set("b", RESULTS)
+    time.sleep(0.01)
+    cache.get("a")
+    cache.set("c", RESULTS)
+
+    stats = cache.stats()
+    assert stats["memory_entries"] == 2 and stats["disk_entries"] == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == RESULTS
+
+
+def test_memory_only_cache():
+    cache = SearchCache(path=None)
+    cache.set("k", RESULTS)
+    assert cache.get("k") == RESULTS
+    assert "disk_entries" not in cache.stats()
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import httpx
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents.researcher.tools.tavily_client import TavilySearchClient
+
+
+def _tavily_response(request: httpx.Request) -> httpx.Response:
+    payload = json.loads(request.content)
+    return httpx.Response(200, json={
+        "query": payload["query"],
+        "results": [{"title": payload["query"], "url": "https://example.com", "content": "snippet",
+                     "score": 0.9, "raw_content": None}],
+    })
+
+
+def test_sync_search_reuses_one_client_and_cleans_results():
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return _tavily_response(request)
+
+    client = TavilySearchClient(api_key="key", transport=httpx.MockTransport(handler))
+    first = client.search("llm agents", max_results=3)
+    http_client = client._sync_client()
+    client.search("langgraph", include_raw_content=True)
+
+    assert client._sync_client() is http_client
+    assert first == [{"title": "llm agents", "url": "https://example.com", "content": "snippet", "score": 0.9}]
+    assert requests[0]["max_results"] == 3 and requests[0]["api_key"] == "key"
+    assert requests[1]["include_raw_content"] is True
+
+
+def test_search_many_keeps_order_and_limits_concurrency():
+    in_flight = 0
+    max_in_flight = 0
+
+    async def handler(request):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        query = json.loads(request.content)["query"]
+        await asyncio.sleep(0.01 if query != "q0" else 0.03)
+        in_flight -= 1
+        if query == "boom":
+            return httpx.Response(500)
+        return _tavily_response(request)
+
+    client = TavilySearchClient(api_key="key", async_transport=httpx.MockTransport(handler))
+    queries = ["q0", "q1", "boom", "q3", "q4"]
+    results = asyncio.run(client.search_many(queries, max_concurrency=2))
+
+    assert [result[0]["title"] if result else None for result in results] == ["q0", "q1", None, "q3", "q4"]
+    assert max_in_flight == 2
+
+
+def test_cached_search_skips_the_network(tmp_path):
+    from agents.researcher.tools.search_cache import SearchCache
+
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return _tavily_response(request)
+
+    cache = SearchCache(path=str(tmp_path / "search.sqlite"))
+    client = TavilySearchClient(api_key="key", transport=httpx.MockTransport(handler), cache=cache)
+
+    first = client.search("LLM  Agents", max_results=3)
+    first[0]["_search_metadata"] = {"mutated": True}
+    second = client.search("llm agents", max_results=3)
+    client.search("llm agents", max_results=5)
+
+    assert len(requests) == 2
+    assert "_search_metadata" not in second[0]
+    assert cache.stats()["hits"] == 1
+
+
+def test_async_search_reads_and_writes_the_cache_off_the_event_loop(tmp_path):
+    import threading
+    from agents.researcher.tools.search_cache import SearchCache
+
+    class RecordingCache(SearchCache):
+        def get(self, key):
+            threads.append(threading.get_ident())
+            return super().get(key)
+
+        def set(self, key, value, ttl_seconds=None):
+            threads.append(threading.get_ident())
+            super().set(key, value, ttl_seconds)
+
+    threads = []
+    cache = RecordingCache(path=str(tmp_path / "search.sqlite"))
+    client = TavilySearchClient(api_key="key", async_transport=httpx.MockTransport(_tavily_response), cache=cache)
+
+    async def search_twice():
+        first = await client.asearch("llm agents")
+        second = await client.asearch("llm agents")
+        return threading.get_ident(), first, second
+
+    loop_thread, first, second = asyncio.run(search_twice())
+
+    assert first == second and cache.stats()["hits"] == 1
+    assert len(threads) == 3 and loop_thread not in threads
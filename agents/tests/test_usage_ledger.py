@@ -0,0 +1,115 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import TypedDict
+
+import httpx
+from langchain_core.caches import InMemoryCache
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, StateGraph
+
+# Add the project root to the Python path
+project_root = str(Path(__file__).resolve().parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from agents.researcher.deep_researcher import graph as deep_graph
+from agents.researcher.memory.research_topics import Topic
+from agents.researcher.research import ResearchAgent
+from agents.researcher.runtime.task_context import task_scope
+from agents.researcher.runtime.usage_ledger import UsageCallbackHandler, UsageLedger, get_usage_ledger
+from agents.researcher.tools.tavily_client import TavilySearchClient
+
+
+class GraderState(TypedDict, total=False):
+    question: str
+    answer: str
+
+
+def _fake_model(ledger, answers=2, cache=None):
+    messages = iter([AIMessage(content="yes", usage_metadata={"input_tokens": 120, "output_tokens": 30,
+                                                               "total_tokens": 150})
+                     for _ in range(answers)])
+    return GenericFakeChatModel(messages=messages, callbacks=[UsageCallbackHandler(ledger)], cache=cache)
+
+
+def _grader_graph(model):
+    async def grade(state: GraderState):
+        message = await model.ainvoke(state["question"])
+        return {"answer": message.content}
+
+    workflow = StateGraph(GraderState)
+    workflow.add_node("grade", grade)
+    workflow.set_entry_point("grade")
+    workflow.add_edge("grade", END)
+    return workflow.compile()
+
+
+def test_llm_usage_is_attributed_to_task_node_and_model():
+    ledger = UsageLedger()
+    graph = _grader_graph(_fake_model(ledger))
+
+    async def run():
+        with task_scope("task-1"):
+            await graph.ainvoke({"question": "is it grounded?"})
+        with task_scope("task-2"):
+            await graph.ainvoke({"question": "is it relevant?"})
+
+    asyncio.run(run())
+    summary = ledger.summary("task-1")
+    assert summary["totals"]["llm_calls"] == 1
+    assert summary["totals"]["total_tokens"] == 150
+    assert summary["by_node"]["grade"]["prompt_tokens"] == 120
+    assert ledger.totals("task-2")["completion_tokens"] == 30
+
+
+def test_cache_hits_are_counted_without_spending_tokens():
+    ledger = UsageLedger()
+    model = _fake_model(ledger, cache=InMemoryCache())
+
+    with task_scope("task-1"):
+        model.invoke("same prompt")
+        model.invoke("same prompt")
+
+    totals = ledger.totals("task-1")
+    assert totals["llm_calls"] == 1 and totals["cached_llm_calls"] == 1
+    assert totals["total_tokens"] == 150
+
+
+def test_searches_are_counted_with_their_credits():
+    ledger = get_usage_ledger()
+    ledger.reset("search-task")
+
+    def handler(request):
+        payload = json.loads(request.content)
+        return httpx.Response(200, json={"results": [{"title": payload["query"], "url": "u", "content": "c"}]})
+
+    client = TavilySearchClient(api_key="key", transport=httpx.MockTransport(handler))
+    with task_scope("search-task"):
+        client.search("langgraph", search_depth="advanced")
+        client.search("langchain", search_depth="basic")
+
+    totals = ledger.totals("search-task")
+    assert totals["searches"] == 2
+    assert totals["search_credits"] == 3
+
+
+def test_spent_budget_stops_revising_and_skips_deep_research():
+    ledger = get_usage_ledger()
+    ledger.reset("budget-task")
+    ledger.set_budget("budget-task", {"max_tokens": 1000})
+    route = deep_graph._route_on_revise("revise_research")
+
+    with task_scope("budget-task"):
+        assert route({"revise_research": True}) == "revise"
+        ledger.record_llm("gpt-4o-mini", 900, 200, node="research")
+        assert "token budget" in ledger.budget_exceeded()
+        assert route({"revise_research": True}) == "budget"
+
+        topic = Topic(topic="Agents", description="desc", source="web")
+        kept = asyncio.run(ResearchAgent()._research_topic(
+            None, asyncio.Semaphore(1), "query", "web", "budget-task", 0, topic, 1))
+    assert kept == [topic]
+    assert ledger.summary("budget-task")["by_model"]["gpt-4o-mini"]["cost_usd"] > 0
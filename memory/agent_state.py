@@ -6,6 +6,7 @@ class AgentState(TypedDict, total=False):
     """
     task: Dict[str, Any]
     agent_state: str  # e.g., "InitialResearch", "WritingComplete", etc.
+    execution_status: str  # e.g., "InitialResearch", "AwaitingHumanFeedback", "DeepResearch"
     initial_research: Any  # Will be RelatedTopics but using Any to avoid circular imports
     deep_research: Dict[str, Any]  # Placeholder for deep research results
     final_report: Dict[str, Any]  # The final research report
@@ -1,4 +1,4 @@
-from typing import List, Literal, TypedDict
+from typing import Dict, List, Literal, TypedDict
 
 class RequestedTask(TypedDict):
     """A task requested by the user."""
@@ -11,4 +11,6 @@ class RequestedTask(TypedDict):
     model: Literal["gpt-3.5-turbo", "gpt-4"] = "gpt-4"
     guidelines: List[str] = []
     verbose: bool = True
+    deep_research_concurrency: int = 4  # topics researched in parallel during deep research
+    budget: Dict[str, float] = {}  # e.g. {"max_tokens": 200000, "max_cost_usd": 1.0, "max_searches": 40}
     
\ No newline at end of file